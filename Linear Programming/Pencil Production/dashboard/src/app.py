@@ -1,430 +1,801 @@
+import copy
 import json
-from typing import Dict, Tuple
+from dataclasses import asdict
+from typing import Tuple
 import math
+import os
+import time
 
-from dash import Dash, html, dcc, clientside_callback, Input, Output, State, callback
+from flask import Response
+from dash import Dash, html, dcc, clientside_callback, ClientsideFunction, Input, Output, State, callback, ctx, no_update, ALL, MATCH
 import dash_ag_grid as dag
 import dash_daq as daq
 import dash_bootstrap_components as dbc
-import plotly.graph_objects as go
-import pandas as pd
 
-from lp_model import solve_lp_model
+from lp_data import CompiledProblem, read_products, units_vector
+from feasible_region import plan_region
+from sweep import SweepParam, sweep, param_values, current_value, SWEEP_MAX_POINTS
+from lp_model import LPResult, solve_problem, MIP_GAP
+from soln_cache import SolutionCache, canonical_key
+from metrics import timed, instrumented, render_metrics, arm_profile
+import session_store
+from session_store import SessionExpired, EditRejected, new_session, load_session, load_snapshot, get_problem, cell_edit, price_edit, shop_rate_edit
+from jobs import (background_callback_manager, solver_job_manager, acquire_solve_slot, renew_solve_slot, release_solve_slot, SOLVE_TIME_LIMIT,
+                  MIP_TIME_LIMIT, SOLVE_POLL_INTERVAL, SOLVER_TEE)
+
+DATA_PATH = os.environ.get('LP_DATA_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data.json'))
 
 def read_data_file() -> dict:
-    f =open('data.json')
+    f =open(DATA_PATH)
     data = json.load(f)
     f.close()
     return data
 
 data = read_data_file()
+products = read_products(data)
+knob_width = f'{100/(len(products) + 1):.0f}%'
+KNOB_MAX = 10000
+
+def gen_units_knob(prod_det: dict) -> html.Div:
+    return html.Div([
+        daq.Knob(
+            id={'type': 'units_knob', 'index': prod_det['product']},
+            max=KNOB_MAX,
+            value=1000,
+            className='text-center',
+            color='#007bff'
+        ),
+        html.Div([
+            html.Span(f"{prod_det['name']} Units: "),
+            html.Span([], id={'type': 'knob_label', 'index': prod_det['product']})
+        ], className='text-center'),
+    ], className='d-inline-block', style={'width': knob_width})
+
+def gen_price_row(prod_det: dict) -> html.Div:
+    return html.Div([
+        html.Div([
+            html.Span(f"{prod_det['name']} Price ($)")
+        ], className='col-3'),
+        html.Div([
+            dcc.Input(
+                id={'type': 'price_input', 'index': prod_det['product']},
+                value=prod_det['price'],
+                type='number',
+                min=0.01,
+                max=10.00,
+                step=0.01
+            )   
+        ], className='col-3')
+    ], className='row mt-2')
+
+def sweep_param_options() -> list:
+    options = [{'label': f"{prod_det['name']} Price ($)", 'value': f"price|{prod_det['product']}"} for prod_det in products]
+    options += [{'label': f"{dept_det['dept']} Capacity (Hours)", 'value': f"dept_capacity|{dept_det['dept']}"} for dept_det in data['dept']]
+    options += [{'label': f"{part_det['part']} Inventory", 'value': f"inv_capacity|{part_det['part']}"} for part_det in data['parts']]
+    options += [{'label': f"{part_det['part']} Cost ($)", 'value': f"part_cost|{part_det['part']}"} for part_det in data['parts']]
+    options.append({'label': 'Shop Labor ($/minute)', 'value': 'shop_labor_rate|'})
+    return options
+
+def gen_sweep_param_row(index: int, param_key: str, start, stop, steps) -> html.Div:
+    return html.Div([
+        html.Div([
+            dcc.Dropdown(
+                id={'type': 'sweep_param', 'index': index},
+                options=sweep_param_options(),
+                value=param_key,
+                placeholder='Second parameter (optional)',
+                clearable=index > 0
+            )
+        ], className='col-lg-6'),
+        *[html.Div([
+            html.Span(f'{label} '),
+            dcc.Input(id={'type': input_type, 'index': index}, value=value, type='number', **kwargs)
+        ], className='col-lg-2') for label, input_type, value, kwargs in [
+            ('From', 'sweep_start', start, {}),
+            ('To', 'sweep_stop', stop, {}),
+            ('Steps', 'sweep_steps', steps, {'min': 1, 'step': 1})
+        ]]
+    ], className='row mt-2')
+
+def cond_ui_data(prices, shop_rate, dept_rows, bom_rows, part_rows) -> dict:    
+    prod_ids = [prod_det['product'] for prod_det in products]
+    for dept in dept_rows:
+        for prod in prod_ids:
+            dept[prod] = float(dept.get(prod) or 0)
+        dept['capacity'] = float(dept['capacity'])
 
-app = Dash(__name__)
+    for part in part_rows:
+        part['cost'] = float(part['cost'])
+        part['inv'] = float(part['inv'])
+
+    for part in bom_rows:
+        for prod in prod_ids:
+            part[prod] = float(part.get(prod) or 0)
+
+    return {
+        'products': [{**prod_det, 'price': prices[prod_det['product']]} for prod_det in products],
+        'shop_labor_rate': shop_rate,
+        'parts': part_rows,
+        'bom': bom_rows,
+        'dept': dept_rows
+    }
+
+def default_ui_data() -> dict:
+    prices = {prod_det['product']: prod_det['price'] for prod_det in products}
+    return cond_ui_data(prices, data['shop_labor_rate'], copy.deepcopy(data['dept']), copy.deepcopy(data['bom']), copy.deepcopy(data['parts']))
+
+soln_cache = SolutionCache()
+
+app = Dash(__name__, background_callback_manager=background_callback_manager)
 server = app.server #Exposing Flask server for gunicorn
 
-app.layout = html.Div([
-    html.Div([
+@server.route('/cache_stats')
+def cache_stats():
+    return soln_cache.stats()
+
+@server.route('/portfolio_stats')
+def portfolio_stats():
+    from portfolio import portfolio_summary
+    return portfolio_summary()
+
+@server.route('/metrics')
+def metrics_endpoint():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+if os.environ.get('LP_DEBUG') == '1':
+    @server.route('/debug/profile/<callback_name>', methods=['POST'])
+    def profile_callback(callback_name):
+        return {'armed': arm_profile(callback_name)}
+
+def serve_layout() -> html.Div:
+    # Each page load gets its own server-side copy of the data; callbacks only carry its version token.
+    session_token = new_session(default_ui_data())
+    return html.Div([
         html.Div([
-            dbc.Card(dbc.CardBody([
-                html.H1('Pencil Production')
-            ]))
-        ], className='col-12')
-    ], className='row'),
-    html.Div([
+            html.Div([
+                dbc.Card(dbc.CardBody([
+                    html.H1('Pencil Production')
+                ]))
+            ], className='col-12')
+        ], className='row'),
         html.Div([
-            dbc.Card(
-                dbc.CardBody([
-                    dbc.Tabs([
-                        dbc.Tab([
-                            html.Div([
+            html.Div([
+                dbc.Card(
+                    dbc.CardBody([
+                        dbc.Tabs([
+                            dbc.Tab([
                                 html.Div([
                                     html.Div([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.Div([
-                                                    daq.Knob(
-                                                        id='economy_units_knob',
-                                                        max=10000,
-                                                        value=1000,
-                                                        className='text-center',
-                                                        color='#007bff'
-                                                    ),
-                                                    html.Div([], id='economy_knob_label', className='text-center'),
-                                                ], className='d-inline-block', style={'width': '33%'}),
-                                                html.Div([
-                                                    daq.Knob(
-                                                        id='deluxe_units_knob',
-                                                        max=10000,
-                                                        value=1000,
-                                                        className='text-center',
-                                                        color='#007bff'
-                                                    ),
-                                                    html.Div([], id='deluxe_knob_label', className='text-center'),
-                                                ], className='d-inline-block', style={'width': '33%'}),
-                                                html.Div([
+                                        html.Div([
+                                            dbc.Card(
+                                                dbc.CardBody([
+                                                    *[gen_units_knob(prod_det) for prod_det in products],
                                                     html.Div([
-                                                        html.P(['Run Model'], style={'fontSize':'larger'}) 
-                                                    ], className='d-inline-block run-model-btn', id='run_model_btn'), 
-                                                ], style={'width': '33%', 'justifyContent': 'center', 'alignItems': 'center'}, className='text-center d-flex')
-                                            ], className='d-flex')
-                                        , className='w-100')
-                                    ], className='col-lg-6 d-flex'),
+                                                        html.Div([
+                                                            html.P(['Run Model'], style={'fontSize':'larger'}) 
+                                                        ], className='d-inline-block run-model-btn', id='run_model_btn'), 
+                                                        dbc.Switch(id='integer_mode_switch', label='Whole units', value=False)
+                                                    ], style={'width': knob_width, 'justifyContent': 'center', 'alignItems': 'center', 'flexDirection': 'column'}, className='text-center d-flex')
+                                                ], className='d-flex')
+                                            , className='w-100')
+                                        ], className='col-lg-6 d-flex'),
+                                        html.Div([
+                                            dbc.Card(
+                                                [
+                                                    dbc.CardBody([
+                                                        html.Div([
+                                                            html.H3([], id='soln_status_txt', className='text-center'),
+                                                            html.H3([], id='profit_txt', className='text-center')
+                                                        ])
+                                                    ], id='results_card_body'),
+                                                    dbc.CardFooter([
+                                                        html.Span([], id='solve_progress', style={'display': 'none'}),
+                                                        html.Span([], id='solve_status')
+                                                    ], className='text-center')
+                                                ], style={'height':'100%'}
+                                            )
+                                        ], className='col-lg-6')
+                                    ], className='row'),
                                     html.Div([
-                                        dbc.Card(
-                                            dbc.CardBody([], id='results_card_body'), style={'height':'100%'}
-                                        )
-                                    ], className='col-lg-6')
-                                ], className='row'),
-                                html.Div([
+                                        html.Div([
+                                            dbc.Card(
+                                                dbc.CardBody([
+                                                    dcc.Graph(id='dept_load_chart')
+                                                ])
+                                            )
+                                        ], className='col-lg-6'),
+                                        html.Div([
+                                            dbc.Card(
+                                                dbc.CardBody([
+                                                    dcc.Graph(id='inv_load_chart')
+                                                ])
+                                            )
+                                        ], className='col-lg-6')
+                                    ], className='row mt-1'),
                                     html.Div([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                dcc.Graph(id='dept_load_chart')
-                                            ])
-                                        )
-                                    ], className='col-lg-6'),
+                                        html.Div([
+                                            dbc.Card(
+                                                dbc.CardBody([
+                                                    html.H3('Plan View'),
+                                                    html.Div([
+                                                        html.Div([
+                                                            dcc.Dropdown(
+                                                                id='plan_x_product',
+                                                                options=[{'label': prod_det['name'], 'value': prod_det['product']} for prod_det in products],
+                                                                value=products[0]['product'],
+                                                                clearable=False
+                                                            )
+                                                        ], className='col-3'),
+                                                        html.Div([
+                                                            dcc.Dropdown(
+                                                                id='plan_y_product',
+                                                                options=[{'label': prod_det['name'], 'value': prod_det['product']} for prod_det in products],
+                                                                value=products[min(1, len(products) - 1)]['product'],
+                                                                clearable=False
+                                                            )
+                                                        ], className='col-3')
+                                                    ], className='row'),
+                                                    dcc.Graph(id='plan_view_chart')
+                                                ])
+                                            )
+                                        ], className='col-12')
+                                    ], className='row mt-1'),
                                     html.Div([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                dcc.Graph(id='inv_load_chart')
-                                            ])
-                                        )
-                                    ], className='col-lg-6')
-                                ], className='row mt-1'),
-                                html.Div([
+                                        html.Div([
+                                            dbc.Card(
+                                                dbc.CardBody([
+                                                    html.H3('Product Sensitivity'),
+                                                    dag.AgGrid(
+                                                        id='product_sens_grid',
+                                                        columnSize='responsiveSizeToFit',
+                                                        columnDefs=[
+                                                            {'field': 'product', 'headerName': 'Product'},
+                                                            {'field': 'units', 'headerName': 'Optimal Units'},
+                                                            {'field': 'reduced_cost', 'headerName': 'Reduced Cost ($)'},
+                                                            {'field': 'price_low', 'headerName': 'Price Low ($)'},
+                                                            {'field': 'price_high', 'headerName': 'Price High ($)'},
+                                                        ],
+                                                        rowData=[]
+                                                    )
+                                                ])
+                                            )
+                                        ], className='col-lg-6'),
+                                        html.Div([
+                                            dbc.Card(
+                                                dbc.CardBody([
+                                                    html.H3('Constraint Sensitivity'),
+                                                    dag.AgGrid(
+                                                        id='constraint_sens_grid',
+                                                        columnSize='responsiveSizeToFit',
+                                                        columnDefs=[
+                                                            {'field': 'constraint', 'headerName': 'Constraint'},
+                                                            {'field': 'type', 'headerName': 'Type'},
+                                                            {'field': 'shadow_price', 'headerName': 'Shadow Price ($)'},
+                                                            {'field': 'rhs_low', 'headerName': 'Capacity Low'},
+                                                            {'field': 'rhs_high', 'headerName': 'Capacity High'},
+                                                        ],
+                                                        rowData=[]
+                                                    )
+                                                ])
+                                            )
+                                        ], className='col-lg-6')
+                                    ], className='row mt-1'),
                                     html.Div([
-                                        html.P('Model uses continuous real decision variables to represent the quantity of each product to produce.  Optimal values are rounded down to the nearest integer.', className='font-italic')
-                                    ], className='col-12')
-                                ], className='row mt-1')
-                            ], className='container-fluid mt-2')
-                        ], label='Analysis'),
-                        dbc.Tab([
-                            html.Div([
+                                        html.Div([
+                                            html.P('Model uses continuous real decision variables to represent the quantity of each product to produce.  Optimal values are rounded down to the nearest integer.  With Whole units on, the model searches integer quantities directly within a fixed time budget and reports the remaining optimality gap.', className='font-italic')
+                                        ], className='col-12')
+                                    ], className='row mt-1')
+                                ], className='container-fluid mt-2')
+                            ], label='Analysis'),
+                            dbc.Tab([
                                 html.Div([
                                     html.Div([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.H3('Parts'),
-                                                dag.AgGrid(
-                                                    id='parts_grid',
-                                                    defaultColDef={'editable':True},
-                                                    columnSize='responsiveSizeToFit',
-                                                    columnDefs=[
-                                                        {'field': 'part', 'headerName': 'Part'},
-                                                        {'field': 'cost', 'headerName': 'Cost', 'valueFormatter': {"function": "'$' + (params.value)"}},
-                                                        {'field': 'inv', 'headerName': 'Inventory', 'valueFormatter': {"function": "d3.format(',')(params.value)"}},
-                                                        {'field': 'uom', 'headerName': 'UOM'},
-                                                    ],
-                                                    rowData=data['parts']
-                                                )
-                                            ])
-                                        )
-                                    ], className='col-lg-6'),
+                                        html.Div([
+                                            dbc.Card(
+                                                dbc.CardBody([
+                                                    html.H3('Parametric Sweep'),
+                                                    gen_sweep_param_row(0, f"price|{products[-1]['product']}", 1.00, 3.00, 21),
+                                                    gen_sweep_param_row(1, None, None, None, 11),
+                                                    html.Div([
+                                                        dbc.Button('Run Sweep', id='run_sweep_btn', color='primary'),
+                                                        dbc.Button('Cancel', id='cancel_sweep_btn', color='secondary', className='ms-2', disabled=True),
+                                                        html.Span([], id='sweep_progress', className='ms-3', style={'display': 'none'}),
+                                                        html.Span([], id='sweep_status', className='ms-3')
+                                                    ], className='mt-3')
+                                                ])
+                                            )
+                                        ], className='col-12')
+                                    ], className='row'),
                                     html.Div([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.H3('BOM'),
-                                                dag.AgGrid(
-                                                    id='bom_grid',
-                                                    defaultColDef={'editable':True},
-                                                    columnSize='responsiveSizeToFit',
-                                                    columnDefs=[
-                                                        {'field': 'part', 'headerName': 'Part'},
-                                                        {'field': 'economy', 'headerName': 'Economy'},
-                                                        {'field': 'deluxe', 'headerName': 'Deluxe'},
-                                                        {'field': 'uom', 'headerName': 'UOM'},
-                                                    ],
-                                                    rowData=data['bom']
-                                                )
-                                            ])
-                                        )
-                                    ], className='col-lg-6'),
-                                ], className='row mt-2'),
+                                        html.Div([
+                                            dbc.Card(
+                                                dbc.CardBody([
+                                                    dcc.Graph(id='sweep_profit_chart')
+                                                ])
+                                            )
+                                        ], className='col-lg-6'),
+                                        html.Div([
+                                            dbc.Card(
+                                                dbc.CardBody([
+                                                    dcc.Graph(id='sweep_mix_chart')
+                                                ])
+                                            )
+                                        ], className='col-lg-6')
+                                    ], className='row mt-1')
+                                ], className='container-fluid mt-2')
+                            ], label='Sweep'),
+                            dbc.Tab([
                                 html.Div([
                                     html.Div([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.H3('Departments'),
-                                                dag.AgGrid(
-                                                    id='dept_grid',
-                                                    defaultColDef={'editable':True},
-                                                    columnSize='responsiveSizeToFit',
-                                                    columnDefs=[
-                                                        {'field': 'dept', 'headerName': 'Department'},
-                                                        {'field': 'economy', 'headerName': 'Economy (Seconds)'},
-                                                        {'field': 'deluxe', 'headerName': 'Deluxe (Seconds)'},
-                                                        {'field': 'capacity', 'headerName': 'Capacity (Hours)'},
-                                                    ],
-                                                    rowData=data['dept']
-                                                )
-                                            ])
-                                        )
-                                    ], className='col-lg-6'),
+                                        html.Div([
+                                            dbc.Card(
+                                                dbc.CardBody([
+                                                    html.H3('Parts'),
+                                                    dag.AgGrid(
+                                                        id='parts_grid',
+                                                        defaultColDef={'editable':True},
+                                                        columnSize='responsiveSizeToFit',
+                                                        columnDefs=[
+                                                            {'field': 'part', 'headerName': 'Part'},
+                                                            {'field': 'cost', 'headerName': 'Cost', 'valueFormatter': {"function": "'$' + (params.value)"}},
+                                                            {'field': 'inv', 'headerName': 'Inventory', 'valueFormatter': {"function": "d3.format(',')(params.value)"}},
+                                                            {'field': 'uom', 'headerName': 'UOM'},
+                                                        ],
+                                                        rowData=data['parts']
+                                                    )
+                                                ])
+                                            )
+                                        ], className='col-lg-6'),
+                                        html.Div([
+                                            dbc.Card(
+                                                dbc.CardBody([
+                                                    html.H3('BOM'),
+                                                    dag.AgGrid(
+                                                        id='bom_grid',
+                                                        defaultColDef={'editable':True},
+                                                        columnSize='responsiveSizeToFit',
+                                                        columnDefs=[
+                                                            {'field': 'part', 'headerName': 'Part'},
+                                                            *[{'field': prod_det['product'], 'headerName': prod_det['name']} for prod_det in products],
+                                                            {'field': 'uom', 'headerName': 'UOM'},
+                                                        ],
+                                                        rowData=data['bom']
+                                                    )
+                                                ])
+                                            )
+                                        ], className='col-lg-6'),
+                                    ], className='row mt-2'),
                                     html.Div([
-                                        dbc.Card(
-                                            dbc.CardBody([
-                                                html.Div([
+                                        html.Div([
+                                            dbc.Card(
+                                                dbc.CardBody([
+                                                    html.H3('Departments'),
+                                                    dag.AgGrid(
+                                                        id='dept_grid',
+                                                        defaultColDef={'editable':True},
+                                                        columnSize='responsiveSizeToFit',
+                                                        columnDefs=[
+                                                            {'field': 'dept', 'headerName': 'Department'},
+                                                            *[{'field': prod_det['product'], 'headerName': f"{prod_det['name']} (Seconds)"} for prod_det in products],
+                                                            {'field': 'capacity', 'headerName': 'Capacity (Hours)'},
+                                                        ],
+                                                        rowData=data['dept']
+                                                    )
+                                                ])
+                                            )
+                                        ], className='col-lg-6'),
+                                        html.Div([
+                                            dbc.Card(
+                                                dbc.CardBody([
                                                     html.Div([
                                                         html.Div([
-                                                            html.H3('Finance')
-                                                        ], className='col-12')
-                                                    ], className='row'),
-                                                    html.Div([
-                                                        html.Div([
-                                                            html.Span("Economy Price ($)")
-                                                        ], className='col-3'),
-                                                        html.Div([
-                                                            dcc.Input(
-                                                                id='economy_price_input',
-                                                                value=data['economy_price'],
-                                                                type='number',
-                                                                min=0.01,
-                                                                max=10.00,
-                                                                step=0.01
-                                                            )   
-                                                        ], className='col-3'),
-                                                        html.Div([
-                                                            html.Span('Shop Labor ($/minute)')
-                                                        ], className='col-3'),
+                                                            html.Div([
+                                                                html.H3('Finance')
+                                                            ], className='col-12')
+                                                        ], className='row'),
                                                         html.Div([
-                                                            dcc.Input(
-                                                                id='shop_rate_input',
-                                                                value=data['shop_labor_rate'],
-                                                                type='number',
-                                                                min=0.01,
-                                                                max=10.00,
-                                                                step=0.01
-                                                            )
-                                                        ], className='col-3')                    
-                                                    ], className='row'),
-                                                    html.Div([
-                                                        html.Div([
-                                                            html.Span("Deluxe Price ($)")
-                                                        ], className='col-3'),
-                                                        html.Div([
-                                                            dcc.Input(
-                                                                id='deluxe_price_input',
-                                                                value=data['deluxe_price'],
-                                                                type='number',
-                                                                min=0.01,
-                                                                max=10.00,
-                                                                step=0.01
-                                                            )   
-                                                        ], className='col-3')
-                                                    ], className='row mt-2')
-                                                ], className='container-fluid')
-                                            ]), style={'height':'100%'}
-                                        )
-                                    ], className='col-lg-6')
-                                ], className='row mt-2')
-                            ], className='container-fluid')
-                        ], label='Data Maint.')
+                                                            html.Div([
+                                                                html.Span('Shop Labor ($/minute)')
+                                                            ], className='col-3'),
+                                                            html.Div([
+                                                                dcc.Input(
+                                                                    id='shop_rate_input',
+                                                                    value=data['shop_labor_rate'],
+                                                                    type='number',
+                                                                    min=0.01,
+                                                                    max=10.00,
+                                                                    step=0.01
+                                                                )
+                                                            ], className='col-3')                    
+                                                        ], className='row'),
+                                                        *[gen_price_row(prod_det) for prod_det in products]
+                                                    ], className='container-fluid')
+                                                ]), style={'height':'100%'}
+                                            )
+                                        ], className='col-lg-6')
+                                    ], className='row mt-2')
+                                ], className='container-fluid')
+                            ], label='Data Maint.')
+                        ])
                     ])
-                ])
-            )
-        ], className='col-12')
-    ], className='row mt-2')
-], className='container-fluid mt-1')
+                )
+            ], className='col-12')
+        ], className='row mt-2'),
+        dcc.Store(id='load_coeffs'),
+        dcc.Store(id='plan_region'),
+        dcc.Store(id='plan_fixed_units'),
+        dcc.Store(id='solve_request'),
+        dcc.Store(id='sweep_partial'),
+        dcc.Store(id='sweep_result'),
+        dcc.Store(id='session_token', data=session_token)
+    ], className='container-fluid mt-1')
 
+app.layout = serve_layout
 
-clientside_callback(
-    """
-    function(knob_value){
-        return "Economy Units: " + knob_value.toLocaleString(undefined, {maximumFractionDigits:1})
-    }
-    """,
-    Output('economy_knob_label', 'children'),
-    Input('economy_units_knob', 'value')
-)
 
 clientside_callback(
     """
     function(knob_value){
-        return "Deluxe Units: " + knob_value.toLocaleString(undefined, {maximumFractionDigits:1})
+        return knob_value.toLocaleString(undefined, {maximumFractionDigits:1})
     }
     """,
-    Output('deluxe_knob_label', 'children'),
-    Input('deluxe_units_knob', 'value')
+    Output({'type': 'knob_label', 'index': MATCH}, 'children'),
+    Input({'type': 'units_knob', 'index': MATCH}, 'value')
 )
 
 
-def calc_bar_color(load_frac: float) -> str:
-    return 'crimson' if load_frac > 1 else 'lightslategray'
-
-def gen_dept_load_figure(econ_units, deluxe_units, ui_data) -> Dict[go.Figure, pd.DataFrame]:
-    dept_loads = []
-    bar_colors = []
-    bar_txts = []
-    for item in ui_data['dept']:
-        load = econ_units*item['economy']/3600 + deluxe_units*item['deluxe']/3600
-        load_frac = load/item['capacity']
-        bar_colors.append(calc_bar_color(load_frac))
-        dept_loads.append({
-            'dept': item['dept'],
-            'load': load,
-            'load_frac': load_frac,
-            'capacity': item['capacity']
-        })
-        bar_txts.append(f"{load_frac*100:.1f}%")
-    dept_load_df = pd.DataFrame(dept_loads)
-    
-    traces = [
-        go.Bar(name='Capacity', 
-            x=dept_load_df['dept'], 
-            y=dept_load_df['load_frac'], 
-            marker_color=bar_colors,
-            text=bar_txts,
-            textposition='auto'
-            )
-    ]
-
-    layout = {
-        'title': {'text':'Department Loads', 'font': {'size': 25}}
-    }
+def csr_json(mat) -> dict:
+    return {'indptr': mat.indptr.tolist(), 'indices': mat.indices.tolist(), 'data': mat.data.tolist()}
 
-    fig =go.Figure(data=traces, layout=layout)
-    return fig, dept_load_df
-
-def gen_inv_load_figure(econ_units, deluxe_units, ui_data) -> Dict[go.Figure, pd.DataFrame]:
-    part_loads = []
-    bar_colors = []
-    bar_txts = []
-    for bom_item in ui_data['bom']:
-        inv_det = next((p for p in ui_data['parts'] if p['part'] == bom_item['part']), None)
-        econ_unit_burden = bom_item['economy'] if bom_item['uom'] != 'OZ' else bom_item['economy']/16
-        deluxe_unit_burden = bom_item['deluxe'] if bom_item['uom'] != 'OZ' else bom_item['deluxe']/16
-
-        total_burden = econ_units*econ_unit_burden +  deluxe_units*deluxe_unit_burden
-        capacity = inv_det['inv']
-        load_frac = total_burden/capacity
-        bar_colors.append(calc_bar_color(load_frac))
-        bar_txts.append(f"{load_frac*100:.1f}%")
-        part_loads.append({
-            'part': bom_item['part'],
-            'load': total_burden,
-            'load_frac': load_frac,
-            'capacity': capacity
-        })
-    
-    part_loads_df = pd.DataFrame(part_loads)
-
-    traces = [
-        go.Bar(name='Inventory',
-            x=part_loads_df['part'],
-            y=part_loads_df['load_frac'],
-            marker_color=bar_colors,
-            text=bar_txts,
-            textposition='auto'
-        )
-    ]
-
-    layout = {
-        'title': {'text':'Inventory Loads', 'font': {'size': 25}}
+def gen_load_coeffs(problem: CompiledProblem) -> dict:
+    """Per-unit loads, capacities and unit profits the browser needs to redraw the charts for any knob values."""
+    return {
+        'products': problem.products,
+        'depts': problem.depts,
+        'parts': problem.parts,
+        'dept_time': csr_json(problem.dept_time),
+        'bom': csr_json(problem.bom),
+        'dept_capacity': problem.dept_capacity.tolist(),
+        'inv_capacity': problem.inv_capacity.tolist(),
+        'unit_profit': problem.unit_profit.tolist()
     }
 
-    return go.Figure(data=traces, layout=layout), part_loads_df
+def fmt_sens_value(value: float) -> str:
+    if math.isinf(value):
+        return '∞' if value > 0 else '-∞'
+    return f'{value:,.4f}'
+
+def gen_sens_rows(result: LPResult) -> Tuple[list, list]:
+    product_rows = [{
+        'product': prod_det['name'],
+        'units': fmt_sens_value(result.plan.get(prod_det['product'], 0)),
+        'reduced_cost': fmt_sens_value(result.reduced_costs[prod_det['product']]),
+        'price_low': fmt_sens_value(result.price_ranges[prod_det['product']][0]),
+        'price_high': fmt_sens_value(result.price_ranges[prod_det['product']][1])
+    } for prod_det in products if prod_det['product'] in result.reduced_costs]
+
+    constraint_rows = []
+    for row_type, duals, ranges in [('Department', result.dept_duals, result.dept_ranges), ('Inventory', result.inv_duals, result.inv_ranges)]:
+        for name, dual in duals.items():
+            constraint_rows.append({
+                'constraint': name,
+                'type': row_type,
+                'shadow_price': fmt_sens_value(dual),
+                'rhs_low': fmt_sens_value(ranges[name][0]),
+                'rhs_high': fmt_sens_value(ranges[name][1])
+            })
+    return product_rows, constraint_rows
+
+GRID_TABLES = {'parts_grid': 'parts', 'bom_grid': 'bom', 'dept_grid': 'dept'}
 
-def gen_results_card(econ_units, deluxe_units, dept_df: pd.DataFrame, inv_df: pd.DataFrame) -> Tuple[list, str]:
-    is_feasible = True
-    if dept_df[dept_df['load_frac'] > 1].shape[0] > 0 or inv_df[inv_df['load_frac'] > 1].shape[0]:
-        is_feasible = False
+@callback(
+    Output('session_token', 'data'),
+    Output('parts_grid', 'rowData'),
+    Output('bom_grid', 'rowData'),
+    Output('dept_grid', 'rowData'),
+    Input('parts_grid', 'cellValueChanged'),
+    Input('bom_grid', 'cellValueChanged'),
+    Input('dept_grid', 'cellValueChanged'),
+    Input({'type': 'price_input', 'index': ALL}, 'value'),
+    Input('shop_rate_input', 'value'),
+    State('session_token', 'data'),
+    prevent_initial_call=True
+)
+@instrumented('record_edit')
+def record_edit(parts_edit, bom_edit, dept_edit, price_values, shop_rate, session_token):
+    """Logs the triggering edit against the session's server-side data and bumps its version.
 
-    soln_status = 'Feasible'
-    className= 'center' 
-    if not is_feasible:
-        className += ' infeasible'
-        soln_status = 'InFeasible'
+    A rejected grid edit leaves the version alone and resets that grid to the session's rows, undoing the cell.
+    """
+    trigger = ctx.triggered_id
+    if isinstance(trigger, str) and trigger in GRID_TABLES:
+        edit = cell_edit(GRID_TABLES[trigger], ctx.triggered[0]['value'])
+    elif trigger == 'shop_rate_input':
+        edit = shop_rate_edit(shop_rate)
     else:
-        className += ' feasible'
-
-    inner_div = html.Div([
-        html.H3(f'Solution Status: {soln_status}', className='text-center')
-    ])
-    if is_feasible:
-        inner_div.children.append(html.H3(f"Profit Contribution: ${calc_profit(econ_units, deluxe_units):,.2f}", className='text-center'))
-    body_items = [inner_div]
-    return body_items, className
-
-def calc_profit(econ_units, deluxe_units) -> float:
-    gross_rev = econ_units*data['economy_price'] + deluxe_units*data['deluxe_price']
-    labor_costs = 0
-    for dept in data['dept']:
-        labor_costs += (econ_units*dept['economy']/3600 + deluxe_units*dept['deluxe']/3600)*data['shop_labor_rate']*60
-
-    matl_costs = 0
-    for part_det in data['parts']:
-        unit_cost = float(part_det['cost'])
-        part_bom = next((b for b in data['bom'] if b['part'] == part_det['part']), None)
-        econ_part_unit_used = part_bom['economy']
-        deluxe_part_unit_used = part_bom['deluxe']
-        if part_bom['uom'] == 'OZ':
-            econ_part_unit_used = econ_part_unit_used/16
-            deluxe_part_unit_used = deluxe_part_unit_used/16
-        matl_costs += (econ_units*econ_part_unit_used + deluxe_units*deluxe_part_unit_used)*unit_cost
-    return gross_rev - labor_costs - matl_costs
-
-def cond_ui_data(econ_price, deluxe_price, shop_rate, dept_rows, bom_rows, part_rows) -> dict:    
-    for dept in dept_rows:
-        dept['economy'] = float(dept['economy'])
-        dept['deluxe'] = float(dept['deluxe'])
-        dept['capacity'] = float(dept['capacity'])
-
-    for part in part_rows:
-        part['cost'] = float(part['cost'])
-        part['inv'] = float(part['inv'])
-
-    for part in bom_rows:
-        part['economy'] = float(part['economy'])
-        part['deluxe'] = float(part['deluxe'])
-
-    return {
-        'economy_price': econ_price,
-        'deluxe_price': deluxe_price,
-        'shop_labor_rate': shop_rate,
-        'parts': part_rows,
-        'bom': bom_rows,
-        'dept': dept_rows
-    }
+        price = next(item['value'] for item in ctx.inputs_list[3] if item['id'] == trigger)
+        edit = price_edit(trigger['index'], price)
+    try:
+        return session_store.record_edit(session_token, edit), no_update, no_update, no_update
+    except SessionExpired:
+        return no_update, no_update, no_update, no_update
+    except EditRejected:
+        table = GRID_TABLES[trigger]
+        rows = load_session(session_token)[table]
+        return (no_update, *[rows if grid_table == table else no_update for grid_table in GRID_TABLES.values()])
+
+def solve_outputs(result: LPResult, integer: bool, status_msg: str) -> tuple:
+    """Knob values, sensitivity rows and status message shown for a solve result."""
+    if result.mip_gap is not None:
+        status_msg += f', gap {result.mip_gap:.2%}'
+    # An integer search stopped by its time limit still returns its best ('feasible') plan.
+    if result.status != 'optimal' and not (integer and result.status == 'feasible'):
+        return [no_update]*len(ctx.outputs_list[0]), [], [], f'No optimal solution found ({result.status}).'
+    product_rows, constraint_rows = gen_sens_rows(result)
+    round_units = round if integer else math.floor
+    knob_values = [round_units(result.plan[knob['id']['index']]) for knob in ctx.outputs_list[0]]
+    return knob_values, product_rows, constraint_rows, status_msg
+
+def solve_cache_key(ui_data: dict, integer: bool) -> str:
+    return canonical_key(ui_data, f'lp_result:integer:{MIP_GAP}' if integer else 'lp_result')
 
 @callback(
-    Output('economy_units_knob', 'value'),
-    Output('deluxe_units_knob', 'value'),
+    Output({'type': 'units_knob', 'index': ALL}, 'value'),
+    Output('product_sens_grid', 'rowData'),
+    Output('constraint_sens_grid', 'rowData'),
+    Output('solve_status', 'children'),
+    Output('solve_request', 'data'),
     Input('run_model_btn', 'n_clicks'),
-    State("economy_price_input", "value"),
-    State('deluxe_price_input', 'value'),
-    State('shop_rate_input', 'value'),
-    State('dept_grid', 'rowData'),
-    State('bom_grid', 'rowData'),
-    State('parts_grid', 'rowData'),
+    State('session_token', 'data'),
+    State('integer_mode_switch', 'value'),
     prevent_initial_call=True
 )
-def run_lp_model(_, econ_price, deluxe_price, shop_rate, dept_rows, bom_rows, part_rows):
-    ui_data = cond_ui_data(econ_price, deluxe_price, shop_rate, dept_rows, bom_rows, part_rows)
-    econ_units, deluxe_units = solve_lp_model(ui_data)
-    cond_econ_units, cond_deluxe_units = math.floor(econ_units), math.floor(deluxe_units)
-    return cond_econ_units, cond_deluxe_units
+@instrumented('run_lp_model')
+def run_lp_model(n_clicks, session_token, integer):
+    """Answers from the solution cache; only a miss is handed to run_lp_solve through solve_request."""
+    knobs_unchanged = [no_update]*len(ctx.outputs_list[0])
+    try:
+        ui_data = load_session(session_token)
+    except SessionExpired:
+        return knobs_unchanged, no_update, no_update, 'Session expired, please reload the page.', no_update
+    cached = soln_cache.get(solve_cache_key(ui_data, integer))
+    if cached is None:
+        return knobs_unchanged, no_update, no_update, no_update, {'session_token': session_token, 'integer': bool(integer), 'n_clicks': n_clicks}
+    return *solve_outputs(LPResult(**cached), integer, 'Re-used a cached solution'), no_update
 
 @callback(
+    Output({'type': 'units_knob', 'index': ALL}, 'value', allow_duplicate=True),
+    Output('product_sens_grid', 'rowData', allow_duplicate=True),
+    Output('constraint_sens_grid', 'rowData', allow_duplicate=True),
+    Output('solve_status', 'children', allow_duplicate=True),
+    Input('solve_request', 'data'),
+    background=True,
+    manager=solver_job_manager,
+    interval=SOLVE_POLL_INTERVAL,
+    progress=[Output('solve_progress', 'children')],
+    running=[
+        (Output('solve_progress', 'style'), {'display': 'inline'}, {'display': 'none'}),
+        (Output('solve_status', 'style'), {'display': 'none'}, {'display': 'inline'}),
+    ],
+    # Clicking Run Model again while a solve is running terminates it.
+    cancel=[Input('run_model_btn', 'n_clicks')],
+    prevent_initial_call=True
+)
+@instrumented('run_lp_solve')
+def run_lp_solve(set_progress, request):
+    set_progress('Preparing model...')
+    start = time.perf_counter()
+    integer = request['integer']
+    try:
+        ui_data, problem = load_snapshot(request['session_token'])
+    except SessionExpired:
+        return no_update, no_update, no_update, 'Session expired, please reload the page.'
+    slot = acquire_solve_slot()
+    if slot is None:
+        return no_update, no_update, no_update, 'Solver is busy with other requests, please try again shortly.'
+    try:
+        set_progress('Solving...')
+        if integer:
+            result = solve_problem(problem, tee=SOLVER_TEE, time_limit=MIP_TIME_LIMIT, integer=True)
+        else:
+            result = solve_problem(problem, tee=SOLVER_TEE, time_limit=SOLVE_TIME_LIMIT)
+    finally:
+        release_solve_slot(slot)
+    if result.status == 'optimal':
+        soln_cache.put(solve_cache_key(ui_data, integer), asdict(result))
+    return solve_outputs(result, integer, f'Solved in {time.perf_counter() - start:.2f}s ({result.status})')
+
+@callback(
+    Output('load_coeffs', 'data'),
+    Input('session_token', 'data'),
+)
+@instrumented('update_load_coeffs')
+def update_load_coeffs(session_token):
+    try:
+        with timed('compile_problem'):
+            problem = get_problem(session_token)
+    except SessionExpired:
+        return no_update
+    with timed('gen_load_coeffs'):
+        return gen_load_coeffs(problem)
+
+# Knob changes are handled entirely in the browser (assets/load_charts.js).
+clientside_callback(
+    ClientsideFunction(namespace='pencil_prod', function_name='update_load_charts'),
     Output('dept_load_chart', 'figure'),
     Output('inv_load_chart', 'figure'),
-    Output('results_card_body', 'children'),
+    Output('soln_status_txt', 'children'),
+    Output('profit_txt', 'children'),
     Output('results_card_body', 'className'),
-    Input('economy_units_knob', 'value'),
-    Input('deluxe_units_knob', 'value'),
-    State("economy_price_input", "value"),
-    State('deluxe_price_input', 'value'),
-    State('shop_rate_input', 'value'),
-    State('dept_grid', 'rowData'),
-    State('bom_grid', 'rowData'),
-    State('parts_grid', 'rowData'),
+    Input({'type': 'units_knob', 'index': ALL}, 'value'),
+    Input('load_coeffs', 'data'),
+    State({'type': 'units_knob', 'index': ALL}, 'id'),
+)
+
+def gen_plan_region(session_token: str, prod_x: str, prod_y: str, fixed: dict, problem: CompiledProblem) -> dict:
+    """Feasible polygon for the two chosen products, with the other products fixed at their knob values."""
+    region = plan_region(problem, prod_x, prod_y, units_vector(problem, fixed), limit=KNOB_MAX)
+    names = {prod_det['product']: prod_det['name'] for prod_det in products}
+    return {
+        'session_token': session_token,
+        'prod_x': prod_x,
+        'prod_y': prod_y,
+        'x_name': names.get(prod_x, prod_x),
+        'y_name': names.get(prod_y, prod_y),
+        'fixed': fixed,
+        'vertices': region.vertices.tolist(),
+        'binding': [list(pair) for pair in region.binding],
+        'profit_x': region.profit_x,
+        'profit_y': region.profit_y,
+        'fixed_profit': region.fixed_profit,
+        'best': None if region.best is None else region.best.tolist(),
+        'best_profit': region.best_profit
+    }
+
+# Only the other products' knobs move the polygon, so the browser passes their units on through
+# plan_fixed_units and leaves it alone while the plotted products' knobs turn.
+clientside_callback(
+    ClientsideFunction(namespace='pencil_prod', function_name='update_plan_fixed_units'),
+    Output('plan_fixed_units', 'data'),
+    Input({'type': 'units_knob', 'index': ALL}, 'value'),
+    Input('plan_x_product', 'value'),
+    Input('plan_y_product', 'value'),
+    State({'type': 'units_knob', 'index': ALL}, 'id'),
+    State('plan_fixed_units', 'data'),
+)
+
+@callback(
+    Output('plan_region', 'data'),
+    Input('session_token', 'data'),
+    Input('plan_x_product', 'value'),
+    Input('plan_y_product', 'value'),
+    Input('plan_fixed_units', 'data'),
 )
-def update_post_calc(econ_units, deluxe_units, econ_price, deluxe_price, shop_rate, dept_rows, bom_rows, part_rows):
-    ui_data = cond_ui_data(econ_price, deluxe_price, shop_rate, dept_rows, bom_rows, part_rows)
-    dept_fig, dept_df = gen_dept_load_figure(econ_units, deluxe_units, ui_data)
-    inv_fig, inv_df = gen_inv_load_figure(econ_units, deluxe_units, ui_data)
-    results_body, results_class = gen_results_card(econ_units, deluxe_units, dept_df, inv_df)
-    return dept_fig, inv_fig, results_body, results_class
+@instrumented('update_plan_region')
+def update_plan_region(session_token, prod_x, prod_y, fixed):
+    # The plan point and iso-profit line are drawn in the browser (assets/plan_view.js).
+    if prod_x == prod_y:
+        return None
+    try:
+        problem = get_problem(session_token)
+    except SessionExpired:
+        return no_update
+    with timed('plan_region'):
+        return gen_plan_region(session_token, prod_x, prod_y, fixed or {}, problem)
 
+clientside_callback(
+    ClientsideFunction(namespace='pencil_prod', function_name='update_plan_view'),
+    Output('plan_view_chart', 'figure'),
+    Input({'type': 'units_knob', 'index': ALL}, 'value'),
+    Input('plan_region', 'data'),
+    State({'type': 'units_knob', 'index': ALL}, 'id'),
+)
+
+def parse_sweep_param(param_key: str) -> Tuple[str, str]:
+    kind, target = param_key.split('|', 1)
+    return kind, target or None
+
+@callback(
+    Output({'type': 'sweep_start', 'index': MATCH}, 'value'),
+    Output({'type': 'sweep_stop', 'index': MATCH}, 'value'),
+    Input({'type': 'sweep_param', 'index': MATCH}, 'value'),
+    State('session_token', 'data'),
+    prevent_initial_call=True
+)
+def fill_sweep_range(param_key, session_token):
+    """Suggests half to one and a half times the parameter's current value."""
+    if not param_key:
+        return None, None
+    try:
+        value = current_value(load_session(session_token), *parse_sweep_param(param_key))
+    except (SessionExpired, StopIteration):
+        return no_update, no_update
+    return round(value*0.5, 4), round(value*1.5, 4)
+
+SWEEP_PROGRESS_INTERVAL = 0.5
+
+def sweep_payload(params: list, labels: list, points: list, n_points: int) -> dict:
+    """Grid axes and the points solved so far, for assets/sweep_charts.js."""
+    return {
+        'labels': labels,
+        'axes': [param.values for param in params],
+        'products': [prod_det['product'] for prod_det in products],
+        'names': [prod_det['name'] for prod_det in products],
+        'n_points': n_points,
+        'points': [{
+            'index': list(point.index),
+            'objective': point.objective if point.status == 'optimal' else None,
+            'units': [point.plan.get(prod_det['product'], 0) if point.status == 'optimal' else None for prod_det in products]
+        } for point in points]
+    }
+
+@callback(
+    Output('sweep_result', 'data'),
+    Output('sweep_status', 'children'),
+    Input('run_sweep_btn', 'n_clicks'),
+    State('session_token', 'data'),
+    State({'type': 'sweep_param', 'index': ALL}, 'value'),
+    State({'type': 'sweep_start', 'index': ALL}, 'value'),
+    State({'type': 'sweep_stop', 'index': ALL}, 'value'),
+    State({'type': 'sweep_steps', 'index': ALL}, 'value'),
+    background=True,
+    progress=[Output('sweep_partial', 'data'), Output('sweep_progress', 'children')],
+    running=[
+        (Output('run_sweep_btn', 'disabled'), True, False),
+        (Output('cancel_sweep_btn', 'disabled'), False, True),
+        (Output('sweep_progress', 'style'), {'display': 'inline'}, {'display': 'none'}),
+        (Output('sweep_status', 'style'), {'display': 'none'}, {'display': 'inline'}),
+    ],
+    cancel=[Input('cancel_sweep_btn', 'n_clicks')],
+    prevent_initial_call=True
+)
+@instrumented('run_sweep')
+def run_sweep(set_progress, _, session_token, param_keys, starts, stops, steps):
+    params, labels = [], []
+    option_labels = {option['value']: option['label'] for option in sweep_param_options()}
+    for param_key, start, stop, n_steps in zip(param_keys, starts, stops, steps):
+        if not param_key:
+            continue
+        if start is None or stop is None:
+            return no_update, 'Enter a range for every parameter.'
+        kind, target = parse_sweep_param(param_key)
+        params.append(SweepParam(kind, target, param_values(start, stop, n_steps or 1)))
+        labels.append(option_labels.get(param_key, params[-1].label))
+    n_points = math.prod(len(param.values) for param in params)
+    if not params or n_points > SWEEP_MAX_POINTS:
+        return no_update, f'Choose a parameter and at most {SWEEP_MAX_POINTS:,} points.'
+    try:
+        ui_data = load_session(session_token)
+    except SessionExpired:
+        return no_update, 'Session expired, please reload the page.'
+
+    slot = acquire_solve_slot()
+    if slot is None:
+        return no_update, 'Solver is busy with other requests, please try again shortly.'
+    start_time = time.perf_counter()
+    points = []
+    last_progress = start_time
+    try:
+        for point in sweep(ui_data, params, time_limit=SOLVE_TIME_LIMIT):
+            points.append(point)
+            if time.perf_counter() - last_progress > SWEEP_PROGRESS_INTERVAL:
+                last_progress = time.perf_counter()
+                # Sweeps are not killed at JOB_TIME_LIMIT, but each point solve is limited to SOLVE_TIME_LIMIT.
+                renew_solve_slot(slot)
+                set_progress((sweep_payload(params, labels, points, n_points), f'Solved {len(points):,} of {n_points:,} points...'))
+    finally:
+        release_solve_slot(slot)
+    elapsed = time.perf_counter() - start_time
+    return sweep_payload(params, labels, points, n_points), f'Solved {n_points:,} points in {elapsed:.2f}s ({n_points/elapsed:,.0f} points/s)'
+
+# Partial results stream into sweep_partial while the sweep runs; the final grid lands in sweep_result.
+clientside_callback(
+    ClientsideFunction(namespace='pencil_prod', function_name='update_sweep_charts'),
+    Output('sweep_profit_chart', 'figure'),
+    Output('sweep_mix_chart', 'figure'),
+    Input('sweep_partial', 'data'),
+    Input('sweep_result', 'data'),
+)
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
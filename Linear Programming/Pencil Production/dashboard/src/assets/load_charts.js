@@ -0,0 +1,61 @@
+// Recomputes the load charts and results card in the browser from the coefficients in the
+// load_coeffs store, so dragging a knob never waits on the server.
+function csrMatVec(mat, units) {
+    const loads = new Array(mat.indptr.length - 1).fill(0);
+    for (let i = 0; i < loads.length; i++) {
+        for (let k = mat.indptr[i]; k < mat.indptr[i + 1]; k++) {
+            loads[i] += mat.data[k] * units[mat.indices[k]];
+        }
+    }
+    return loads;
+}
+
+function loadFigure(title, names, loads, capacity) {
+    const loadFrac = loads.map((load, i) => load / capacity[i]);
+    return {
+        data: [{
+            type: 'bar',
+            name: title === 'Department Loads' ? 'Capacity' : 'Inventory',
+            x: names,
+            y: loadFrac,
+            marker: {color: loadFrac.map(frac => frac > 1 ? 'crimson' : 'lightslategray')},
+            text: loadFrac.map(frac => (frac * 100).toFixed(1) + '%'),
+            textposition: 'auto'
+        }],
+        layout: {title: {text: title, font: {size: 25}}},
+        loadFrac: loadFrac
+    };
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside);
+window.dash_clientside.pencil_prod = Object.assign({}, window.dash_clientside.pencil_prod, {
+    update_load_charts: function(knobValues, coeffs, knobIds) {
+        if (!coeffs) {
+            return window.dash_clientside.no_update;
+        }
+        const units = new Array(coeffs.products.length).fill(0);
+        knobIds.forEach((knobId, i) => {
+            const j = coeffs.products.indexOf(knobId.index);
+            if (j >= 0) {
+                units[j] = Number(knobValues[i]) || 0;
+            }
+        });
+
+        const dept = loadFigure('Department Loads', coeffs.depts, csrMatVec(coeffs.dept_time, units), coeffs.dept_capacity);
+        const inv = loadFigure('Inventory Loads', coeffs.parts, csrMatVec(coeffs.bom, units), coeffs.inv_capacity);
+        const isFeasible = !dept.loadFrac.some(frac => frac > 1) && !inv.loadFrac.some(frac => frac > 1);
+
+        let profitTxt = '';
+        if (isFeasible) {
+            const profit = coeffs.unit_profit.reduce((total, unitProfit, j) => total + unitProfit * units[j], 0);
+            profitTxt = 'Profit Contribution: $' + profit.toLocaleString('en-US', {minimumFractionDigits: 2, maximumFractionDigits: 2});
+        }
+        return [
+            {data: dept.data, layout: dept.layout},
+            {data: inv.data, layout: inv.layout},
+            'Solution Status: ' + (isFeasible ? 'Feasible' : 'InFeasible'),
+            profitTxt,
+            'center ' + (isFeasible ? 'feasible' : 'infeasible')
+        ];
+    }
+});
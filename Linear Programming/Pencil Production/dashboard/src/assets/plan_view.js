@@ -0,0 +1,90 @@
+// Draws the plan view from the feasible polygon in the plan_region store: the current knob plan and
+// its iso-profit line follow the knobs in the browser, the polygon only changes on the server.
+function fmtMoney(value) {
+    return '$' + value.toLocaleString('en-US', {minimumFractionDigits: 2, maximumFractionDigits: 2});
+}
+
+function isoProfitLine(region, level, xMax, name, dash) {
+    // profit_x * x + profit_y * y = level; points outside the axis ranges are clipped by Plotly.
+    let x, y;
+    if (Math.abs(region.profit_y) > 1e-12) {
+        x = [0, xMax];
+        y = x.map(xv => (level - region.profit_x * xv) / region.profit_y);
+    } else if (Math.abs(region.profit_x) > 1e-12) {
+        x = [level / region.profit_x, level / region.profit_x];
+        y = [0, 1e12];
+    } else {
+        return null;
+    }
+    return {type: 'scatter', mode: 'lines', name: name, x: x, y: y, line: {color: 'darkorange', dash: dash}, hoverinfo: 'name'};
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside);
+window.dash_clientside.pencil_prod = Object.assign({}, window.dash_clientside.pencil_prod, {
+    update_plan_fixed_units: function(knobValues, prodX, prodY, knobIds, current) {
+        // Units of the products that are not plotted; only a change to these needs a new polygon.
+        const fixed = {};
+        knobIds.forEach((knobId, i) => {
+            if (knobId.index !== prodX && knobId.index !== prodY) {
+                fixed[knobId.index] = Number(knobValues[i]) || 0;
+            }
+        });
+        if (current && JSON.stringify(current) === JSON.stringify(fixed)) {
+            return window.dash_clientside.no_update;
+        }
+        return fixed;
+    },
+
+    update_plan_view: function(knobValues, region, knobIds) {
+        if (!region) {
+            return {data: [], layout: {title: {text: 'Plan View: choose two different products', font: {size: 25}}}};
+        }
+        const knobValue = product => {
+            const i = knobIds.findIndex(knobId => knobId.index === product);
+            return i >= 0 ? Number(knobValues[i]) || 0 : 0;
+        };
+        const plan = [knobValue(region.prod_x), knobValue(region.prod_y)];
+        const planProfit = region.profit_x * plan[0] + region.profit_y * plan[1];
+        const xs = region.vertices.map(v => v[0]);
+        const ys = region.vertices.map(v => v[1]);
+        const xMax = Math.max(1, plan[0], ...xs) * 1.1;
+        const yMax = Math.max(1, plan[1], ...ys) * 1.1;
+
+        const data = [];
+        if (region.vertices.length) {
+            data.push({
+                type: 'scatter', mode: 'lines+markers', name: 'Feasible plans', fill: 'toself',
+                x: xs.concat([xs[0]]), y: ys.concat([ys[0]]),
+                text: region.binding.concat([region.binding[0]]).map(pair => pair.join(' / ')),
+                hovertemplate: '%{x:,.1f}, %{y:,.1f}<br>%{text}<extra></extra>',
+                line: {color: 'lightslategray'}, fillcolor: 'rgba(119, 136, 153, 0.3)'
+            });
+            data.push({
+                type: 'scatter', mode: 'markers', name: 'Best plan ' + fmtMoney(region.best_profit),
+                x: [region.best[0]], y: [region.best[1]], marker: {symbol: 'star', size: 16, color: 'darkorange'}
+            });
+            const best = isoProfitLine(region, region.best[0] * region.profit_x + region.best[1] * region.profit_y, xMax, 'Best iso-profit', 'dash');
+            if (best) {
+                data.push(best);
+            }
+        }
+        const current = isoProfitLine(region, planProfit, xMax, 'Iso-profit ' + fmtMoney(planProfit + region.fixed_profit), 'solid');
+        if (current) {
+            data.push(current);
+        }
+        data.push({
+            type: 'scatter', mode: 'markers', name: 'Current plan', x: [plan[0]], y: [plan[1]],
+            marker: {size: 12, color: '#007bff'}
+        });
+
+        const title = region.vertices.length ? 'Plan View' : 'Plan View: no feasible plan for the fixed products';
+        return {
+            data: data,
+            layout: {
+                title: {text: title, font: {size: 25}},
+                xaxis: {title: {text: region.x_name + ' Units'}, range: [0, xMax]},
+                yaxis: {title: {text: region.y_name + ' Units'}, range: [0, yMax]}
+            }
+        };
+    }
+});
@@ -0,0 +1,58 @@
+// Draws the sweep charts from the points solved so far (sweep_partial) or the finished grid
+// (sweep_result).  One parameter gives a profit curve and the product mix along it; two give a
+// profit heatmap with the mix in the hover text.
+function fmtUnits(value) {
+    return value.toLocaleString('en-US', {maximumFractionDigits: 1});
+}
+
+function sweepProfitCurve(sweep) {
+    const profit = new Array(sweep.axes[0].length).fill(null);
+    const units = sweep.products.map(() => new Array(sweep.axes[0].length).fill(null));
+    sweep.points.forEach(point => {
+        profit[point.index[0]] = point.objective;
+        point.units.forEach((value, j) => { units[j][point.index[0]] = value; });
+    });
+    const profitFig = {
+        data: [{type: 'scatter', mode: 'lines+markers', name: 'Profit', x: sweep.axes[0], y: profit, line: {color: '#007bff'}}],
+        layout: {title: {text: 'Profit Contribution', font: {size: 25}}, xaxis: {title: {text: sweep.labels[0]}}, yaxis: {title: {text: '$'}}}
+    };
+    const mixFig = {
+        data: sweep.names.map((name, j) => ({type: 'bar', name: name, x: sweep.axes[0], y: units[j]})),
+        layout: {title: {text: 'Product Mix', font: {size: 25}}, barmode: 'stack', xaxis: {title: {text: sweep.labels[0]}}, yaxis: {title: {text: 'Units'}}}
+    };
+    return [profitFig, mixFig];
+}
+
+function sweepProfitHeatmap(sweep) {
+    const [xs, ys] = sweep.axes;
+    const z = ys.map(() => new Array(xs.length).fill(null));
+    const text = ys.map(() => new Array(xs.length).fill(''));
+    sweep.points.forEach(point => {
+        const [i, j] = point.index;
+        z[j][i] = point.objective;
+        text[j][i] = point.objective === null ? 'Infeasible' : sweep.names.map((name, k) => name + ': ' + fmtUnits(point.units[k])).join('<br>');
+    });
+    const profitFig = {
+        data: [{
+            type: 'heatmap', x: xs, y: ys, z: z, text: text, colorscale: 'Blues', colorbar: {title: {text: '$'}},
+            hovertemplate: '%{x:,.4g}, %{y:,.4g}<br>Profit: $%{z:,.2f}<br>%{text}<extra></extra>'
+        }],
+        layout: {title: {text: 'Profit Contribution', font: {size: 25}}, xaxis: {title: {text: sweep.labels[0]}}, yaxis: {title: {text: sweep.labels[1]}}}
+    };
+    const mixFig = {
+        data: [],
+        layout: {title: {text: 'Product Mix: hover the heatmap', font: {size: 25}}}
+    };
+    return [profitFig, mixFig];
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside);
+window.dash_clientside.pencil_prod = Object.assign({}, window.dash_clientside.pencil_prod, {
+    update_sweep_charts: function(partial, result) {
+        const sweep = partial || result;
+        if (!sweep) {
+            return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+        }
+        return sweep.axes.length > 1 ? sweepProfitHeatmap(sweep) : sweepProfitCurve(sweep);
+    }
+});
@@ -0,0 +1,157 @@
+"""Best-first branch and bound for integer plans on top of the in-process simplex engine.
+
+Every node is the LP relaxation plus the bound rows added by its branches.  A child appends one row
+to its parent, so the parent's optimal basis plus the new row's slack is dual feasible and the
+child is re-optimized with a few dual simplex pivots instead of from scratch.
+
+An incumbent is found before branching by rounding the root relaxation down and greedily filling
+the remaining capacity, and the same heuristic is tried on the relaxation of each node, so a good
+integer plan is available whenever the time limit stops the search.
+"""
+from dataclasses import dataclass
+import heapq
+import itertools
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from simplex import solve_lp, TOL
+
+INT_TOL = 1e-6
+
+@dataclass
+class MILPResult:
+    """`status` is 'optimal' when `gap` reached the target, 'feasible' when the search stopped with an
+    incumbent, otherwise the status of the root relaxation or of the limit that stopped the search
+    ('time_limit', 'node_limit', or a node relaxation's 'iteration_limit') without one.
+    `bound` is the best objective any integer plan could still reach.
+    """
+    status: str
+    x: np.ndarray
+    objective: float
+    bound: float
+    gap: float
+    nodes: int
+
+def relative_gap(objective: float, bound: float) -> float:
+    return abs(bound - objective)/max(1.0, abs(objective))
+
+def round_heuristic(c, A, b, x: np.ndarray, maximize: bool = True) -> Optional[np.ndarray]:
+    """Rounds `x` down and fills the leftover capacity of A @ x <= b with the most profitable columns."""
+    A = A.tocsc() if hasattr(A, 'tocsc') else np.asarray(A, dtype=float)
+    profit = np.asarray(c, dtype=float)*(1 if maximize else -1)
+    x = np.floor(np.maximum(x, 0) + INT_TOL)
+    slack = np.asarray(b, dtype=float) - A @ x
+    if (slack < -TOL*max(1.0, np.abs(b).max(initial=0))).any():
+        return None
+    for j in np.argsort(-profit):
+        if profit[j] <= 0:
+            break
+        col = A[:, j].toarray().ravel() if hasattr(A, 'toarray') else A[:, j]
+        used = col > 0
+        if (col < 0).any() or not used.any():
+            continue
+        units = np.floor((np.maximum(slack[used], 0)/col[used]).min() + INT_TOL)
+        if units > 0:
+            x[j] += units
+            slack -= units*col
+    return x
+
+def _with_bounds(A: np.ndarray, b: np.ndarray, bounds: List[Tuple[int, str, float]]) -> Tuple[np.ndarray, np.ndarray, list]:
+    n = A.shape[1]
+    rows = np.zeros((len(bounds), n))
+    rhs = np.zeros(len(bounds))
+    senses = []
+    for k, (j, sense, value) in enumerate(bounds):
+        rows[k, j] = 1.0
+        rhs[k] = value
+        senses.append(sense)
+    return np.vstack([A, rows]), np.concatenate([b, rhs]), ['<=']*A.shape[0] + senses
+
+def _child_basis(parent_basis: Optional[np.ndarray], n: int, m_parent: int) -> Optional[np.ndarray]:
+    """The parent's basis with slack columns renumbered for one extra row, plus that row's slack."""
+    if parent_basis is None:
+        return None
+    basis = np.array(parent_basis, dtype=int)
+    if (basis >= n + m_parent).any():
+        return None
+    return np.append(basis, n + m_parent)
+
+def solve_milp(c, A, b, maximize: bool = True, time_limit: Optional[float] = None, mip_gap: float = 1e-4,
+               max_nodes: int = 100000) -> MILPResult:
+    """Integer solution of c @ x subject to A @ x <= b, x >= 0 and integral.
+
+    Stops once the relative gap between the incumbent and the best remaining bound is at most `mip_gap`,
+    or when `time_limit` seconds or `max_nodes` relaxations have been spent, returning the incumbent.
+    """
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    A = A.toarray() if hasattr(A, 'toarray') else np.asarray(A, dtype=float)
+    b = np.asarray(b, dtype=float)
+    c = np.asarray(c, dtype=float)
+    profit = c if maximize else -c
+    m, n = A.shape
+
+    root = solve_lp(profit, A, b, maximize=True, time_limit=time_limit)
+    if root.status != 'optimal':
+        return MILPResult(root.status, np.zeros(n), 0.0, float('nan'), float('inf'), 1)
+
+    incumbent = round_heuristic(profit, A, b, root.x)
+    best = float(profit @ incumbent) if incumbent is not None else -np.inf
+    counter = itertools.count()
+    # Max-heap on the relaxation bound: (-bound, tie breaker, bound rows, x, basis).
+    heap = [(-root.objective, next(counter), [], root.x, root.basis)]
+    # Bound of the subproblems whose relaxation stopped at a time or iteration limit; they stay open.
+    unsolved_bound = -np.inf
+    nodes = 1
+    status = 'optimal'
+
+    while heap:
+        bound = max(-heap[0][0], unsolved_bound)
+        if best > -np.inf and relative_gap(best, bound) <= mip_gap:
+            break
+        if deadline is not None and time.perf_counter() > deadline:
+            status = 'time_limit'
+            break
+        if nodes >= max_nodes:
+            status = 'node_limit'
+            break
+
+        neg_bound, _, bounds, x, basis = heapq.heappop(heap)
+        if -neg_bound <= best + TOL*max(1.0, abs(best)):
+            continue
+        frac = np.abs(x - np.round(x))
+        j = int(np.argmax(frac))
+        if frac[j] <= INT_TOL:
+            continue
+
+        for sense, value in (('<=', np.floor(x[j])), ('>=', np.ceil(x[j]))):
+            child_bounds = bounds + [(j, sense, value)]
+            A_child, b_child, senses = _with_bounds(A, b, child_bounds)
+            remaining = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            child = solve_lp(profit, A_child, b_child, senses, maximize=True, time_limit=remaining,
+                             basis=_child_basis(basis, n, m + len(bounds)))
+            nodes += 1
+            if child.status not in ('optimal', 'infeasible'):
+                # Unsolved, the child can still reach the parent's bound.
+                unsolved_bound = max(unsolved_bound, -neg_bound)
+                status = child.status
+                continue
+            if child.status != 'optimal' or child.objective <= best + TOL*max(1.0, abs(best)):
+                continue
+            x_child = child.x[:n]
+            if np.all(np.abs(x_child - np.round(x_child)) <= INT_TOL):
+                incumbent, best = np.round(x_child), child.objective
+                continue
+            rounded = round_heuristic(profit, A, b, x_child)
+            if rounded is not None and profit @ rounded > best:
+                incumbent, best = rounded, float(profit @ rounded)
+            heapq.heappush(heap, (-child.objective, next(counter), child_bounds, x_child, child.basis))
+
+    if incumbent is None:
+        return MILPResult(status if heap or unsolved_bound > -np.inf else 'infeasible', np.zeros(n), 0.0, float('nan'), float('inf'), nodes)
+    bound = max(best, unsolved_bound, -heap[0][0] if heap else -np.inf)
+    gap = relative_gap(best, bound)
+    status = 'optimal' if gap <= mip_gap else 'feasible'
+    sign = 1 if maximize else -1
+    return MILPResult(status, incumbent, sign*best, sign*bound, gap, nodes)
@@ -0,0 +1,149 @@
+"""Feasible region of a production plan projected onto two products, with the others held fixed.
+
+Every department and inventory row becomes a half-plane a_x*x + a_y*y <= b - a_rest @ units_rest in
+the plane of the two chosen products, alongside x >= 0 and y >= 0.  The polygon is their
+intersection, found by sorting the half-planes by angle once and making a single pass with a deque
+(O(m log m)), so it follows any edit to the data instead of solving hand-picked pairs of
+constraints as the simplex notebooks do.
+"""
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from lp_data import CompiledProblem, stack_constraints
+
+EPS = 1e-9
+PLOT_LIMIT = 'plot limit'
+
+@dataclass
+class PlanRegion:
+    """`vertices` run counter-clockwise and `binding[k]` names the two constraints meeting at vertex k.
+
+    Profit over the plane is `profit_x*x + profit_y*y + fixed_profit`; `best` is the vertex where it
+    is largest, i.e. the optimal plan for the two products given the fixed units of the others.
+    """
+    prod_x: str
+    prod_y: str
+    vertices: np.ndarray
+    binding: List[Tuple[str, str]]
+    profit_x: float
+    profit_y: float
+    fixed_profit: float
+    best: Optional[np.ndarray]
+    best_profit: Optional[float]
+
+    @property
+    def feasible(self) -> bool:
+        return len(self.vertices) > 0
+
+def half_planes(problem: CompiledProblem, prod_x: str, prod_y: str, units: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Rows of a @ (x, y) <= b for the two products, with the other products' loads moved to the right-hand side."""
+    jx, jy = problem.prod_idx[prod_x], problem.prod_idx[prod_y]
+    A, b, names = stack_constraints(problem)
+    rest = np.array(units, dtype=float)
+    rest[[jx, jy]] = 0
+    a = A[:, [jx, jy]].toarray()
+    b = b - A @ rest
+    a = np.vstack([a, [[-1.0, 0.0], [0.0, -1.0]]])
+    b = np.concatenate([b, [0.0, 0.0]])
+    return a, b, names + [f'{prod_x} >= 0', f'{prod_y} >= 0']
+
+def _intersect(a: np.ndarray, b: np.ndarray, i: int, j: int) -> np.ndarray:
+    det = a[i, 0]*a[j, 1] - a[i, 1]*a[j, 0]
+    return np.array([(b[i]*a[j, 1] - b[j]*a[i, 1])/det, (a[i, 0]*b[j] - a[j, 0]*b[i])/det])
+
+def _outside(a: np.ndarray, b: np.ndarray, k: int, point: np.ndarray) -> bool:
+    return a[k] @ point - b[k] > EPS
+
+def intersect_half_planes(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+    """Vertices of {p : a @ p <= b} counter-clockwise and the pair of rows meeting at each one.
+
+    The region must be bounded (add box rows if needed).  Returns no vertices when it is empty or has
+    no interior.
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    norm = np.hypot(a[:, 0], a[:, 1])
+    trivial = norm <= EPS
+    if (b[trivial] < -EPS).any():
+        return np.zeros((0, 2)), []
+    rows = np.flatnonzero(~trivial)
+    a = a/np.where(trivial, 1, norm)[:, None]
+    b = b/np.where(trivial, 1, norm)
+
+    # Feasible side is to the left of the edge direction (-a_y, a_x); sort edges by its angle and keep
+    # only the tightest of parallel rows.
+    angle = np.arctan2(a[rows, 0], -a[rows, 1])
+    angle[angle <= -np.pi + EPS] = np.pi
+    sort = np.lexsort((b[rows], angle))
+    order, angle = rows[sort], angle[sort]
+    order = order[np.concatenate([[True], np.diff(angle) > EPS])]
+
+    lines = deque()
+    for k in order:
+        while len(lines) >= 2 and _outside(a, b, k, _intersect(a, b, lines[-1], lines[-2])):
+            lines.pop()
+        while len(lines) >= 2 and _outside(a, b, k, _intersect(a, b, lines[0], lines[1])):
+            lines.popleft()
+        if lines:
+            last = lines[-1]
+            if abs(a[k, 0]*a[last, 1] - a[k, 1]*a[last, 0]) <= EPS:
+                # Opposite edges with nothing between them: the region has no interior.
+                return np.zeros((0, 2)), []
+        lines.append(k)
+    while len(lines) >= 3 and _outside(a, b, lines[0], _intersect(a, b, lines[-1], lines[-2])):
+        lines.pop()
+    while len(lines) >= 3 and _outside(a, b, lines[-1], _intersect(a, b, lines[0], lines[1])):
+        lines.popleft()
+    if len(lines) < 3:
+        return np.zeros((0, 2)), []
+
+    lines = list(lines)
+    pairs = list(zip(lines, lines[1:] + lines[:1]))
+    for i, j in pairs:
+        if abs(a[i, 0]*a[j, 1] - a[i, 1]*a[j, 0]) <= EPS:
+            return np.zeros((0, 2)), []
+    vertices = np.array([_intersect(a, b, i, j) for i, j in pairs])
+    scale = max(1.0, np.abs(vertices).max())
+    if (a[rows] @ vertices.T - b[rows, None] > 1e-7*scale).any():
+        return np.zeros((0, 2)), []
+
+    # Several rows through one corner leave repeated vertices.
+    keep = np.linalg.norm(vertices - np.roll(vertices, 1, axis=0), axis=1) > 1e-9*scale
+    if keep.sum() < 3:
+        return np.zeros((0, 2)), []
+    return vertices[keep], [pair for pair, kept in zip(pairs, keep) if kept]
+
+def plan_region(problem: CompiledProblem, prod_x: str, prod_y: str, units: np.ndarray, limit: float = 1e6) -> PlanRegion:
+    """The feasible (x, y) plans for `prod_x` and `prod_y` with every other product at `units`.
+
+    `limit` caps both axes so a product no constraint restricts still gives a finite polygon.
+    """
+    a, b, names = half_planes(problem, prod_x, prod_y, units)
+    a = np.vstack([a, [[1.0, 0.0], [0.0, 1.0]]])
+    b = np.concatenate([b, [limit, limit]])
+    names = names + [PLOT_LIMIT, PLOT_LIMIT]
+    vertices, pairs = intersect_half_planes(a, b)
+
+    jx, jy = problem.prod_idx[prod_x], problem.prod_idx[prod_y]
+    rest = np.array(units, dtype=float)
+    rest[[jx, jy]] = 0
+    profit = np.array([problem.unit_profit[jx], problem.unit_profit[jy]])
+    fixed_profit = float(problem.unit_profit @ rest)
+    best, best_profit = None, None
+    if len(vertices):
+        k = int(np.argmax(vertices @ profit))
+        best, best_profit = vertices[k], float(vertices[k] @ profit + fixed_profit)
+    return PlanRegion(
+        prod_x=prod_x,
+        prod_y=prod_y,
+        vertices=vertices,
+        binding=[(names[i], names[j]) for i, j in pairs],
+        profit_x=float(profit[0]),
+        profit_y=float(profit[1]),
+        fixed_profit=fixed_profit,
+        best=best,
+        best_profit=best_profit
+    )
@@ -0,0 +1,43 @@
+"""Gunicorn settings, loaded automatically from the working directory.
+
+With LP_PRELOAD=1 (the default) the master imports the app and warms up the solver on the bundled
+data once, then forks workers that share the imports, the cached model and its warm-start basis.
+"""
+import os
+
+bind = os.environ.get('LP_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+timeout = int(os.environ.get('LP_WORKER_TIMEOUT', 60))
+preload_app = os.environ.get('LP_PRELOAD', '1') == '1'
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from app import default_ui_data
+    from lp_model import warm_up
+    import metrics
+    try:
+        result = warm_up(default_ui_data())
+        server.log.info('Solver warmed up (%s)', result.status)
+    except Exception as exc:
+        # A missing solver should not keep the dashboard from starting.
+        server.log.warning('Solver warm-up failed: %s', exc)
+    metrics.flush()
+
+def post_worker_init(worker):
+    # Dash registers its callbacks on the first request it serves, and marks that done before it
+    # finishes; with --threads, requests arriving alongside the first would find no callbacks.
+    # Serve one request before the worker takes traffic.
+    from app import server
+    server.test_client().get('/_dash-dependencies')
+    # Start the solver processes while the worker is still single-threaded, so they are forked with
+    # the warmed model, and the fork server that background jobs start from once it is not (see jobs).
+    from jobs import solver_job_manager
+    from multiprocess import forkserver
+    solver_job_manager.start()
+    forkserver.ensure_running()
+
+def worker_exit(server, worker):
+    # The solver processes are killed with the worker; do not let the supervisor replace them.
+    from jobs import solver_job_manager
+    solver_job_manager.stop()
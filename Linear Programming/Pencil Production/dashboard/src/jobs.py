@@ -0,0 +1,203 @@
+import atexit
+import logging
+import os
+from queue import Empty
+import signal
+import tempfile
+import threading
+import uuid
+from typing import Optional
+
+import diskcache
+from dash import DiskcacheManager
+import multiprocess
+from multiprocess.connection import wait
+import psutil
+
+logger = logging.getLogger(__name__)
+
+JOB_CACHE_DIR = os.environ.get('LP_JOB_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'pencil_prod_jobs'))
+MAX_ACTIVE_SOLVES = int(os.environ.get('LP_MAX_ACTIVE_SOLVES', 4))
+SOLVE_TIME_LIMIT = float(os.environ.get('LP_SOLVE_TIME_LIMIT', 30))
+# Integer solves return their best plan when this latency budget runs out.
+MIP_TIME_LIMIT = float(os.environ.get('LP_MIP_TIME_LIMIT', 5))
+# Hard limit on a whole solve job, basis recovery and sensitivity included; its slot expires with it.
+JOB_TIME_LIMIT = SOLVE_TIME_LIMIT + 5
+# Long-lived solver processes per gunicorn worker, and how often the browser polls them (ms).
+SOLVER_PROCESSES = int(os.environ.get('LP_SOLVER_PROCESSES', 1))
+SOLVE_POLL_INTERVAL = int(os.environ.get('LP_SOLVE_POLL_INTERVAL', 200))
+SOLVER_TEE = os.environ.get('LP_SOLVER_TEE', '0') == '1'
+
+# Background callback results and the solve slots live on disk so every gunicorn worker sees them.
+job_cache = diskcache.Cache(os.path.join(JOB_CACHE_DIR, 'results'))
+slot_cache = diskcache.Cache(os.path.join(JOB_CACHE_DIR, 'slots'))
+
+def _start_method() -> str:
+    # Forking while another thread is inside SQLite or holds a lock would leave the child stuck on it.
+    return 'fork' if threading.active_count() == 1 else 'forkserver'
+
+class JobManager(DiskcacheManager):
+    """Runs each background callback in its own process, like DiskcacheManager.
+
+    Jobs are forked from the worker, so they inherit its imports, live sessions and solver caches.
+    In a threaded worker another thread may be inside SQLite (the session, job or metrics store) at
+    that moment; the child would inherit its lock state and wait on it forever.  There, jobs are
+    started from a single-threaded fork server that has imported the app instead.
+    """
+    def call_job_fn(self, key, job_fn, args, context):
+        proc = multiprocess.get_context(_start_method()).Process(target=job_fn, args=(key, self._make_progress_key(key), args, context))
+        proc.start()
+        return proc.pid
+
+def _job_key(job: str) -> str:
+    return f'job-{job}'
+
+class SolverPoolManager(DiskcacheManager):
+    """Runs background callbacks on a few long-lived solver processes per worker.
+
+    The processes keep lp_model's cached model and warm-start bases from one job to the next, so a
+    solve pays neither a process start nor a cold model.  Jobs wait in a queue; the state of each
+    ('queued', or the pid running it) is kept in the shared job cache so that whichever worker a
+    poll lands on can tell whether it is running and cancel it.  Cancelling a running job, or one
+    still running after `time_limit` seconds, kills its process and a new one takes its place.
+    """
+    def __init__(self, cache, processes: int, time_limit: float):
+        self.processes = processes
+        self.time_limit = time_limit
+        self._job_fns = {}
+        self._procs = []
+        self._queue = None
+        self._owner = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        super().__init__(cache)
+
+    def make_job_fn(self, fn, progress, key=None):
+        # Jobs are looked up by key in the solver process, which registered the same callbacks on import.
+        self._job_fns[key] = super().make_job_fn(fn, progress, key)
+        return key
+
+    def start(self):
+        """Starts the solver processes of this worker, if they are not running yet."""
+        with self._lock:
+            first = self._owner != os.getpid()
+            if first:
+                # Named semaphores, so the queue also reaches processes started from the fork server.
+                self._queue = multiprocess.get_context('forkserver').Queue()
+                self._procs = []
+                self._owner = os.getpid()
+            self._procs = [proc for proc in self._procs if proc.is_alive()]
+            while len(self._procs) < self.processes:
+                proc = multiprocess.get_context(_start_method()).Process(target=_serve_jobs, args=(self._queue,), daemon=True)
+                proc.start()
+                self._procs.append(proc)
+        if first:
+            # Replaces the processes killed by a cancel or the time limit.  Registered after
+            # multiprocess's own exit handler, so it runs first, before the processes are killed.
+            self._stopping.clear()
+            atexit.register(self.stop)
+            threading.Thread(target=self._supervise, daemon=True).start()
+
+    def stop(self):
+        """Stops replacing solver processes; called as the worker shuts down."""
+        self._stopping.set()
+
+    def _supervise(self):
+        while not self._stopping.is_set():
+            wait([proc.sentinel for proc in self._procs], timeout=1)
+            if self._stopping.is_set():
+                return
+            try:
+                self.start()
+            except Exception:
+                # E.g. the fork server already gone; try again rather than leave the worker without solvers.
+                logger.exception('Could not restart solver processes')
+                self._stopping.wait(5)
+
+    def call_job_fn(self, key, job_fn, args, context):
+        self.start()
+        job = uuid.uuid4().hex
+        self.handle.set(_job_key(job), 'queued', expire=3600)
+        self._queue.put((job, job_fn, key, args, dict(context)))
+        return job
+
+    def _run(self, job: str, job_fn: str, key: str, args, context):
+        with self.handle.transact():
+            if self.handle.get(_job_key(job)) != 'queued':
+                return  # cancelled while it waited
+            self.handle.set(_job_key(job), os.getpid(), expire=self.time_limit + 60)
+        watchdog = threading.Timer(self.time_limit, self._expire, (job, key))
+        watchdog.start()
+        # The result is staged, then published together with clearing the job's state, so a cancel
+        # can never kill this process after it has moved on to the next job.
+        staged = f'{key}-staged'
+        self._job_fns[job_fn](staged, self._make_progress_key(key), args, context)
+        watchdog.cancel()
+        with self.handle.transact():
+            output = self.handle.pop(staged)
+            if self.handle.get(_job_key(job)) == os.getpid():
+                self.handle.set(key, output)
+                self.handle.delete(_job_key(job))
+
+    def _expire(self, job: str, key: str):
+        with self.handle.transact():
+            if self.handle.get(_job_key(job)) == os.getpid():
+                self.handle.set(key, {'_dash_no_update': '_dash_no_update'})
+                self.handle.delete(_job_key(job))
+        os._exit(1)
+
+    def job_running(self, job):
+        state = self.handle.get(_job_key(job))
+        return state == 'queued' or (state is not None and psutil.pid_exists(state))
+
+    def terminate_job(self, job):
+        if job is None:
+            return
+        with self.handle.transact():
+            state = self.handle.pop(_job_key(job))
+            if isinstance(state, int):
+                super().terminate_job(state)
+
+    def get_result(self, key, job):
+        # Unlike a one-off job process, the solver process outlives the job and must not be killed.
+        return super().get_result(key, None)
+
+def _serve_jobs(queue):
+    # A process forked from a gunicorn worker inherits its signal handlers.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    while True:
+        try:
+            job = queue.get(timeout=5)
+        except Empty:
+            if not multiprocess.parent_process().is_alive():
+                return
+            continue
+        solver_job_manager._run(*job)
+
+multiprocess.set_forkserver_preload(['app'])
+background_callback_manager = JobManager(job_cache)
+solver_job_manager = SolverPoolManager(job_cache, SOLVER_PROCESSES, JOB_TIME_LIMIT)
+
+def acquire_solve_slot() -> Optional[str]:
+    """Reserves one of MAX_ACTIVE_SOLVES slots, or returns None when the queue is full.
+
+    Slots expire on their own after JOB_TIME_LIMIT, so a job that is cancelled (its process is
+    terminated before it can release) does not hold its slot forever.  Solve jobs are killed at that
+    limit, and jobs that may run longer, such as sweeps, renew their slot as they make progress, so a
+    slot never expires while its job still runs.
+    """
+    with slot_cache.transact():
+        slot_cache.expire()
+        if len(slot_cache) >= MAX_ACTIVE_SOLVES:
+            return None
+        slot = uuid.uuid4().hex
+        slot_cache.set(slot, True, expire=JOB_TIME_LIMIT)
+    return slot
+
+def renew_solve_slot(slot: str):
+    """Restarts the slot's JOB_TIME_LIMIT; call it more often than that while the job runs."""
+    slot_cache.touch(slot, expire=JOB_TIME_LIMIT)
+
+def release_solve_slot(slot: str):
+    slot_cache.delete(slot)
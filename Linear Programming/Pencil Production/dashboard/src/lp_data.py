@@ -0,0 +1,208 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+import warnings
+
+import numpy as np
+import scipy.sparse as sp
+
+LEGACY_PRODUCTS = ['economy', 'deluxe']
+
+UOM_CONVERSIONS = {('OZ', 'LB'): 1/16}
+
+def seconds_to_hours(sec_val: float)->float:
+    return sec_val/3600
+
+def bom_conversion(bom_uom: str, part_uom: str) -> float:
+    return UOM_CONVERSIONS.get((bom_uom, part_uom), 1.0)
+
+def read_products(data: dict) -> List[dict]:
+    """Product definitions, falling back to the original economy/deluxe price keys."""
+    if 'products' in data:
+        return data['products']
+    return [
+        {'product': prod, 'name': prod.title(), 'price': data[f'{prod}_price']}
+        for prod in LEGACY_PRODUCTS
+    ]
+
+@dataclass
+class CompiledProblem:
+    """Array-backed view of the data.json / grid rows.
+
+    Rows of `bom` follow `parts` and rows of `dept_time` follow `depts`; columns of both follow `products`.
+    Both are sparse CSR matrices holding only the nonzero usage.  BOM quantities are expressed in the
+    part's inventory UOM and department times in hours.
+    """
+    products: List[str]
+    depts: List[str]
+    parts: List[str]
+    bom: sp.csr_matrix
+    dept_time: sp.csr_matrix
+    dept_capacity: np.ndarray
+    inv_capacity: np.ndarray
+    part_cost: np.ndarray
+    prices: np.ndarray
+    shop_labor_rate: float
+    unit_matl_cost: np.ndarray
+    unit_labor_cost: np.ndarray
+    unit_profit: np.ndarray
+    prod_idx: Dict[str, int] = field(init=False, repr=False)
+    part_idx: Dict[str, int] = field(init=False, repr=False)
+    dept_idx: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.prod_idx = {prod: j for j, prod in enumerate(self.products)}
+        self.part_idx = {part: i for i, part in enumerate(self.parts)}
+        self.dept_idx = {dept: i for i, dept in enumerate(self.depts)}
+
+def _sparse_usage(rows: List[dict], row_idx: Dict[str, int], key: str, prod_idx: Dict[str, int], scale: List[float], shape: tuple) -> sp.csr_matrix:
+    coo_rows, coo_cols, coo_vals = [], [], []
+    for row in rows:
+        i = row_idx[row[key]]
+        for col, val in row.items():
+            j = prod_idx.get(col)
+            if j is None:
+                continue
+            val = float(val or 0)
+            if val != 0:
+                coo_rows.append(i)
+                coo_cols.append(j)
+                coo_vals.append(val*scale[i])
+    usage = sp.csr_matrix((coo_vals, (coo_rows, coo_cols)), shape=shape)
+    usage.sum_duplicates()
+    return usage
+
+def compile_problem(data: dict) -> CompiledProblem:
+    product_dets = read_products(data)
+    products = [prod_det['product'] for prod_det in product_dets]
+    prod_idx = {prod: j for j, prod in enumerate(products)}
+
+    parts = [part_det['part'] for part_det in data['parts']]
+    part_idx = {part: i for i, part in enumerate(parts)}
+    part_uoms = {part_det['part']: part_det['uom'] for part_det in data['parts']}
+    bom_conversions = [1.0]*len(parts)
+    for bom_item in data['bom']:
+        bom_conversions[part_idx[bom_item['part']]] = bom_conversion(bom_item['uom'], part_uoms[bom_item['part']])
+    bom = _sparse_usage(data['bom'], part_idx, 'part', prod_idx, bom_conversions, (len(parts), len(products)))
+
+    depts = [dept_det['dept'] for dept_det in data['dept']]
+    dept_idx = {dept: i for i, dept in enumerate(depts)}
+    dept_time = _sparse_usage(data['dept'], dept_idx, 'dept', prod_idx, [seconds_to_hours(1)]*len(depts), (len(depts), len(products)))
+    dept_capacity = np.array([float(dept_det['capacity']) for dept_det in data['dept']])
+
+    inv_capacity = np.array([float(part_det['inv']) for part_det in data['parts']])
+    part_cost = np.array([float(part_det['cost']) for part_det in data['parts']])
+    prices = np.array([float(prod_det['price']) for prod_det in product_dets])
+    shop_labor_rate = float(data['shop_labor_rate'])
+
+    unit_matl_cost = bom.T @ part_cost
+    unit_labor_cost = np.asarray(dept_time.sum(axis=0)).ravel()*shop_labor_rate*60
+    return CompiledProblem(
+        products=products,
+        depts=depts,
+        parts=parts,
+        bom=bom,
+        dept_time=dept_time,
+        dept_capacity=dept_capacity,
+        inv_capacity=inv_capacity,
+        part_cost=part_cost,
+        prices=prices,
+        shop_labor_rate=shop_labor_rate,
+        unit_matl_cost=unit_matl_cost,
+        unit_labor_cost=unit_labor_cost,
+        unit_profit=prices - unit_matl_cost - unit_labor_cost
+    )
+
+# In-place edits: each one updates a single coefficient and only the unit costs that depend on it,
+# so applying a grid edit costs time proportional to the change rather than to the dataset.
+
+def _set_entry(usage: sp.csr_matrix, i: int, j: int, value: float) -> float:
+    """Sets usage[i, j] and returns the previous value.
+
+    Changing an existing nonzero is a binary search within the row; adding or removing one changes
+    the sparsity pattern and costs O(nnz).
+    """
+    start, end = usage.indptr[i], usage.indptr[i + 1]
+    k = start + np.searchsorted(usage.indices[start:end], j)
+    if k < end and usage.indices[k] == j:
+        old = float(usage.data[k])
+        usage.data[k] = value
+        if value == 0:
+            usage.eliminate_zeros()
+        return old
+    if value != 0:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', sp.SparseEfficiencyWarning)
+            usage[i, j] = value
+    return 0.0
+
+def _row_slice(usage: sp.csr_matrix, i: int) -> slice:
+    return slice(usage.indptr[i], usage.indptr[i + 1])
+
+def set_bom_qty(problem: CompiledProblem, part: str, product: str, qty: float, conversion: float = 1.0):
+    """`qty` is in the BOM UOM; `conversion` takes it to the part's inventory UOM."""
+    i, j = problem.part_idx[part], problem.prod_idx[product]
+    qty = float(qty)*conversion
+    delta = (qty - _set_entry(problem.bom, i, j, qty))*problem.part_cost[i]
+    problem.unit_matl_cost[j] += delta
+    problem.unit_profit[j] -= delta
+
+def scale_bom_row(problem: CompiledProblem, part: str, factor: float):
+    """Rescales one part's BOM quantities, e.g. after its UOM changes."""
+    i = problem.part_idx[part]
+    row = _row_slice(problem.bom, i)
+    cols = problem.bom.indices[row]
+    delta = problem.bom.data[row]*(factor - 1)*problem.part_cost[i]
+    problem.bom.data[row] *= factor
+    problem.unit_matl_cost[cols] += delta
+    problem.unit_profit[cols] -= delta
+
+def set_part_cost(problem: CompiledProblem, part: str, cost: float):
+    i = problem.part_idx[part]
+    row = _row_slice(problem.bom, i)
+    cols = problem.bom.indices[row]
+    delta = problem.bom.data[row]*(float(cost) - problem.part_cost[i])
+    problem.part_cost[i] = float(cost)
+    problem.unit_matl_cost[cols] += delta
+    problem.unit_profit[cols] -= delta
+
+def set_inv_capacity(problem: CompiledProblem, part: str, inv: float):
+    problem.inv_capacity[problem.part_idx[part]] = float(inv)
+
+def set_dept_time(problem: CompiledProblem, dept: str, product: str, seconds: float):
+    i, j = problem.dept_idx[dept], problem.prod_idx[product]
+    hours = float(seconds)*seconds_to_hours(1)
+    delta = (hours - _set_entry(problem.dept_time, i, j, hours))*problem.shop_labor_rate*60
+    problem.unit_labor_cost[j] += delta
+    problem.unit_profit[j] -= delta
+
+def set_dept_capacity(problem: CompiledProblem, dept: str, capacity: float):
+    problem.dept_capacity[problem.dept_idx[dept]] = float(capacity)
+
+def set_price(problem: CompiledProblem, product: str, price: float):
+    j = problem.prod_idx[product]
+    problem.unit_profit[j] += float(price) - problem.prices[j]
+    problem.prices[j] = float(price)
+
+def set_shop_labor_rate(problem: CompiledProblem, rate: float):
+    # Every product's labor cost depends on the rate.
+    problem.shop_labor_rate = float(rate)
+    problem.unit_labor_cost = np.asarray(problem.dept_time.sum(axis=0)).ravel()*problem.shop_labor_rate*60
+    problem.unit_profit = problem.prices - problem.unit_matl_cost - problem.unit_labor_cost
+
+def stack_constraints(problem: CompiledProblem) -> Tuple[sp.csr_matrix, np.ndarray, List[str]]:
+    """Department rows followed by inventory rows as a single A @ x <= b system."""
+    A = sp.vstack([problem.dept_time, problem.bom], format='csr')
+    b = np.concatenate([problem.dept_capacity, problem.inv_capacity])
+    return A, b, problem.depts + problem.parts
+
+def units_vector(problem: CompiledProblem, units: Dict[str, float]) -> np.ndarray:
+    return np.array([float(units.get(prod) or 0) for prod in problem.products])
+
+def calc_dept_loads(problem: CompiledProblem, units: np.ndarray) -> np.ndarray:
+    return problem.dept_time @ units
+
+def calc_inv_loads(problem: CompiledProblem, units: np.ndarray) -> np.ndarray:
+    return problem.bom @ units
+
+def calc_profit(problem: CompiledProblem, units: np.ndarray) -> float:
+    return float(problem.unit_profit @ units)
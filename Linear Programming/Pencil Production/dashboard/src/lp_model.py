@@ -1,109 +1,402 @@
-from typing import Tuple, Dict
-
-import pyomo.opt as po
-import pyomo.environ as pe
-
-products = ['economy', 'deluxe']
-
-def seconds_to_hours(sec_val: float)->float:
-    return sec_val/3600
-
-def oz_to_lb(oz_val: float) -> float:
-    return oz_val/16
-
-def calc_unit_matl_costs(data: dict) -> Dict[str, float]:
-    matl_cost = {}
-    for prod in products:
-        m_cost = 0
-        for part_det in data['parts']:
-            bom_det = next((b for b in data['bom'] if b['part'] == part_det['part']), None)
-            amount_used = bom_det[prod]
-            if bom_det['uom'] == 'OZ' and part_det['uom'] == 'LB':
-                amount_used = oz_to_lb(amount_used)
-            m_cost += amount_used*float(part_det['cost'])
-        matl_cost[prod] =m_cost
-    return matl_cost
-
-def calc_unit_labor_costs(data: dict) -> Dict[str, float]:
-    labor_cost = {}
-    for prod in products:
-        l_time = 0 
-        for dept_det in data['dept']:
-            l_time += seconds_to_hours(dept_det[prod])
-        labor_cost[prod] = l_time*float(data['shop_labor_rate']*60)
-    return labor_cost
-
-def calc_unit_profit(data: dict) -> Dict[str, float]:
-    matl_cost = calc_unit_matl_costs(data)
-    labor_cost = calc_unit_labor_costs(data)
-    unit_rev = {
-        'economy': float(data['economy_price']),
-        'deluxe': float(data['deluxe_price'])
-    }
-
-    unit_profit = {}
-    for prod in products:
-        unit_profit[prod] = unit_rev[prod] - matl_cost[prod] - labor_cost[prod]
-    return unit_profit
-
-def prep_dept_part_loads(data: dict) -> Tuple[dict, dict]:
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Tuple, Dict, List, Optional
+import os
+import time
+
+import numpy as np
+
+from lp_data import CompiledProblem, compile_problem, stack_constraints
+from simplex import solve_lp, sensitivity_analysis, is_optimal_basis
+from branch_bound import solve_milp, relative_gap
+from metrics import timed, set_gauge
+
+if TYPE_CHECKING:
+    import pyomo.environ as pe
+
+# Any Pyomo solver name, 'simplex' for the in-process NumPy engine, or 'portfolio' to race the installed ones.
+SOLVER_NAME = os.environ.get('LP_SOLVER', 'glpk')
+IN_PROCESS_SOLVER = 'simplex'
+# Solvers fed the constraint arrays directly, skipping the Pyomo model (see matrix_solver).
+DIRECT_SOLVERS = ('highspy', 'glpsol')
+PORTFOLIO_SOLVER = 'portfolio'
+MIP_GAP = float(os.environ.get('LP_MIP_GAP', 1e-3))
+
+# Relative MIP gap option of the Pyomo solvers that accept one.
+MIP_GAP_OPTIONS = {'glpk': 'mipgap', 'cbc': 'ratioGap', 'appsi_highs': 'mip_rel_gap', 'highs': 'mip_rel_gap', 'gurobi': 'MIPGap', 'cplex': 'mip_tolerances_mipgap'}
+
+_lp_model: Optional['pe.ConcreteModel'] = None
+_lp_model_key: Optional[tuple] = None
+_solvers = {}
+_warm_bases: Dict[tuple, object] = {}
+MAX_WARM_BASES = 64
+# Above this many rows a basis that cannot be read off an external solver's plan is not searched
+# for with the dense in-process simplex (its basis inverse is rows x rows); ranging is skipped.
+RECOVER_BASIS_MAX_ROWS = int(os.environ.get('LP_RECOVER_BASIS_MAX_ROWS', 2000))
+
+@dataclass
+class LPResult:
+    """Plan and objective of a solve plus the sensitivity of its optimal basis.
+
+    Duals are the shadow prices of `dept_loads` (per hour) and `inv_loads` (per inventory unit).
+    Ranges are [low, high] values over which the optimal basis does not change: within a price range the
+    plan stays the same, within a capacity or inventory range the shadow prices stay valid.
+
+    Integer solves carry no sensitivity; `mip_gap` is the relative gap between their plan and the best
+    bound, and status is 'feasible' when the time limit stopped the search above the target gap.
+    """
+    status: str
+    objective: float
+    plan: Dict[str, float]
+    dept_duals: Dict[str, float] = field(default_factory=dict)
+    inv_duals: Dict[str, float] = field(default_factory=dict)
+    reduced_costs: Dict[str, float] = field(default_factory=dict)
+    price_ranges: Dict[str, List[float]] = field(default_factory=dict)
+    dept_ranges: Dict[str, List[float]] = field(default_factory=dict)
+    inv_ranges: Dict[str, List[float]] = field(default_factory=dict)
+    mip_gap: Optional[float] = None
+
+def calc_unit_profit(problem: CompiledProblem) -> Dict[str, float]:
+    return dict(zip(problem.products, problem.unit_profit.tolist()))
+
+def _sparse_loads(usage, row_names: list, products: list) -> dict:
     loads = {}
-    capacities = {}
-    for dept_det in data['dept']:
-        dept_name = dept_det['dept'].lower() 
-        for prod in products:
-            loads[(dept_name, prod)] = seconds_to_hours(dept_det[prod])
-        capacities[dept_name] = dept_det['capacity']
+    for i, row_name in enumerate(row_names):
+        start, end = usage.indptr[i], usage.indptr[i+1]
+        for j, coef in zip(usage.indices[start:end].tolist(), usage.data[start:end].tolist()):
+            loads[(row_name, products[j])] = coef
+    return loads
+
+def prep_dept_part_loads(problem: CompiledProblem) -> Tuple[dict, dict]:
+    dept_names = [dept.lower() for dept in problem.depts]
+    loads = _sparse_loads(problem.dept_time, dept_names, problem.products)
+    capacities = dict(zip(dept_names, problem.dept_capacity.tolist()))
     return loads, capacities
 
-def prep_inv_part_loads(data: dict) -> Tuple[dict, dict]:
-    capacities = {}
-    loads = {}
-    
-    capacities = {part_det['part'].lower(): int(part_det['inv']) for part_det in data['parts']} 
-    
-    for bom_item in data['bom']:
-        for prod in products:
-            amount_used = bom_item[prod]
-            if bom_item['uom'] == 'OZ':
-                amount_used = oz_to_lb(amount_used)
-            loads[(bom_item['part'].lower(), prod)] = amount_used
+def prep_inv_part_loads(problem: CompiledProblem) -> Tuple[dict, dict]:
+    part_names = [part.lower() for part in problem.parts]
+    loads = _sparse_loads(problem.bom, part_names, problem.products)
+    capacities = dict(zip(part_names, problem.inv_capacity.tolist()))
     return loads, capacities
 
-def build_lp_model(data: dict, unit_profits: Dict[str, float]) -> pe.ConcreteModel:
-    dept_unit_loads, dept_capacities = prep_dept_part_loads(data)
-    inv_unit_loads, inv_capacities = prep_inv_part_loads(data)
+def model_structure_key(problem: CompiledProblem) -> tuple:
+    """Products, rows and sparsity pattern; any change to these requires a rebuilt model."""
+    return (
+        tuple(problem.products), tuple(problem.depts), tuple(problem.parts),
+        problem.dept_time.indptr.tobytes(), problem.dept_time.indices.tobytes(),
+        problem.bom.indptr.tobytes(), problem.bom.indices.tobytes()
+    )
+
+def _row_terms(loads: dict) -> Dict[str, list]:
+    terms = {}
+    for row_name, prod in loads.keys():
+        terms.setdefault(row_name, []).append(prod)
+    return terms
+
+def _pyomo():
+    """Imports Pyomo on first use; it dominates this module's import time and the in-process solver never needs it."""
+    import pyomo.environ as pe
+    import pyomo.opt as po
+    return pe, po
+
+def build_lp_model(problem: CompiledProblem, integer: bool = False) -> 'pe.ConcreteModel':
+    pe, _ = _pyomo()
+    unit_profits = calc_unit_profit(problem)
+    dept_unit_loads, dept_capacities = prep_dept_part_loads(problem)
+    inv_unit_loads, inv_capacities = prep_inv_part_loads(problem)
+    dept_terms = _row_terms(dept_unit_loads)
+    inv_terms = _row_terms(inv_unit_loads)
 
     model = pe.ConcreteModel(name='Pencil Production')
-    
-    model.x_econ = pe.Var(domain = pe.NonNegativeReals)
-    model.x_del = pe.Var(domain = pe.NonNegativeReals)
 
-    obj_expr = model.x_econ*unit_profits['economy'] + model.x_del*unit_profits['deluxe']
+    model.products = pe.Set(initialize=problem.products, ordered=True)
+    model.depts = pe.Set(initialize=list(dept_capacities.keys()), ordered=True)
+    model.parts = pe.Set(initialize=list(inv_capacities.keys()), ordered=True)
+    model.dept_nz = pe.Set(initialize=list(dept_unit_loads.keys()), dimen=2, ordered=True)
+    model.inv_nz = pe.Set(initialize=list(inv_unit_loads.keys()), dimen=2, ordered=True)
+
+    # Coefficients and right-hand sides are mutable so a cached model can be re-used between solves.
+    # Only nonzero usage is indexed, so the model grows with the nonzeros rather than rows x products.
+    model.unit_profit = pe.Param(model.products, mutable=True, initialize=unit_profits)
+    model.dept_unit_load = pe.Param(model.dept_nz, mutable=True, initialize=dept_unit_loads)
+    model.dept_capacity = pe.Param(model.depts, mutable=True, initialize=dept_capacities)
+    model.inv_unit_load = pe.Param(model.inv_nz, mutable=True, initialize=inv_unit_loads)
+    model.inv_capacity = pe.Param(model.parts, mutable=True, initialize=inv_capacities)
+
+    model.x = pe.Var(model.products, domain = pe.NonNegativeIntegers if integer else pe.NonNegativeReals)
+
+    obj_expr = pe.quicksum(model.x[prod]*model.unit_profit[prod] for prod in model.products)
     model.obj = pe.Objective(sense = pe.maximize, expr=obj_expr)
 
-    model.dept_loads = pe.ConstraintList()
-    for dept in dept_capacities.keys():
-        lhs = model.x_econ*dept_unit_loads[dept, 'economy'] +  model.x_del*dept_unit_loads[dept, 'deluxe']
-        rhs = dept_capacities[dept]
-        model.dept_loads.add(lhs <= rhs)
-    
-    model.inv_loads = pe.ConstraintList()
-    for part in inv_capacities.keys():
-        lhs = model.x_econ*inv_unit_loads[part, 'economy'] + model.x_del*inv_unit_loads[part, 'deluxe']
-        rhs = inv_capacities[part]
-        model.inv_loads.add(lhs <= rhs)
+    def dept_load_rule(m, dept):
+        if dept not in dept_terms:
+            return pe.Constraint.Skip
+        lhs = pe.quicksum(m.x[prod]*m.dept_unit_load[dept, prod] for prod in dept_terms[dept])
+        return lhs <= m.dept_capacity[dept]
+    model.dept_loads = pe.Constraint(model.depts, rule=dept_load_rule)
+
+    def inv_load_rule(m, part):
+        if part not in inv_terms:
+            return pe.Constraint.Skip
+        lhs = pe.quicksum(m.x[prod]*m.inv_unit_load[part, prod] for prod in inv_terms[part])
+        return lhs <= m.inv_capacity[part]
+    model.inv_loads = pe.Constraint(model.parts, rule=inv_load_rule)
     return model
 
-def solve_lp_model(data: dict) -> tuple:
-    unit_profits = calc_unit_profit(data)
-    model = build_lp_model(data, unit_profits)
+def update_lp_model(model: 'pe.ConcreteModel', problem: CompiledProblem) -> 'pe.ConcreteModel':
+    dept_unit_loads, dept_capacities = prep_dept_part_loads(problem)
+    inv_unit_loads, inv_capacities = prep_inv_part_loads(problem)
+
+    model.unit_profit.store_values(calc_unit_profit(problem))
+    model.dept_unit_load.store_values(dept_unit_loads)
+    model.dept_capacity.store_values(dept_capacities)
+    model.inv_unit_load.store_values(inv_unit_loads)
+    model.inv_capacity.store_values(inv_capacities)
+    return model
+
+def get_lp_model(problem: CompiledProblem, integer: bool = False) -> 'pe.ConcreteModel':
+    """Returns the worker's cached model, rebuilding it only when the products, rows, sparsity pattern or variable domain change."""
+    global _lp_model, _lp_model_key
+    key = (model_structure_key(problem), integer)
+    if _lp_model is None or key != _lp_model_key:
+        with timed('build_lp_model'):
+            _lp_model = build_lp_model(problem, integer)
+        _lp_model_key = key
+    else:
+        with timed('update_lp_model'):
+            update_lp_model(_lp_model, problem)
+    return _lp_model
+
+SOLVER_PHASES = [('_presolve', 'solver_write'), ('_apply_solver', 'solver_spawn_solve'), ('_postsolve', 'solver_parse')]
+
+def _timed_method(method, phase: str):
+    def wrapper(*args, **kwargs):
+        with timed(phase):
+            return method(*args, **kwargs)
+    return wrapper
+
+def _instrument_solver(solver):
+    """Times the write / spawn+solve / parse steps of shell solvers such as GLPK."""
+    for method_name, phase in SOLVER_PHASES:
+        method = getattr(solver, method_name, None)
+        if method is not None:
+            setattr(solver, method_name, _timed_method(method, phase))
+    return solver
+
+def get_solver(solver_name: str = SOLVER_NAME):
+    """Persistent solver interfaces (e.g. appsi_highs) only re-send the Params that changed."""
+    if solver_name not in _solvers:
+        pe, _ = _pyomo()
+        _solvers[solver_name] = _instrument_solver(pe.SolverFactory(solver_name))
+    return _solvers[solver_name]
+
+def _basis_from_plan(A, b, x: np.ndarray) -> np.ndarray:
+    """Basis guess for the stacked <= rows: positive products and slacks, padded with binding slacks."""
+    m, n = A.shape
+    slack = b - A @ x
+    basic = np.concatenate([np.flatnonzero(x > 1e-9), n + np.flatnonzero(slack > 1e-9)])
+    binding = n + np.flatnonzero(slack <= 1e-9)
+    return np.concatenate([basic, binding[:max(m - len(basic), 0)]])[:m]
+
+def _time_left(start: float, time_limit: Optional[float]) -> Optional[float]:
+    """Seconds left of a `time_limit` that started at `start`, or None without a limit."""
+    return None if time_limit is None else time_limit - (time.perf_counter() - start)
+
+def _out_of_time(start: float, time_limit: Optional[float]) -> bool:
+    return time_limit is not None and _time_left(start, time_limit) <= 0
+
+def _lp_result(problem: CompiledProblem, status: str, x: np.ndarray, basis: Optional[np.ndarray]) -> LPResult:
+    n_depts = len(problem.depts)
+    result = LPResult(
+        status=status,
+        objective=float(problem.unit_profit @ x),
+        plan=dict(zip(problem.products, x.tolist()))
+    )
+    if status != 'optimal' or basis is None:
+        return result
+
+    A, b, _ = stack_constraints(problem)
+    with timed('sensitivity_analysis'):
+        sens = sensitivity_analysis(problem.unit_profit, A, b, basis, maximize=True)
+    price_ranges = sens.cost_ranges + (problem.prices - problem.unit_profit)[:, None]
+    result.dept_duals = dict(zip(problem.depts, sens.duals[:n_depts].tolist()))
+    result.inv_duals = dict(zip(problem.parts, sens.duals[n_depts:].tolist()))
+    result.reduced_costs = dict(zip(problem.products, sens.reduced_costs.tolist()))
+    result.price_ranges = dict(zip(problem.products, price_ranges.tolist()))
+    result.dept_ranges = dict(zip(problem.depts, sens.rhs_ranges[:n_depts].tolist()))
+    result.inv_ranges = dict(zip(problem.parts, sens.rhs_ranges[n_depts:].tolist()))
+    return result
+
+def record_model_size(problem: CompiledProblem):
+    set_gauge('lp_model_variables', len(problem.products))
+    set_gauge('lp_model_constraints', len(problem.depts) + len(problem.parts))
+    set_gauge('lp_model_nonzeros', problem.dept_time.nnz + problem.bom.nnz)
+
+def _remember_basis(key: tuple, basis: np.ndarray):
+    _warm_bases.pop(key, None)
+    _warm_bases[key] = basis
+    if len(_warm_bases) > MAX_WARM_BASES:
+        _warm_bases.pop(next(iter(_warm_bases)))
+
+def solve_lp_arrays(problem: CompiledProblem, time_limit: Optional[float] = None, sensitivity: bool = True) -> LPResult:
+    """Solves with the in-process engine, warm starting from the last optimal basis of the same model.
+
+    `time_limit` covers the sensitivity analysis too; it is skipped when the solve used up the limit.
+    """
+    start = time.perf_counter()
+    A, b, _ = stack_constraints(problem)
+    key = model_structure_key(problem)
+    with timed('simplex_solve'):
+        result = solve_lp(problem.unit_profit, A, b, maximize=True, time_limit=time_limit, basis=_warm_bases.get(key))
+    if result.status == 'optimal':
+        _remember_basis(key, result.basis)
+        ranged = sensitivity and not _out_of_time(start, time_limit)
+        return _lp_result(problem, result.status, result.x, result.basis if ranged else None)
+    return _lp_result(problem, result.status, np.zeros(len(problem.products)), None)
+
+def solve_milp_arrays(problem: CompiledProblem, time_limit: Optional[float] = None, mip_gap: float = MIP_GAP) -> LPResult:
+    """Integer plan from branch and bound on the in-process engine."""
+    A, b, _ = stack_constraints(problem)
+    with timed('branch_and_bound'):
+        result = solve_milp(problem.unit_profit, A, b, maximize=True, time_limit=time_limit, mip_gap=mip_gap)
+    set_gauge('lp_mip_nodes', result.nodes)
+    if result.status not in ('optimal', 'feasible'):
+        return _lp_result(problem, result.status, np.zeros(len(problem.products)), None)
+    lp_result = _lp_result(problem, result.status, result.x, None)
+    lp_result.mip_gap = result.gap
+    return lp_result
+
+def solve_direct_arrays(problem: CompiledProblem, solver_name: str, time_limit: Optional[float] = None,
+                        integer: bool = False, mip_gap: float = MIP_GAP, sensitivity: bool = True) -> LPResult:
+    """Solves the stacked sparse arrays with HiGHS in-process ('highspy') or glpsol via MPS ('glpsol').
+
+    The solver's own final basis feeds the sensitivity analysis, so no basis recovery is needed.
+    As for solve_lp_arrays, the analysis is skipped when the solve used up `time_limit`.
+    """
+    import matrix_solver
+    start = time.perf_counter()
+    A, b, _ = stack_constraints(problem)
+    key = model_structure_key(problem)
+    with timed(f'{solver_name}_solve'):
+        if solver_name == 'highspy':
+            result = matrix_solver.solve_highs(problem.unit_profit, A, b, maximize=True, integer=integer, time_limit=time_limit,
+                                               mip_gap=mip_gap, basis=None if integer else _warm_bases.get(key))
+        else:
+            result = matrix_solver.solve_glpsol(problem.unit_profit, A, b, maximize=True, integer=integer, time_limit=time_limit,
+                                                mip_gap=mip_gap)
+    if result.status not in ('optimal', 'feasible'):
+        return _lp_result(problem, result.status, np.zeros(len(problem.products)), None)
+    if integer:
+        lp_result = _lp_result(problem, result.status, np.round(result.x), None)
+        bound = result.bound
+        lp_result.mip_gap = relative_gap(lp_result.objective, bound) if bound is not None and np.isfinite(bound) else result.gap
+        return lp_result
+    _remember_basis(key, result.basis)
+    ranged = sensitivity and not _out_of_time(start, time_limit)
+    return _lp_result(problem, result.status, result.x, result.basis if ranged else None)
+
+def solve_lp_model(data: dict, solver_name: str = SOLVER_NAME, tee: bool = False, time_limit: Optional[float] = None,
+                   integer: bool = False, mip_gap: float = MIP_GAP) -> LPResult:
+    """Solves the data with `solver_name`; `tee` streams the solver log to stdout and `time_limit` is in seconds.
+
+    With `integer` the plan is restricted to whole units and the search stops at a relative gap of `mip_gap`
+    or at the time limit, returning the best plan found.
+    """
+    with timed('compile_problem'):
+        problem = compile_problem(data)
+    return solve_problem(problem, solver_name, tee, time_limit, integer, mip_gap)
+
+def solve_problem(problem: CompiledProblem, solver_name: str = SOLVER_NAME, tee: bool = False, time_limit: Optional[float] = None,
+                  integer: bool = False, mip_gap: float = MIP_GAP, sensitivity: bool = True) -> LPResult:
+    """Same as solve_lp_model for an already compiled problem; without `sensitivity` only the plan is reported.
+
+    `time_limit` bounds the whole call: basis recovery and sensitivity get what the solver left over,
+    and are skipped once it is spent.
+    """
+    start = time.perf_counter()
+    record_model_size(problem)
+    if solver_name == PORTFOLIO_SOLVER:
+        from portfolio import solve_auto
+        return solve_auto(problem, tee, time_limit, integer, mip_gap, sensitivity)
+    if solver_name == IN_PROCESS_SOLVER:
+        if integer:
+            return solve_milp_arrays(problem, time_limit, mip_gap)
+        return solve_lp_arrays(problem, time_limit, sensitivity)
+    if solver_name in DIRECT_SOLVERS:
+        return solve_direct_arrays(problem, solver_name, time_limit, integer, mip_gap, sensitivity)
+
+    model = get_lp_model(problem, integer)
+
+    solver = get_solver(solver_name)
+    # glpsol only accepts whole seconds for --tmlim.
+    timelimit = None if time_limit is None else max(1, int(time_limit))
+    options = {MIP_GAP_OPTIONS[solver_name]: mip_gap} if integer and solver_name in MIP_GAP_OPTIONS else None
+    result = solver.solve(model, tee=tee, load_solutions=False, timelimit=timelimit, options=options)
+
+    _, po = _pyomo()
+    status = str(result.solver.termination_condition)
+    if integer:
+        return _integer_result(problem, model, result, status, po)
+    if result.solver.termination_condition != po.TerminationCondition.optimal:
+        return _lp_result(problem, status, np.zeros(len(problem.products)), None)
+
+    model.solutions.load_from(result)
+    x = np.array([model.x[prod].value or 0 for prod in problem.products], dtype=float)
+    if not sensitivity or _out_of_time(start, time_limit):
+        return _lp_result(problem, status, x, None)
+    # The external solver does not report its basis; recover it from the plan so ranging needs no re-solve.
+    basis = recover_basis(problem, x, _time_left(start, time_limit))
+    return _lp_result(problem, status, x, None if _out_of_time(start, time_limit) else basis)
+
+def recover_basis(problem: CompiledProblem, x: np.ndarray, time_limit: Optional[float] = None) -> Optional[np.ndarray]:
+    """An optimal basis for the optimal plan `x`, or None when none is found.
+
+    Usually it can be read off the plan; otherwise the in-process simplex searches from there, within
+    `time_limit` and only up to RECOVER_BASIS_MAX_ROWS rows.
+    """
+    A, b, _ = stack_constraints(problem)
+    basis = _basis_from_plan(A, b, x)
+    with timed('recover_basis'):
+        if is_optimal_basis(problem.unit_profit, A, b, basis, maximize=True):
+            return basis
+        if A.shape[0] > RECOVER_BASIS_MAX_ROWS:
+            return None
+        polished = solve_lp(problem.unit_profit, A, b, maximize=True, time_limit=time_limit, basis=basis)
+    return polished.basis if polished.status == 'optimal' else None
+
+def warm_basis(problem: CompiledProblem) -> Optional[np.ndarray]:
+    """The last optimal basis remembered for the problem's structure; a warm start, not necessarily optimal for `problem`."""
+    return _warm_bases.get(model_structure_key(problem))
+
+def add_sensitivity(problem: CompiledProblem, result: LPResult, basis: Optional[np.ndarray] = None,
+                    time_limit: Optional[float] = None) -> LPResult:
+    """`result` of a solve without sensitivity, with the sensitivity of `basis` or, when that is not
+    optimal for `problem`, of a basis recovered from the plan."""
+    if result.status != 'optimal':
+        return result
+    x = np.array([result.plan[prod] for prod in problem.products], dtype=float)
+    A, b, _ = stack_constraints(problem)
+    if basis is None or not is_optimal_basis(problem.unit_profit, A, b, basis, maximize=True):
+        basis = recover_basis(problem, x, time_limit)
+    return _lp_result(problem, result.status, x, basis)
+
+def _integer_result(problem: CompiledProblem, model: 'pe.ConcreteModel', result, status: str, po) -> LPResult:
+    """Keeps the incumbent of a MIP solve that stopped early and reports its gap to the solver's bound."""
+    if len(result.solution) == 0:
+        return _lp_result(problem, status, np.zeros(len(problem.products)), None)
+    model.solutions.load_from(result)
+    x = np.round([model.x[prod].value or 0 for prod in problem.products])
+    if result.solver.termination_condition != po.TerminationCondition.optimal:
+        status = 'feasible'
+    lp_result = _lp_result(problem, status, x, None)
+    bound = result.problem.upper_bound
+    lp_result.mip_gap = relative_gap(lp_result.objective, bound) if bound is not None and np.isfinite(bound) else None
+    return lp_result
 
-    solver = po.SolverFactory('glpk')
-    result = solver.solve(model, tee=True)
+def warm_up(data: dict, solver_name: str = SOLVER_NAME) -> LPResult:
+    """Imports the solver stack, builds the model and solves `data` once.
 
-    result_econ, result_del = 0, 0
-    if result.solver.termination_condition == po.TerminationCondition.optimal:
-        result_econ = model.x_econ.value
-        result_del = model.x_del.value
-    return result_econ, result_del
\ No newline at end of file
+    Run in a preloading gunicorn master so forked workers start with the imports, the cached model
+    and the warm-start basis already in memory.
+    """
+    with timed('warm_up'):
+        return solve_lp_model(data, solver_name)
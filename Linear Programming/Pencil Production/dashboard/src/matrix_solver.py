@@ -0,0 +1,201 @@
+"""Hands the stacked constraint arrays to an external solver in bulk, without building a Pyomo model.
+
+`solve_highs` passes the column-wise (CSC) matrix to HiGHS in-process through highspy.  `solve_glpsol`
+writes the problem as free MPS in one vectorized pass and runs glpsol on it.  Both take the same
+c, A, b arrays as the in-process simplex engine and return the solver's final basis in its format,
+so callers can run the sensitivity analysis without re-solving.
+"""
+from dataclasses import dataclass
+import os
+import subprocess
+import tempfile
+from typing import Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+@dataclass
+class MatrixResult:
+    """`basis` holds the basic columns, with the slack of row i as n + i, as in `simplex.solve_lp`.
+
+    Integer solves carry `bound` and `gap` when the solver reports them instead of a basis.
+    """
+    status: str
+    x: np.ndarray
+    objective: float
+    basis: Optional[np.ndarray] = None
+    bound: Optional[float] = None
+    gap: Optional[float] = None
+
+def _highspy():
+    """Imports highspy on first use; it is only needed when the HiGHS fast path is selected."""
+    import highspy
+    return highspy
+
+HIGHS_STATUSES = {
+    'kOptimal': 'optimal',
+    'kInfeasible': 'infeasible',
+    'kUnbounded': 'unbounded',
+    'kUnboundedOrInfeasible': 'infeasible_or_unbounded',
+    'kTimeLimit': 'time_limit',
+    'kIterationLimit': 'iteration_limit',
+}
+
+def _highs_basis(highspy, basis: np.ndarray, n: int, m: int):
+    """A basis in `simplex` format as a HiGHS basis; nonbasic columns sit at 0 and nonbasic rows at capacity."""
+    col_basic = np.zeros(n, dtype=bool)
+    row_basic = np.zeros(m, dtype=bool)
+    col_basic[basis[basis < n]] = True
+    row_basic[basis[basis >= n] - n] = True
+    highs_basis = highspy.HighsBasis()
+    highs_basis.valid = True
+    highs_basis.col_status = [highspy.HighsBasisStatus.kBasic if basic else highspy.HighsBasisStatus.kLower for basic in col_basic]
+    highs_basis.row_status = [highspy.HighsBasisStatus.kBasic if basic else highspy.HighsBasisStatus.kUpper for basic in row_basic]
+    return highs_basis
+
+def solve_highs(c, A, b, maximize: bool = True, integer: bool = False, time_limit: Optional[float] = None,
+                mip_gap: float = 1e-4, basis: Optional[np.ndarray] = None) -> MatrixResult:
+    """Optimizes c @ x subject to A @ x <= b, x >= 0 (integral with `integer`) with HiGHS.
+
+    A `basis` from an earlier solve of the same shape warm starts an LP solve.
+    """
+    highspy = _highspy()
+    A = sp.csc_matrix(A)
+    m, n = A.shape
+    c = np.asarray(c, dtype=float)
+
+    lp = highspy.HighsLp()
+    lp.num_col_ = n
+    lp.num_row_ = m
+    lp.col_cost_ = c
+    lp.col_lower_ = np.zeros(n)
+    lp.col_upper_ = np.full(n, highspy.kHighsInf)
+    lp.row_lower_ = np.full(m, -highspy.kHighsInf)
+    lp.row_upper_ = np.asarray(b, dtype=float)
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_ = A.indptr
+    lp.a_matrix_.index_ = A.indices
+    lp.a_matrix_.value_ = A.data
+    lp.sense_ = highspy.ObjSense.kMaximize if maximize else highspy.ObjSense.kMinimize
+    if integer:
+        lp.integrality_ = [highspy.HighsVarType.kInteger]*n
+
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', False)
+    if time_limit is not None:
+        highs.setOptionValue('time_limit', float(time_limit))
+    if integer:
+        highs.setOptionValue('mip_rel_gap', float(mip_gap))
+    highs.passModel(lp)
+    if basis is not None and not integer and len(basis) == m:
+        highs.setBasis(_highs_basis(highspy, np.asarray(basis), n, m))
+    highs.run()
+
+    model_status = highs.getModelStatus()
+    status = HIGHS_STATUSES.get(model_status.name, model_status.name[1:].lower())
+    solution = highs.getSolution()
+    has_solution = solution.value_valid if integer else status == 'optimal'
+    if not has_solution:
+        return MatrixResult(status, np.zeros(n), 0.0)
+    x = np.array(solution.col_value, dtype=float)
+    info = highs.getInfo()
+    if integer:
+        if status != 'optimal':
+            status = 'feasible'
+        return MatrixResult(status, x, float(info.objective_function_value), bound=float(info.mip_dual_bound), gap=float(info.mip_gap))
+
+    highs_basis = highs.getBasis()
+    col_basic = [j for j, col_status in enumerate(highs_basis.col_status) if col_status == highspy.HighsBasisStatus.kBasic]
+    row_basic = [n + i for i, row_status in enumerate(highs_basis.row_status) if row_status == highspy.HighsBasisStatus.kBasic]
+    return MatrixResult(status, x, float(info.objective_function_value), basis=np.array(col_basic + row_basic, dtype=int))
+
+def write_mps(path: str, c, A, b, integer: bool = False, name: str = 'PencilProduction'):
+    """Writes c, A @ x <= b, x >= 0 as free MPS, column j named X<j> and row i R<i>.
+
+    MPS has no portable objective sense, so the solver has to be told to maximize (glpsol --max).
+    Lines are formatted with NumPy string operations rather than per coefficient in Python.
+    """
+    A = sp.csc_matrix(A)
+    m, n = A.shape
+    col_names = np.char.add('X', np.arange(n).astype(str))
+    row_names = np.char.add('R', np.arange(m).astype(str))
+
+    # Each column's objective entry first, then its matrix entries; MPS needs a column's entries together.
+    entry_cols = np.concatenate([np.arange(n), np.repeat(np.arange(n), np.diff(A.indptr))])
+    entry_rows = np.concatenate([np.full(n, 'OBJ'), row_names[A.indices]])
+    entry_vals = np.concatenate([np.asarray(c, dtype=float), A.data])
+    order = np.argsort(entry_cols, kind='stable')
+    columns = np.char.add(np.char.add(np.char.add(np.char.add(' ', col_names[entry_cols[order]]), ' '), entry_rows[order]),
+                          np.char.add(' ', np.char.mod('%.17g', entry_vals[order])))
+    rhs = np.char.add(np.char.add(' RHS ', row_names), np.char.add(' ', np.char.mod('%.17g', np.asarray(b, dtype=float))))
+
+    lines = [f'NAME {name}', 'ROWS', ' N OBJ', *np.char.add(' L ', row_names).tolist(), 'COLUMNS']
+    if integer:
+        lines.append(" MARKER 'MARKER' 'INTORG'")
+    lines.extend(columns.tolist())
+    if integer:
+        lines.append(" MARKER 'MARKER' 'INTEND'")
+    lines.append('RHS')
+    lines.extend(rhs.tolist())
+    if integer:
+        # Some readers default integer columns to binary; x >= 0 with no upper bound.
+        lines.append('BOUNDS')
+        lines.extend(np.char.add(' PL BND ', col_names).tolist())
+    lines.append('ENDATA')
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines))
+        f.write('\n')
+
+def _parse_glpsol_solution(path: str, n: int, m: int, integer: bool) -> MatrixResult:
+    """Reads glpsol's --write output (the GLPK 4.57+ format with 's', 'i' and 'j' lines).
+
+    Reading the MPS file drops the free objective row, so rows are numbered as in `A`.
+    """
+    with open(path) as f:
+        lines = [line.split() for line in f if line.strip() and not line.startswith('c')]
+    header = lines[0]
+    if header[0] != 's':
+        raise ValueError(f'unsupported glpsol solution format in {path}')
+    if (int(header[2]), int(header[3])) != (m, n):
+        raise ValueError(f'glpsol solution in {path} has {header[2]} rows and {header[3]} columns, expected {m} and {n}')
+    x = np.zeros(n)
+    col_basic, row_basic = [], []
+    for tokens in lines[1:]:
+        if tokens[0] == 'j':
+            x[int(tokens[1]) - 1] = float(tokens[3] if header[1] == 'bas' else tokens[2])
+            if header[1] == 'bas' and tokens[2] == 'b':
+                col_basic.append(int(tokens[1]) - 1)
+        elif tokens[0] == 'i' and header[1] == 'bas' and tokens[2] == 'b':
+            row_basic.append(n + int(tokens[1]) - 1)
+
+    if integer:
+        stat, objective = header[4], float(header[5])
+        status = {'o': 'optimal', 'f': 'feasible', 'n': 'infeasible'}.get(stat, 'other')
+        if status not in ('optimal', 'feasible'):
+            return MatrixResult(status, np.zeros(n), 0.0)
+        return MatrixResult(status, x, objective, bound=objective if status == 'optimal' else None,
+                            gap=0.0 if status == 'optimal' else None)
+
+    primal, dual, objective = header[4], header[5], float(header[6])
+    if primal == 'f' and dual == 'f':
+        return MatrixResult('optimal', x, objective, basis=np.array(col_basic + row_basic, dtype=int))
+    status = 'infeasible' if primal in ('i', 'n') else 'unbounded' if dual == 'n' else 'other'
+    return MatrixResult(status, np.zeros(n), 0.0)
+
+def solve_glpsol(c, A, b, maximize: bool = True, integer: bool = False, time_limit: Optional[float] = None,
+                 mip_gap: float = 1e-4, executable: str = 'glpsol') -> MatrixResult:
+    """Same as `solve_highs`, through an MPS file and the glpsol command line."""
+    m, n = A.shape
+    with tempfile.TemporaryDirectory(prefix='pencil_prod_mps') as tmp_dir:
+        mps_path = os.path.join(tmp_dir, 'model.mps')
+        soln_path = os.path.join(tmp_dir, 'model.sol')
+        write_mps(mps_path, c, A, b, integer)
+        cmd = [executable, '--freemps', mps_path, '--max' if maximize else '--min', '--write', soln_path]
+        if time_limit is not None:
+            cmd.extend(['--tmlim', str(max(1, int(time_limit)))])
+        if integer:
+            cmd.extend(['--mipgap', str(mip_gap)])
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if not os.path.exists(soln_path):
+            raise RuntimeError(f'glpsol failed ({proc.returncode}): {proc.stdout[-500:]}')
+        return _parse_glpsol_solution(soln_path, n, m, integer)
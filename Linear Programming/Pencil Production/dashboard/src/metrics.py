@@ -0,0 +1,158 @@
+"""Per-phase timing histograms and model-size gauges shared by all workers on the host.
+
+Observations are buffered in-process and flushed to an SQLite file once per callback, so solves
+running in background job processes are counted alongside the gunicorn workers.  `render_metrics`
+produces the Prometheus text exposition format served at /metrics.
+"""
+from contextlib import contextmanager
+import cProfile
+import functools
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict
+
+METRICS_PATH = os.environ.get('LP_METRICS_PATH', os.path.join(tempfile.gettempdir(), 'pencil_prod_metrics.sqlite'))
+PROFILE_DIR = os.environ.get('LP_PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'pencil_prod_profiles'))
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+METRIC_HELP = {
+    'lp_phase_seconds': ('histogram', 'Time spent in each phase of a callback or solve.'),
+    'lp_callback_seconds': ('histogram', 'Total time spent in each Dash callback.'),
+    'lp_model_variables': ('gauge', 'Decision variables in the most recently solved model.'),
+    'lp_model_constraints': ('gauge', 'Constraints in the most recently solved model.'),
+    'lp_model_nonzeros': ('gauge', 'Nonzero constraint coefficients in the most recently solved model.'),
+    'lp_portfolio_seconds': ('histogram', 'Solve time of the winning backend of each portfolio race.'),
+    'lp_mip_nodes': ('gauge', 'Branch-and-bound nodes explored by the most recent in-process integer solve.'),
+}
+
+_pending_observations = []
+_pending_gauges: Dict[tuple, float] = {}
+_pending_lock = threading.Lock()
+# As in session_store, a fork must not leave the child with the lock taken.
+os.register_at_fork(before=_pending_lock.acquire, after_in_parent=_pending_lock.release, after_in_child=_pending_lock.release)
+_local = threading.local()
+
+def _connect() -> sqlite3.Connection:
+    # Connections must not cross a fork or be shared between the threads of a gunicorn worker.
+    if getattr(_local, 'pid', None) != os.getpid():
+        conn = sqlite3.connect(METRICS_PATH, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS buckets (name TEXT, labels TEXT, le REAL, count INTEGER, PRIMARY KEY (name, labels, le))')
+        conn.execute('CREATE TABLE IF NOT EXISTS sums (name TEXT, labels TEXT, total REAL, count INTEGER, PRIMARY KEY (name, labels))')
+        conn.execute('CREATE TABLE IF NOT EXISTS gauges (name TEXT, labels TEXT, value REAL, PRIMARY KEY (name, labels))')
+        _local.conn, _local.pid = conn, os.getpid()
+    return _local.conn
+
+def _labels_key(labels: dict) -> str:
+    return json.dumps(labels, sort_keys=True)
+
+def observe(name: str, value: float, **labels):
+    with _pending_lock:
+        _pending_observations.append((name, _labels_key(labels), value))
+
+def set_gauge(name: str, value: float, **labels):
+    with _pending_lock:
+        _pending_gauges[(name, _labels_key(labels))] = value
+
+@contextmanager
+def timed(phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('lp_phase_seconds', time.perf_counter() - start, phase=phase)
+
+def flush():
+    with _pending_lock:
+        observations, gauges = list(_pending_observations), dict(_pending_gauges)
+        _pending_observations.clear()
+        _pending_gauges.clear()
+    if not observations and not gauges:
+        return
+    conn = _connect()
+    conn.execute('BEGIN')
+    for name, labels, value in observations:
+        le = next(bound for bound in BUCKETS if value <= bound)
+        conn.execute(
+            'INSERT INTO buckets VALUES (?, ?, ?, 1) ON CONFLICT (name, labels, le) DO UPDATE SET count = count + 1',
+            (name, labels, le)
+        )
+        conn.execute(
+            'INSERT INTO sums VALUES (?, ?, ?, 1) ON CONFLICT (name, labels) DO UPDATE SET total = total + excluded.total, count = count + 1',
+            (name, labels, value)
+        )
+    for (name, labels), value in gauges.items():
+        conn.execute('INSERT OR REPLACE INTO gauges VALUES (?, ?, ?)', (name, labels, value))
+    conn.execute('COMMIT')
+
+def _fmt_labels(labels: str, **extra) -> str:
+    items = {**json.loads(labels), **extra}
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items.items()) + '}'
+
+def _fmt_le(le: float) -> str:
+    return '+Inf' if le == float('inf') else repr(le)
+
+def render_metrics() -> str:
+    flush()
+    conn = _connect()
+    lines = []
+    for name, (metric_type, help_txt) in METRIC_HELP.items():
+        lines.append(f'# HELP {name} {help_txt}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        if metric_type == 'gauge':
+            for labels, value in conn.execute('SELECT labels, value FROM gauges WHERE name = ? ORDER BY labels', (name,)):
+                lines.append(f'{name}{_fmt_labels(labels)} {value!r}')
+            continue
+
+        counts = {}
+        for labels, le, count in conn.execute('SELECT labels, le, count FROM buckets WHERE name = ?', (name,)):
+            counts.setdefault(labels, {})[le] = count
+        for labels, total, count in conn.execute('SELECT labels, total, count FROM sums WHERE name = ? ORDER BY labels', (name,)):
+            cumulative = 0
+            for le in BUCKETS:
+                cumulative += counts.get(labels, {}).get(le, 0)
+                lines.append(f'{name}_bucket{_fmt_labels(labels, le=_fmt_le(le))} {cumulative}')
+            lines.append(f'{name}_sum{_fmt_labels(labels)} {total!r}')
+            lines.append(f'{name}_count{_fmt_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+def arm_profile(callback_name: str) -> str:
+    """Requests a cProfile dump of the next call of `callback_name` in any worker."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    flag = os.path.join(PROFILE_DIR, f'{callback_name}.armed')
+    open(flag, 'w').close()
+    return flag
+
+def _claim_profile(callback_name: str) -> bool:
+    try:
+        os.remove(os.path.join(PROFILE_DIR, f'{callback_name}.armed'))
+    except FileNotFoundError:
+        return False
+    return True
+
+def instrumented(callback_name: str):
+    """Times a callback, flushes its observations and, when armed, dumps a cProfile of one call."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = cProfile.Profile() if _claim_profile(callback_name) else None
+            start = time.perf_counter()
+            try:
+                if profiler is None:
+                    return func(*args, **kwargs)
+                return profiler.runcall(func, *args, **kwargs)
+            finally:
+                observe('lp_callback_seconds', time.perf_counter() - start, callback=callback_name)
+                if profiler is not None:
+                    profiler.dump_stats(os.path.join(PROFILE_DIR, f'{callback_name}-{os.getpid()}-{int(time.time())}.prof'))
+                flush()
+        return wrapper
+    return decorator
@@ -0,0 +1,251 @@
+"""Races the locally installed solvers on the same problem and learns which one to use per instance size.
+
+`solve_portfolio` forks one process per available backend, takes the first proven result (optimal,
+infeasible or unbounded) and kills the rest.  The racers solve for the plan only; the sensitivity
+analysis is run once, on the winner's basis.  Each race is recorded in an SQLite file shared by all
+workers on the host, keyed by a size bucket of the problem.  Once one backend has won enough of
+the races in a bucket, `solve_auto` calls it directly, and only re-races every
+PORTFOLIO_RERACE_EVERY solves to notice when another backend has become faster.
+"""
+import importlib.util
+import math
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import shutil
+import signal
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from lp_data import CompiledProblem
+from lp_model import LPResult, IN_PROCESS_SOLVER, MIP_GAP, solve_problem, warm_basis, add_sensitivity
+import metrics
+from metrics import observe
+
+PORTFOLIO_BACKENDS = os.environ.get('LP_PORTFOLIO_BACKENDS', 'simplex,highspy,glpsol,cbc').split(',')
+PORTFOLIO_STATS_PATH = os.environ.get('LP_PORTFOLIO_STATS_PATH', os.path.join(tempfile.gettempdir(), 'pencil_prod_portfolio.sqlite'))
+# Races in a bucket before a winner is trusted, and the share of them it must have won.
+PORTFOLIO_MIN_RACES = int(os.environ.get('LP_PORTFOLIO_MIN_RACES', 5))
+PORTFOLIO_TRUST = float(os.environ.get('LP_PORTFOLIO_TRUST', 0.8))
+PORTFOLIO_RERACE_EVERY = int(os.environ.get('LP_PORTFOLIO_RERACE_EVERY', 50))
+# The in-process simplex is dense; above this many constraints it is not raced.
+PORTFOLIO_SIMPLEX_MAX_ROWS = int(os.environ.get('LP_PORTFOLIO_SIMPLEX_MAX_ROWS', 1000))
+
+PROVEN_STATUSES = ('optimal', 'infeasible', 'unbounded')
+# Backends that need an executable on the PATH; others are Python modules or Pyomo plugins.
+BACKEND_EXECUTABLES = {'glpsol': 'glpsol', 'glpk': 'glpsol', 'cbc': 'cbc'}
+BACKEND_MODULES = {'highspy': 'highspy', 'appsi_highs': 'highspy'}
+
+_local = threading.local()
+
+def _connect() -> sqlite3.Connection:
+    # One connection per process and thread, as in metrics.
+    if getattr(_local, 'pid', None) != os.getpid():
+        conn = sqlite3.connect(PORTFOLIO_STATS_PATH, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS backend_stats (bucket TEXT, backend TEXT, races INTEGER, wins INTEGER, '
+                     'win_seconds REAL, solo_runs INTEGER, solo_seconds REAL, PRIMARY KEY (bucket, backend))')
+        conn.execute('CREATE TABLE IF NOT EXISTS bucket_stats (bucket TEXT PRIMARY KEY, solos_since_race INTEGER)')
+        _local.conn, _local.pid = conn, os.getpid()
+    return _local.conn
+
+def backend_available(name: str) -> bool:
+    if name == IN_PROCESS_SOLVER:
+        return True
+    if name in BACKEND_EXECUTABLES:
+        return shutil.which(BACKEND_EXECUTABLES[name]) is not None
+    if name in BACKEND_MODULES:
+        return importlib.util.find_spec(BACKEND_MODULES[name]) is not None
+    from lp_model import get_solver
+    return bool(get_solver(name).available(exception_flag=False))
+
+def available_backends(backends: Optional[List[str]] = None) -> List[str]:
+    return [name for name in (backends or PORTFOLIO_BACKENDS) if name and backend_available(name)]
+
+def race_backends(problem: CompiledProblem, backends: List[str]) -> List[str]:
+    """`backends` without the in-process simplex when the problem is too large for it, unless it is the only one."""
+    if len(problem.depts) + len(problem.parts) <= PORTFOLIO_SIMPLEX_MAX_ROWS:
+        return backends
+    return [name for name in backends if name != IN_PROCESS_SOLVER] or backends
+
+def size_bucket(problem: CompiledProblem, integer: bool = False) -> str:
+    """Instances whose nonzero count lies in the same power of 4, kept apart for LP and integer solves."""
+    nnz = problem.dept_time.nnz + problem.bom.nnz
+    return f"{'mip' if integer else 'lp'}-{4**int(math.log(nnz + 1, 4))}"
+
+def _ensure_rows(conn: sqlite3.Connection, bucket: str, backends: List[str]):
+    conn.executemany('INSERT OR IGNORE INTO backend_stats VALUES (?, ?, 0, 0, 0.0, 0, 0.0)', [(bucket, name) for name in backends])
+
+def record_race(bucket: str, backends: List[str], winner: Optional[str], seconds: float):
+    conn = _connect()
+    conn.execute('BEGIN')
+    _ensure_rows(conn, bucket, backends)
+    conn.executemany('UPDATE backend_stats SET races = races + 1 WHERE bucket = ? AND backend = ?', [(bucket, name) for name in backends])
+    if winner is not None:
+        conn.execute('UPDATE backend_stats SET wins = wins + 1, win_seconds = win_seconds + ? WHERE bucket = ? AND backend = ?',
+                     (seconds, bucket, winner))
+    conn.execute('INSERT OR REPLACE INTO bucket_stats VALUES (?, 0)', (bucket,))
+    conn.execute('COMMIT')
+
+def record_solo(bucket: str, backend: str, seconds: float):
+    conn = _connect()
+    conn.execute('BEGIN')
+    _ensure_rows(conn, bucket, [backend])
+    conn.execute('UPDATE backend_stats SET solo_runs = solo_runs + 1, solo_seconds = solo_seconds + ? WHERE bucket = ? AND backend = ?',
+                 (seconds, bucket, backend))
+    conn.execute('INSERT OR IGNORE INTO bucket_stats VALUES (?, 0)', (bucket,))
+    conn.execute('UPDATE bucket_stats SET solos_since_race = solos_since_race + 1 WHERE bucket = ?', (bucket,))
+    conn.execute('COMMIT')
+
+def backend_stats() -> List[dict]:
+    rows = _connect().execute('SELECT bucket, backend, races, wins, win_seconds, solo_runs, solo_seconds FROM backend_stats '
+                              'ORDER BY bucket, wins DESC, backend')
+    return [{'bucket': bucket, 'backend': backend, 'races': races, 'wins': wins,
+             'mean_win_seconds': win_seconds/wins if wins else None, 'solo_runs': solo_runs,
+             'mean_solo_seconds': solo_seconds/solo_runs if solo_runs else None}
+            for bucket, backend, races, wins, win_seconds, solo_runs, solo_seconds in rows]
+
+def choose_backend(bucket: str, backends: List[str]) -> Optional[str]:
+    """The backend trusted to win in `bucket`, or None when the next solve should be a race."""
+    conn = _connect()
+    rows = conn.execute('SELECT backend, races, wins FROM backend_stats WHERE bucket = ?', (bucket,)).fetchall()
+    stats = {backend: (races, wins) for backend, races, wins in rows if backend in backends}
+    if not stats:
+        return None
+    leader, (races, wins) = max(stats.items(), key=lambda item: item[1][1])
+    # A backend that was not in the earlier races has not had its chance yet.
+    if any(backend not in stats for backend in backends) or races < PORTFOLIO_MIN_RACES or wins < PORTFOLIO_TRUST*races:
+        return None
+    row = conn.execute('SELECT solos_since_race FROM bucket_stats WHERE bucket = ?', (bucket,)).fetchone()
+    if row is not None and row[0] + 1 >= PORTFOLIO_RERACE_EVERY:
+        return None
+    return leader
+
+def _race_worker(conn, problem: CompiledProblem, backend: str, tee: bool, time_limit: Optional[float], integer: bool,
+                 mip_gap: float):
+    # Own process group, so killing a loser also kills any solver executable it started.
+    os.setpgrp()
+    start = time.perf_counter()
+    try:
+        result = solve_problem(problem, backend, tee, time_limit, integer, mip_gap, sensitivity=False)
+        # Backends that report a basis leave it as the warm start; the others' is recovered from the plan.
+        basis = warm_basis(problem) if result.status == 'optimal' and not integer else None
+        conn.send((backend, result, time.perf_counter() - start, basis, None))
+    except Exception as exc:
+        conn.send((backend, None, time.perf_counter() - start, None, f'{type(exc).__name__}: {exc}'))
+    conn.close()
+    metrics.flush()
+
+def _kill(proc: multiprocessing.Process):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        # Not (or no longer) a group leader; the process itself may still be running.
+        proc.kill()
+
+def _best_unproven(results: List[tuple], integer: bool) -> Optional[tuple]:
+    """An incumbent from a time-limited integer search beats a bare status; among those the best objective wins."""
+    if not results:
+        return None
+    feasible = [entry for entry in results if entry[1].status == 'feasible']
+    if integer and feasible:
+        return max(feasible, key=lambda entry: entry[1].objective)
+    return results[0]
+
+def solve_portfolio(problem: CompiledProblem, backends: Optional[List[str]] = None, tee: bool = False,
+                    time_limit: Optional[float] = None, integer: bool = False, mip_gap: float = MIP_GAP,
+                    sensitivity: bool = True) -> Tuple[LPResult, str]:
+    """Runs every available backend on `problem` at once and returns the first proven result with its backend.
+
+    When none proves a result within `time_limit`, the best incumbent (integer) or the first answer
+    is returned instead.  With `sensitivity`, the winning plan is ranged afterwards in this process.
+    """
+    backends = race_backends(problem, available_backends(backends))
+    if not backends:
+        raise RuntimeError('no portfolio backend is available')
+    bucket = size_bucket(problem, integer)
+    ctx = multiprocessing.get_context('fork')
+    procs, conns = {}, {}
+    start = time.perf_counter()
+    for backend in backends:
+        recv_conn, send_conn = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_race_worker, args=(send_conn, problem, backend, tee, time_limit, integer, mip_gap), daemon=True)
+        proc.start()
+        # Set here as well as in the worker, so the group exists before any loser can be killed.
+        try:
+            os.setpgid(proc.pid, proc.pid)
+        except (ProcessLookupError, PermissionError):
+            pass
+        send_conn.close()
+        procs[backend], conns[recv_conn] = proc, backend
+
+    deadline = None if time_limit is None else start + time_limit + 1.0
+    winner, unproven, errors = None, [], []
+    try:
+        while conns and winner is None:
+            timeout = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            ready = wait(list(conns), timeout)
+            if not ready:
+                break
+            for recv_conn in ready:
+                backend = conns.pop(recv_conn)
+                try:
+                    _, result, seconds, basis, error = recv_conn.recv()
+                except EOFError:
+                    result, seconds, basis, error = None, time.perf_counter() - start, None, 'exited without a result'
+                recv_conn.close()
+                if error is not None:
+                    errors.append(f'{backend}: {error}')
+                elif result.status in PROVEN_STATUSES:
+                    winner = (backend, result, seconds, basis)
+                    break
+                else:
+                    unproven.append((backend, result, seconds, basis))
+    finally:
+        for backend, proc in procs.items():
+            if winner is None or backend != winner[0]:
+                _kill(proc)
+        for recv_conn in conns:
+            recv_conn.close()
+        for proc in procs.values():
+            proc.join()
+
+    record_race(bucket, backends, winner[0] if winner else None, winner[2] if winner else 0.0)
+    observe('lp_phase_seconds', time.perf_counter() - start, phase='portfolio_race')
+    if winner is None:
+        winner = _best_unproven(unproven, integer)
+    if winner is None:
+        raise RuntimeError('every portfolio backend failed: ' + '; '.join(errors) if errors else 'no portfolio backend finished in time')
+    backend, result, seconds, basis = winner
+    observe('lp_portfolio_seconds', seconds, backend=backend, bucket=bucket)
+    if sensitivity and not integer:
+        time_left = None if time_limit is None else max(time_limit - (time.perf_counter() - start), 0.0)
+        result = add_sensitivity(problem, result, basis, time_left)
+    return result, backend
+
+def solve_auto(problem: CompiledProblem, tee: bool = False, time_limit: Optional[float] = None, integer: bool = False,
+               mip_gap: float = MIP_GAP, sensitivity: bool = True) -> LPResult:
+    """Solves with the backend learned for the problem's size bucket, racing all backends while there is none."""
+    backends = race_backends(problem, available_backends())
+    bucket = size_bucket(problem, integer)
+    backend = choose_backend(bucket, backends)
+    if backend is None:
+        return solve_portfolio(problem, backends, tee, time_limit, integer, mip_gap, sensitivity)[0]
+    start = time.perf_counter()
+    result = solve_problem(problem, backend, tee, time_limit, integer, mip_gap, sensitivity)
+    record_solo(bucket, backend, time.perf_counter() - start)
+    return result
+
+def portfolio_summary() -> Dict[str, dict]:
+    """Per size bucket, the backend `solve_auto` would pick and the stats of every backend raced there."""
+    backends = available_backends()
+    summary = {}
+    for row in backend_stats():
+        summary.setdefault(row['bucket'], {'choice': None, 'backends': []})['backends'].append(row)
+    for bucket, entry in summary.items():
+        entry['choice'] = choose_backend(bucket, backends)
+    return summary
@@ -0,0 +1,129 @@
+"""Reads scenario files into the data.json shape used by lp_data.
+
+JSON files are data.json documents.  Excel workbooks and CSV files are laid out like the Data sheet
+of pencil_prod.xlsx and are located by their labels rather than fixed cells:
+
+* 'Product' / 'Sell Price' rows, and the 'Labor Rate' ($/minute) to the right of its label;
+* a 'Dept' header with '<product> (sec)' columns and 'Capacity (hrs)';
+* a 'Product' header with '<part> (<uom>)' columns, one row of BOM quantities per product, given in
+  the part's inventory UOM;
+* a 'Component' row of part names followed by 'Unit of Measure', 'Inventory' and 'Cost' rows.
+"""
+import json
+import os
+import re
+from typing import List, Optional, Tuple
+
+SCENARIO_EXTENSIONS = ('.json', '.xlsx', '.xls', '.csv')
+
+Grid = List[list]
+
+def _is_blank(value) -> bool:
+    return value is None or (isinstance(value, float) and value != value) or str(value).strip() == ''
+
+def _text(value) -> str:
+    return '' if _is_blank(value) else str(value).strip()
+
+def _cell(grid: Grid, r: int, c: int):
+    if r < len(grid) and c < len(grid[r]):
+        return grid[r][c]
+    return None
+
+def _find(grid: Grid, label: str, right_of: Optional[str] = None) -> Tuple[int, int]:
+    """Position of the first cell reading `label`, optionally followed by a cell matching `right_of`."""
+    for r, row in enumerate(grid):
+        for c, value in enumerate(row):
+            if _text(value) == label and (right_of is None or re.fullmatch(right_of, _text(_cell(grid, r, c + 1)))):
+                return r, c
+    raise KeyError(f"label '{label}' not found")
+
+def _rows_below(grid: Grid, r: int, c: int):
+    r += 1
+    while not _is_blank(_cell(grid, r, c)):
+        yield r
+        r += 1
+
+def _columns_right(grid: Grid, r: int, c: int):
+    c += 1
+    while not _is_blank(_cell(grid, r, c)):
+        yield c
+        c += 1
+
+def product_id(name: str) -> str:
+    return re.sub(r'\W+', '_', name.strip().lower()).strip('_')
+
+def parse_data_sheet(grid: Grid) -> dict:
+    """data.json dict from the cells of a sheet laid out like the Data sheet of pencil_prod.xlsx."""
+    r, c = _find(grid, 'Sell Price')
+    products = [{'product': product_id(_text(_cell(grid, row, c - 1))), 'name': _text(_cell(grid, row, c - 1)),
+                 'price': float(_cell(grid, row, c))} for row in _rows_below(grid, r, c - 1)]
+    ids = {prod_det['name']: prod_det['product'] for prod_det in products}
+
+    r, c = _find(grid, 'Labor Rate')
+    shop_labor_rate = float(_cell(grid, r, c + 1))
+
+    r, c = _find(grid, 'Dept')
+    dept_cols = {}
+    capacity_col = None
+    for col in _columns_right(grid, r, c):
+        header = _text(_cell(grid, r, col))
+        match = re.fullmatch(r'(.+) \(sec\)', header)
+        if match and match.group(1) in ids:
+            dept_cols[ids[match.group(1)]] = col
+        elif header.startswith('Capacity'):
+            capacity_col = col
+    dept = [{'dept': _text(_cell(grid, row, c)), **{prod: float(_cell(grid, row, col) or 0) for prod, col in dept_cols.items()},
+             'capacity': float(_cell(grid, row, capacity_col))} for row in _rows_below(grid, r, c)]
+
+    r, c = _find(grid, 'Component')
+    part_cols = list(_columns_right(grid, r, c))
+    part_rows = {_text(_cell(grid, row, c)): row for row in range(r + 1, r + 4)}
+    parts = [{
+        'part': _text(_cell(grid, r, col)),
+        'cost': float(_cell(grid, part_rows['Cost'], col)),
+        'inv': float(_cell(grid, part_rows['Inventory'], col)),
+        'uom': _text(_cell(grid, part_rows['Unit of Measure'], col)).upper()
+    } for col in part_cols]
+    uoms = {part_det['part']: part_det['uom'] for part_det in parts}
+
+    r, c = _find(grid, 'Product', right_of=r'.+ \((?!sec|hrs)\w+\)')
+    bom = {}
+    for col in _columns_right(grid, r, c):
+        part = re.fullmatch(r'(.+) \(\w+\)', _text(_cell(grid, r, col))).group(1)
+        bom[part] = {'part': part, **{ids[_text(_cell(grid, row, c))]: float(_cell(grid, row, col) or 0) for row in _rows_below(grid, r, c)},
+                     'uom': uoms[part]}
+
+    return {
+        'products': products,
+        'shop_labor_rate': shop_labor_rate,
+        'parts': parts,
+        'bom': [bom.get(part_det['part'], {'part': part_det['part'], 'uom': part_det['uom']}) for part_det in parts],
+        'dept': dept
+    }
+
+def _read_grid(path: str) -> Grid:
+    import pandas as pd
+    if path.endswith('.csv'):
+        frame = pd.read_csv(path, header=None, dtype=object, skip_blank_lines=False)
+    else:
+        # Formulas are read as their last calculated values; the first sheet is the Data sheet.
+        frame = pd.read_excel(path, sheet_name=0, header=None)
+    return frame.astype(object).where(frame.notna(), None).values.tolist()
+
+def load_scenario(path: str) -> dict:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.json':
+        with open(path) as f:
+            return json.load(f)
+    if ext in SCENARIO_EXTENSIONS:
+        return parse_data_sheet(_read_grid(path))
+    raise ValueError(f'unsupported scenario file {path}')
+
+def iter_scenario_files(directory: str, recursive: bool = False):
+    """Scenario paths under `directory` in sorted order, listed one directory at a time."""
+    entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_dir() and recursive:
+            yield from iter_scenario_files(entry.path, recursive)
+        elif entry.is_file() and entry.name.lower().endswith(SCENARIO_EXTENSIONS) and not entry.name.startswith(('.', '~$')):
+            yield entry.path
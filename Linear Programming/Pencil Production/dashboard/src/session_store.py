@@ -0,0 +1,211 @@
+"""Per-session copies of the model data kept on the server, so callbacks only carry a version token.
+
+A token is '<session id>:<version>'.  Sessions live in a diskcache directory shared by all workers as a
+snapshot of the data plus a log of the edits made since; every recorded edit bumps the version.  Each
+worker keeps recently used sessions live in memory, with their data rows and compiled problem, and
+catches up by replaying only the edits it has not seen.  A cell edit therefore updates just the
+coefficients and unit costs it touches instead of re-conditioning and recompiling everything.
+
+Edits change the live data and problem in place, so readers are handed a snapshot instead: a copy of
+both taken at one version, made on the first read after an edit and shared until the next one.
+"""
+from collections import OrderedDict
+import copy
+from dataclasses import dataclass
+import os
+import tempfile
+import threading
+import uuid
+from typing import Dict, Optional, Tuple
+
+import diskcache
+
+import lp_data
+from lp_data import CompiledProblem, compile_problem
+
+SESSION_DIR = os.environ.get('LP_SESSION_DIR', os.path.join(tempfile.gettempdir(), 'pencil_prod_sessions'))
+SESSION_TTL = float(os.environ.get('LP_SESSION_TTL', 24*3600))
+SNAPSHOT_EVERY = int(os.environ.get('LP_SESSION_SNAPSHOT_EVERY', 200))
+MAX_LIVE_SESSIONS = int(os.environ.get('LP_MAX_LIVE_SESSIONS', 32))
+
+ROW_KEYS = {'parts': 'part', 'bom': 'part', 'dept': 'dept'}
+TEXT_COLUMNS = {'part', 'dept', 'uom'}
+
+session_cache = diskcache.Cache(SESSION_DIR)
+
+class SessionExpired(KeyError):
+    pass
+
+class EditRejected(ValueError):
+    """An edit that cannot be applied, such as a rename that breaks the link between parts and BOM rows.
+    The session is left unchanged."""
+
+@dataclass
+class LiveSession:
+    version: int
+    data: dict
+    problem: CompiledProblem
+    rows: Dict[str, Dict[str, dict]]
+    snapshot: Optional[Tuple[dict, CompiledProblem]] = None
+
+_live: 'OrderedDict[str, LiveSession]' = OrderedDict()
+_live_lock = threading.Lock()
+# Background callback jobs are forked from whichever gunicorn thread starts them.  Holding the lock
+# across the fork keeps another thread from being mid-update, and the child from starting with the
+# lock taken for good.
+os.register_at_fork(before=_live_lock.acquire, after_in_parent=_live_lock.release, after_in_child=_live_lock.release)
+
+def parse_token(token: str) -> Tuple[str, int]:
+    session_id, version = token.rsplit(':', 1)
+    return session_id, int(version)
+
+def _index_rows(data: dict) -> Dict[str, Dict[str, dict]]:
+    return {table: {row[key]: row for row in data[table]} for table, key in ROW_KEYS.items()}
+
+def _load_live(version: int, data: dict) -> LiveSession:
+    return LiveSession(version, data, compile_problem(data), _index_rows(data))
+
+def _cell_value(col: str, value):
+    return value if col in TEXT_COLUMNS else float(value or 0)
+
+def _apply_cell_edit(live: LiveSession, table: str, event: dict):
+    key = ROW_KEYS[table]
+    col = event['colId']
+    row = live.rows[table].get(event['row_key'])
+    if row is None:
+        raise EditRejected(f"no {table} row '{event['row_key']}'")
+    value = _cell_value(col, event['newValue'])
+    problem = live.problem
+
+    if col == key:
+        # Renames change the model's structure, so recompile.
+        row[col] = value
+        try:
+            live.problem = compile_problem(live.data)
+        except KeyError as exc:
+            row[col] = event['oldValue']
+            raise EditRejected(f"renaming {table} row '{event['oldValue']}' to '{value}' leaves {exc} unmatched") from exc
+        live.rows = _index_rows(live.data)
+        return
+
+    if table == 'parts' and col == 'uom':
+        bom_row = live.rows['bom'].get(row['part'])
+        if bom_row is not None:
+            old_conversion = lp_data.bom_conversion(bom_row['uom'], row['uom'])
+            lp_data.scale_bom_row(problem, row['part'], lp_data.bom_conversion(bom_row['uom'], value)/old_conversion)
+    elif table == 'parts' and col == 'cost':
+        lp_data.set_part_cost(problem, row['part'], value)
+    elif table == 'parts' and col == 'inv':
+        lp_data.set_inv_capacity(problem, row['part'], value)
+    elif table == 'bom' and col == 'uom':
+        part_uom = live.rows['parts'][row['part']]['uom']
+        old_conversion = lp_data.bom_conversion(row['uom'], part_uom)
+        lp_data.scale_bom_row(problem, row['part'], lp_data.bom_conversion(value, part_uom)/old_conversion)
+    elif table == 'bom' and col in problem.prod_idx:
+        conversion = lp_data.bom_conversion(row['uom'], live.rows['parts'][row['part']]['uom'])
+        lp_data.set_bom_qty(problem, row['part'], col, value, conversion)
+    elif table == 'dept' and col == 'capacity':
+        lp_data.set_dept_capacity(problem, row['dept'], value)
+    elif table == 'dept' and col in problem.prod_idx:
+        lp_data.set_dept_time(problem, row['dept'], col, value)
+    row[col] = value
+
+def _apply_edit(live: LiveSession, edit: dict):
+    if edit['kind'] == 'cell':
+        _apply_cell_edit(live, edit['table'], edit['event'])
+    elif edit['kind'] == 'price':
+        price = float(edit['price'] or 0)
+        for prod_det in live.data['products']:
+            if prod_det['product'] == edit['product']:
+                prod_det['price'] = price
+        lp_data.set_price(live.problem, edit['product'], price)
+    elif edit['kind'] == 'shop_rate':
+        live.data['shop_labor_rate'] = float(edit['shop_rate'] or 0)
+        lp_data.set_shop_labor_rate(live.problem, live.data['shop_labor_rate'])
+    live.version += 1
+    live.snapshot = None
+
+def _sync(session_id: str) -> LiveSession:
+    """The worker's live copy of the session, caught up with edits recorded by any worker."""
+    meta = session_cache.get(session_id)
+    if meta is None:
+        raise SessionExpired(session_id)
+    live = _live.get(session_id)
+    if live is None or live.version < meta['snapshot_version'] or live.version > meta['version']:
+        snapshot = session_cache.get(f'{session_id}:snapshot')
+        if snapshot is None:
+            raise SessionExpired(session_id)
+        live = _load_live(meta['snapshot_version'], snapshot)
+    for version in range(live.version + 1, meta['version'] + 1):
+        edit = session_cache.get(f'{session_id}:edit:{version}')
+        if edit is None:
+            raise SessionExpired(session_id)
+        _apply_edit(live, edit)
+    _live[session_id] = live
+    _live.move_to_end(session_id)
+    while len(_live) > MAX_LIVE_SESSIONS:
+        _live.popitem(last=False)
+    return live
+
+def new_session(ui_data: dict) -> str:
+    session_id = uuid.uuid4().hex
+    session_cache.set(f'{session_id}:snapshot', ui_data, expire=SESSION_TTL)
+    session_cache.set(session_id, {'version': 0, 'snapshot_version': 0}, expire=SESSION_TTL)
+    return f'{session_id}:0'
+
+def record_edit(token: str, edit: dict) -> str:
+    """Appends `edit` to the session's log, applies it to the live copy and returns the new version token.
+
+    Raises EditRejected, without logging anything, when the edit cannot be applied.
+    """
+    session_id, _ = parse_token(token)
+    with _live_lock, session_cache.transact():
+        live = _sync(session_id)
+        _apply_edit(live, edit)
+        version = live.version
+        session_cache.set(f'{session_id}:edit:{version}', edit, expire=SESSION_TTL)
+        meta = session_cache.get(session_id)
+        meta['version'] = version
+        if version - meta['snapshot_version'] >= SNAPSHOT_EVERY:
+            # Fold the log into a new snapshot so a cold worker never replays more than SNAPSHOT_EVERY edits.
+            session_cache.set(f'{session_id}:snapshot', live.data, expire=SESSION_TTL)
+            for old_version in range(meta['snapshot_version'] + 1, version + 1):
+                session_cache.delete(f'{session_id}:edit:{old_version}')
+            meta['snapshot_version'] = version
+        else:
+            session_cache.touch(f'{session_id}:snapshot', expire=SESSION_TTL)
+        session_cache.set(session_id, meta, expire=SESSION_TTL)
+    return f'{session_id}:{version}'
+
+def cell_edit(table: str, event: dict) -> dict:
+    """Log entry for an AG Grid cellValueChanged event."""
+    key = ROW_KEYS[table]
+    row_key = event['oldValue'] if event['colId'] == key else event['data'][key]
+    return {'kind': 'cell', 'table': table, 'event': {'colId': event['colId'], 'oldValue': event.get('oldValue'), 'newValue': event.get('newValue'), 'row_key': row_key}}
+
+def price_edit(product: str, price: float) -> dict:
+    return {'kind': 'price', 'product': product, 'price': price}
+
+def shop_rate_edit(shop_rate: float) -> dict:
+    return {'kind': 'shop_rate', 'shop_rate': shop_rate}
+
+def _copy_data(data: dict) -> dict:
+    # Tables are lists of flat rows; everything else is a scalar.
+    return {key: [row.copy() for row in value] if isinstance(value, list) else value for key, value in data.items()}
+
+def load_snapshot(token: str) -> Tuple[dict, CompiledProblem]:
+    """The session's current data and compiled problem, both of the same version; a stale token
+    resolves to the latest one.  The snapshot is shared between readers, who must not change it.
+    """
+    session_id, _ = parse_token(token)
+    with _live_lock:
+        live = _sync(session_id)
+        if live.snapshot is None:
+            live.snapshot = (_copy_data(live.data), copy.deepcopy(live.problem))
+        return live.snapshot
+
+def load_session(token: str) -> dict:
+    return load_snapshot(token)[0]
+
+def get_problem(token: str) -> CompiledProblem:
+    return load_snapshot(token)[1]
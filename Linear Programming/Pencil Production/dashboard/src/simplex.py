@@ -0,0 +1,387 @@
+"""Revised primal simplex method on dense NumPy arrays.
+
+Follows the tableau method taught in the Primal Simplex Method notebooks but keeps only the basis
+inverse, updated with one rank-1 (product form) step per pivot and refactored periodically.
+Rows without a usable slack column (>= and = rows) start from artificial variables which are driven
+out either with a Phase I problem or with Big-M penalties as in the artificial start notebook.
+
+Shadow prices, reduced costs and the ranges over which objective coefficients and right-hand sides
+can move without changing the optimal basis are read off the final basis by `sensitivity_analysis`,
+which works on a sparse LU factorization of the basis rather than its dense inverse.
+
+A basis from a previous solve can be passed back in.  When it is still primal feasible (only the
+objective changed) primal simplex continues from it; when it is still dual feasible (only the
+right-hand sides changed) dual simplex restores primal feasibility from it.
+"""
+from dataclasses import dataclass
+from typing import Optional, Sequence
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+TOL = 1e-9
+REFACTOR_EVERY = 50
+DEGENERATE_PIVOTS_BEFORE_BLAND = 50
+# Tolerance of is_optimal_basis, which checks bases taken from another solver's rounded plan.
+BASIS_CHECK_TOL = 1e-7
+# Tableau rows / basis inverse columns solved for at once in sensitivity_analysis.
+SENSITIVITY_BLOCK = 256
+
+@dataclass
+class SimplexResult:
+    status: str
+    x: np.ndarray
+    objective: float
+    iterations: int
+    basis: Optional[np.ndarray] = None
+    start: str = 'cold'
+
+@dataclass
+class StandardForm:
+    """min cost @ x  s.t.  A @ x == b, x >= 0 with b >= 0.
+
+    Columns are ordered structural, slack/surplus (one per inequality row) then artificial.
+    """
+    A: np.ndarray
+    b: np.ndarray
+    cost: np.ndarray
+    n: int
+    row_sign: np.ndarray
+    slack_cols: np.ndarray
+    art_cols: np.ndarray
+
+@dataclass
+class Sensitivity:
+    """Sensitivity of an optimal basis in terms of the original problem.
+
+    `duals` and `rhs_ranges` follow the rows of A; `reduced_costs` and `cost_ranges` follow its columns.
+    Ranges are (low, high) pairs which may be infinite.
+    """
+    duals: np.ndarray
+    reduced_costs: np.ndarray
+    cost_ranges: np.ndarray
+    rhs_ranges: np.ndarray
+
+def to_standard_form(c, A, b, senses: Optional[Sequence[str]] = None, maximize: bool = False, sparse: bool = False) -> StandardForm:
+    """With `sparse` the constraint matrix of the standard form is a scipy CSC matrix."""
+    if sparse:
+        A = sp.csr_matrix(A, dtype=float)
+    else:
+        A = A.toarray() if hasattr(A, 'toarray') else np.array(A, dtype=float)
+        A = A.reshape(len(b), -1).astype(float)
+    m, n = A.shape
+    b = np.array(b, dtype=float)
+    senses = np.array(['<=']*m if senses is None else list(senses))
+
+    row_sign = np.where(b < 0, -1.0, 1.0)
+    A = sp.diags(row_sign) @ A if sparse else A*row_sign[:, None]
+    b = b*row_sign
+
+    slack_coef = np.where(senses == '<=', 1.0, np.where(senses == '>=', -1.0, 0.0))*row_sign
+    slack_rows = np.flatnonzero(senses != '=')
+    art_rows = np.flatnonzero(slack_coef <= 0)
+
+    slack_cols = np.full(m, -1)
+    slack_cols[slack_rows] = n + np.arange(len(slack_rows))
+    art_cols = np.full(m, -1)
+    art_cols[art_rows] = n + len(slack_rows) + np.arange(len(art_rows))
+
+    if sparse:
+        slack_block = sp.csr_matrix((slack_coef[slack_rows], (slack_rows, np.arange(len(slack_rows)))), shape=(m, len(slack_rows)))
+        art_block = sp.csr_matrix((np.ones(len(art_rows)), (art_rows, np.arange(len(art_rows)))), shape=(m, len(art_rows)))
+        A = sp.hstack([A, slack_block, art_block], format='csc')
+    else:
+        slack_block = np.zeros((m, len(slack_rows)))
+        slack_block[slack_rows, np.arange(len(slack_rows))] = slack_coef[slack_rows]
+        art_block = np.zeros((m, len(art_rows)))
+        art_block[art_rows, np.arange(len(art_rows))] = 1.0
+        A = np.hstack([A, slack_block, art_block])
+
+    cost = np.zeros(n + len(slack_rows) + len(art_rows))
+    cost[:n] = -np.asarray(c, dtype=float) if maximize else np.asarray(c, dtype=float)
+    return StandardForm(
+        A=A,
+        b=b,
+        cost=cost,
+        n=n,
+        row_sign=row_sign,
+        slack_cols=slack_cols,
+        art_cols=art_cols
+    )
+
+def _pivot(B_inv: np.ndarray, u: np.ndarray, r: int):
+    B_inv[r] /= u[r]
+    eta = u.copy()
+    eta[r] = 0
+    B_inv -= np.outer(eta, B_inv[r])
+
+def _primal_simplex(sf: StandardForm, cost: np.ndarray, basis: np.ndarray, B_inv: np.ndarray, candidates: np.ndarray, max_iter: int, deadline: Optional[float]) -> tuple:
+    iterations = 0
+    degenerate_run = 0
+    while True:
+        if iterations >= max_iter:
+            return 'iteration_limit', B_inv, iterations
+        if deadline is not None and time.perf_counter() > deadline:
+            return 'time_limit', B_inv, iterations
+        if iterations and iterations % REFACTOR_EVERY == 0:
+            B_inv = np.linalg.inv(sf.A[:, basis])
+
+        x_B = np.maximum(B_inv @ sf.b, 0)
+        y = cost[basis] @ B_inv
+        d = cost - y @ sf.A
+        d[basis] = 0
+        d[~candidates] = 0
+
+        if degenerate_run > DEGENERATE_PIVOTS_BEFORE_BLAND:
+            improving = np.flatnonzero(d < -TOL)
+            if len(improving) == 0:
+                return 'optimal', B_inv, iterations
+            j = improving[0]
+        else:
+            j = int(np.argmin(d))
+            if d[j] >= -TOL:
+                return 'optimal', B_inv, iterations
+
+        u = B_inv @ sf.A[:, j]
+        pos = u > TOL
+        if not pos.any():
+            return 'unbounded', B_inv, iterations
+        ratios = np.full(len(u), np.inf)
+        ratios[pos] = x_B[pos]/u[pos]
+        theta = ratios.min()
+        ties = np.flatnonzero(ratios <= theta + TOL)
+        r = ties[np.argmin(basis[ties])]
+
+        _pivot(B_inv, u, r)
+        basis[r] = j
+        degenerate_run = degenerate_run + 1 if theta <= TOL else 0
+        iterations += 1
+
+def _dual_simplex(sf: StandardForm, cost: np.ndarray, basis: np.ndarray, B_inv: np.ndarray, candidates: np.ndarray, max_iter: int, deadline: Optional[float]) -> tuple:
+    iterations = 0
+    while True:
+        if iterations >= max_iter:
+            return 'iteration_limit', B_inv, iterations
+        if deadline is not None and time.perf_counter() > deadline:
+            return 'time_limit', B_inv, iterations
+        if iterations and iterations % REFACTOR_EVERY == 0:
+            B_inv = np.linalg.inv(sf.A[:, basis])
+
+        x_B = B_inv @ sf.b
+        r = int(np.argmin(x_B))
+        if x_B[r] >= -TOL*max(1.0, np.abs(sf.b).max(initial=0)):
+            return 'optimal', B_inv, iterations
+
+        alpha = B_inv[r] @ sf.A
+        d = cost - (cost[basis] @ B_inv) @ sf.A
+        eligible = candidates & (alpha < -TOL)
+        eligible[basis] = False
+        if not eligible.any():
+            return 'infeasible', B_inv, iterations
+        cols = np.flatnonzero(eligible)
+        ratios = np.maximum(d[cols], 0)/-alpha[cols]
+        j = cols[np.argmin(ratios)]
+
+        u = B_inv @ sf.A[:, j]
+        _pivot(B_inv, u, r)
+        basis[r] = j
+        iterations += 1
+
+def _warm_start(sf: StandardForm, basis: np.ndarray, is_art: np.ndarray, max_iter: int, deadline: Optional[float], maximize: bool) -> Optional[SimplexResult]:
+    m = sf.A.shape[0]
+    basis = np.array(basis, dtype=int)
+    if len(basis) != m or len(np.unique(basis)) != m or basis.max(initial=0) >= sf.A.shape[1] or is_art[basis].any():
+        return None
+    try:
+        B_inv = np.linalg.inv(sf.A[:, basis])
+    except np.linalg.LinAlgError:
+        return None
+
+    x_B = B_inv @ sf.b
+    if (x_B >= -TOL*max(1.0, np.abs(sf.b).max(initial=0))).all():
+        start = 'primal'
+        status, B_inv, iterations = _primal_simplex(sf, sf.cost, basis, B_inv, ~is_art, max_iter, deadline)
+    else:
+        d = sf.cost - (sf.cost[basis] @ B_inv) @ sf.A
+        d[basis] = 0
+        if (d[~is_art] < -TOL).any():
+            return None
+        start = 'dual'
+        status, B_inv, iterations = _dual_simplex(sf, sf.cost, basis, B_inv, ~is_art, max_iter, deadline)
+    result = _result(sf, status, basis, B_inv, iterations, maximize)
+    result.start = start
+    return result
+
+def _drive_out_artificials(sf: StandardForm, basis: np.ndarray, B_inv: np.ndarray, is_art: np.ndarray):
+    for r in np.flatnonzero(is_art[basis]):
+        row = B_inv[r] @ sf.A
+        row[basis] = 0
+        row[is_art] = 0
+        j = np.flatnonzero(np.abs(row) > TOL)
+        # A row without any usable entry is redundant and its artificial stays basic at zero.
+        if len(j):
+            u = B_inv @ sf.A[:, j[0]]
+            _pivot(B_inv, u, r)
+            basis[r] = j[0]
+
+def _result(sf: StandardForm, status: str, basis: np.ndarray, B_inv: np.ndarray, iterations: int, maximize: bool) -> SimplexResult:
+    x = np.zeros(sf.A.shape[1])
+    x[basis] = np.maximum(B_inv @ sf.b, 0)
+    objective = float(sf.cost[:sf.n] @ x[:sf.n])
+    return SimplexResult(
+        status=status,
+        x=x[:sf.n],
+        objective=-objective if maximize else objective,
+        iterations=iterations,
+        basis=basis.copy()
+    )
+
+def solve_lp(c, A, b, senses: Optional[Sequence[str]] = None, maximize: bool = False,
+             artificial: str = 'phase1', big_m: float = 1e6, max_iter: int = 50000,
+             time_limit: Optional[float] = None, basis: Optional[np.ndarray] = None) -> SimplexResult:
+    """Solves min/max c @ x s.t. A @ x (<=, >=, =) b, x >= 0.
+
+    `senses` holds one of '<=', '>=' or '=' per row (all '<=' by default).  `artificial` selects how
+    artificial variables are removed: 'phase1' (two-phase method) or 'big_m'.  `basis` is the
+    `SimplexResult.basis` of an earlier solve of the same shaped problem; it is ignored when it is
+    neither primal nor dual feasible for this problem.
+    """
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    sf = to_standard_form(c, A, b, senses, maximize)
+    m, N = sf.A.shape
+    is_art = np.zeros(N, dtype=bool)
+    is_art[sf.art_cols[sf.art_cols >= 0]] = True
+
+    if basis is not None:
+        warm = _warm_start(sf, basis, is_art, max_iter, deadline, maximize)
+        if warm is not None:
+            return warm
+
+    basis = np.where(sf.art_cols >= 0, sf.art_cols, sf.slack_cols)
+    B_inv = np.linalg.inv(sf.A[:, basis]) if m else np.zeros((0, 0))
+    iterations = 0
+
+    if artificial == 'big_m':
+        penalty = big_m*max(1.0, np.abs(sf.cost).max(initial=0))
+        cost = sf.cost + penalty*is_art
+        status, B_inv, iterations = _primal_simplex(sf, cost, basis, B_inv, np.ones(N, dtype=bool), max_iter, deadline)
+        if status in ('optimal', 'unbounded') and (B_inv @ sf.b)[is_art[basis]].sum() > TOL*max(1.0, sf.b.max(initial=0)):
+            # A positive artificial means infeasible when optimal; when unbounded it is ambiguous so Phase I decides.
+            if status == 'optimal':
+                status = 'infeasible'
+            else:
+                return solve_lp(c, A, b, senses, maximize, 'phase1', big_m, max_iter - iterations, time_limit)
+        return _result(sf, status, basis, B_inv, iterations, maximize)
+
+    if is_art.any():
+        status, B_inv, iterations = _primal_simplex(sf, is_art.astype(float), basis, B_inv, np.ones(N, dtype=bool), max_iter, deadline)
+        if status != 'optimal':
+            return _result(sf, status, basis, B_inv, iterations, maximize)
+        if (B_inv @ sf.b)[is_art[basis]].sum() > TOL*max(1.0, sf.b.max(initial=0)):
+            return _result(sf, 'infeasible', basis, B_inv, iterations, maximize)
+        _drive_out_artificials(sf, basis, B_inv, is_art)
+
+    status, B_inv, phase2_iterations = _primal_simplex(sf, sf.cost, basis, B_inv, ~is_art, max_iter - iterations, deadline)
+    return _result(sf, status, basis, B_inv, iterations + phase2_iterations, maximize)
+
+def _unit_columns(m: int, rows: np.ndarray) -> np.ndarray:
+    E = np.zeros((m, len(rows)))
+    E[rows, np.arange(len(rows))] = 1.0
+    return E
+
+def _blocks(items: np.ndarray):
+    for start in range(0, len(items), SENSITIVITY_BLOCK):
+        yield items[start:start + SENSITIVITY_BLOCK]
+
+def is_optimal_basis(c, A, b, basis: np.ndarray, senses: Optional[Sequence[str]] = None, maximize: bool = False) -> bool:
+    """Whether `basis` is nonsingular and both primal and dual feasible, i.e. ready for sensitivity_analysis."""
+    sf = to_standard_form(c, A, b, senses, maximize, sparse=True)
+    m, N = sf.A.shape
+    basis = np.array(basis, dtype=int)
+    if len(basis) != m or len(np.unique(basis)) != m:
+        return False
+    if not m:
+        return bool((sf.cost >= 0).all())
+    try:
+        lu = splu(sf.A[:, basis].tocsc())
+    except RuntimeError:
+        return False
+    x_B = lu.solve(sf.b)
+    y = lu.solve(sf.cost[basis], trans='T')
+    d = sf.cost - sf.A.T @ y
+    d[sf.art_cols[sf.art_cols >= 0]] = np.inf
+    d[basis] = 0
+    scale = max(1.0, np.abs(sf.b).max(initial=0))
+    return bool(np.isfinite(x_B).all() and x_B.min() >= -BASIS_CHECK_TOL*scale
+                and d.min() >= -BASIS_CHECK_TOL*max(1.0, np.abs(sf.cost).max(initial=0)))
+
+def sensitivity_analysis(c, A, b, basis: np.ndarray, senses: Optional[Sequence[str]] = None, maximize: bool = False) -> Sensitivity:
+    """Sensitivity of an optimal `basis`, from a sparse LU factorization of the basis matrix.
+
+    Only the tableau rows of basic structural variables (for cost ranging) and the basis inverse
+    columns of rows whose slack is nonbasic (for right-hand side ranging) are solved for, a block at
+    a time; a row with a basic slack has a unit column and is ranged directly.
+    """
+    sf = to_standard_form(c, A, b, senses, maximize, sparse=True)
+    m, N = sf.A.shape
+    basis = np.array(basis, dtype=int)
+    is_art = np.zeros(N, dtype=bool)
+    is_art[sf.art_cols[sf.art_cols >= 0]] = True
+    sign = -1.0 if maximize else 1.0
+
+    if m:
+        lu = splu(sf.A[:, basis].tocsc())
+        y = lu.solve(sf.cost[basis], trans='T')
+        x_B = lu.solve(sf.b)
+    else:
+        lu, y, x_B = None, np.zeros(0), np.zeros(0)
+    d = sf.cost - sf.A.T @ y
+    d[basis] = 0
+
+    # Range of each cost in the minimization form; d[k] - delta*alpha[r, k] must stay >= 0.
+    cost_ranges = np.empty((sf.n, 2))
+    cost_ranges[:, 0] = sf.cost[:sf.n] - d[:sf.n]
+    cost_ranges[:, 1] = np.inf
+    nonbasic = np.ones(N, dtype=bool)
+    nonbasic[basis] = False
+    nonbasic &= ~is_art
+    A_N = sf.A[:, nonbasic]
+    d_nb = d[nonbasic]
+    for rows in _blocks(np.flatnonzero(basis < sf.n)):
+        alpha = (A_N.T @ lu.solve(_unit_columns(m, rows), trans='T')).T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = d_nb/alpha
+        lower = np.where(alpha < -TOL, ratios, -np.inf).max(axis=1, initial=-np.inf)
+        upper = np.where(alpha > TOL, ratios, np.inf).min(axis=1, initial=np.inf)
+        cost_ranges[basis[rows]] = sf.cost[basis[rows], None] + np.column_stack([lower, upper])
+    if maximize:
+        cost_ranges = -cost_ranges[:, ::-1]
+
+    # Range of each right-hand side over which x_B + delta*B_inv[:, i] stays >= 0.
+    position = np.full(N, -1)
+    position[basis] = np.arange(m)
+    slack_pos = np.where(sf.slack_cols >= 0, position[sf.slack_cols], -1)
+    rhs_ranges = np.empty((m, 2))
+    # A basic slack in position r makes B_inv[:, i] the unit column e_r over the slack coefficient.
+    direct = np.flatnonzero(slack_pos >= 0)
+    slack_coef = np.asarray(sf.A[:, sf.slack_cols[direct]].sum(axis=0)).ravel()
+    step = -x_B[slack_pos[direct]]*slack_coef
+    rhs_ranges[direct, 0] = np.where(slack_coef > 0, step, -np.inf)
+    rhs_ranges[direct, 1] = np.where(slack_coef > 0, np.inf, step)
+    for rows in _blocks(np.flatnonzero(slack_pos < 0)):
+        cols = lu.solve(_unit_columns(m, rows))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = -x_B[:, None]/cols
+        rhs_ranges[rows, 0] = np.where(cols > TOL, ratios, -np.inf).max(axis=0, initial=-np.inf)
+        rhs_ranges[rows, 1] = np.where(cols < -TOL, ratios, np.inf).min(axis=0, initial=np.inf)
+    rhs_ranges += sf.b[:, None]
+    rhs_ranges[sf.row_sign < 0] = -rhs_ranges[sf.row_sign < 0, ::-1]
+
+    return Sensitivity(
+        duals=sign*y*sf.row_sign + 0.0,
+        reduced_costs=sign*d[:sf.n] + 0.0,
+        cost_ranges=cost_ranges,
+        rhs_ranges=rhs_ranges
+    )
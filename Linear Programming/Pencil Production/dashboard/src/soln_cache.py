@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+CACHE_PATH = os.environ.get('LP_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'pencil_prod_soln_cache.sqlite'))
+CACHE_MAX_ENTRIES = int(os.environ.get('LP_CACHE_MAX_ENTRIES', 1024))
+CACHE_TTL = float(os.environ.get('LP_CACHE_TTL', 3600))
+
+ROW_KEYS = {'products': 'product', 'parts': 'part', 'bom': 'part', 'dept': 'dept'}
+
+def _normalize(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+def canonical_key(ui_data: dict, namespace: str = '') -> str:
+    """Hash of the conditioned ui_data which ignores row order, key order and int/float spelling.
+
+    `namespace` separates entries whose cached values have different shapes.
+    """
+    canonical = {'namespace': namespace}
+    for key, value in ui_data.items():
+        if key in ROW_KEYS:
+            value = sorted(value, key=lambda row: str(row[ROW_KEYS[key]]))
+        canonical[key] = _normalize(value)
+    payload = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class SolutionCache:
+    """LRU/TTL cache of solve results in an SQLite file shared by all workers on the host."""
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not cross a fork or be shared between threads, so each worker thread opens its own.
+        if getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, value TEXT, created REAL, last_used REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)')
+            conn.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, count INTEGER)')
+            conn.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return self._local.conn
+
+    def get(self, key: str) -> Optional[dict]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute('SELECT value, created FROM solutions WHERE key = ?', (key,)).fetchone()
+        if row is not None and now - row[1] > self.ttl:
+            conn.execute('DELETE FROM solutions WHERE key = ?', (key,))
+            row = None
+        if row is None:
+            conn.execute("UPDATE stats SET count = count + 1 WHERE name = 'misses'")
+            return None
+        conn.execute('UPDATE solutions SET last_used = ? WHERE key = ?', (now, key))
+        conn.execute("UPDATE stats SET count = count + 1 WHERE name = 'hits'")
+        return json.loads(row[0])
+
+    def put(self, key: str, value: dict):
+        conn = self._connect()
+        now = time.time()
+        conn.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)', (key, json.dumps(value), now, now))
+        conn.execute('DELETE FROM solutions WHERE created < ?', (now - self.ttl,))
+        conn.execute(
+            'DELETE FROM solutions WHERE key IN (SELECT key FROM solutions ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        counts = dict(conn.execute('SELECT name, count FROM stats').fetchall())
+        counts['entries'] = conn.execute('SELECT COUNT(*) FROM solutions').fetchone()[0]
+        return counts
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute('DELETE FROM solutions')
+        conn.execute('UPDATE stats SET count = 0')
@@ -0,0 +1,119 @@
+"""Parametric sweeps: the optimal plan over a grid of one or two prices, capacities or costs.
+
+Every worker process compiles the data once and then, for each grid point, writes the swept values
+into its compiled problem with the in-place setters of lp_data.  Only coefficients and right-hand
+sides change between points, so each worker also keeps re-using its cached solver model and
+warm-start basis.  Points are handed out in chunks and results are yielded as each chunk finishes.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+import itertools
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import lp_data
+from lp_data import CompiledProblem, compile_problem
+from lp_model import solve_problem, SOLVER_NAME
+import metrics
+
+SWEEP_WORKERS = int(os.environ.get('LP_SWEEP_WORKERS', os.cpu_count() or 1))
+SWEEP_MAX_POINTS = int(os.environ.get('LP_SWEEP_MAX_POINTS', 10000))
+
+# kind: (setter, label); shop_labor_rate has no target.
+PARAM_KINDS = {
+    'price': (lp_data.set_price, 'Price ($)'),
+    'dept_capacity': (lp_data.set_dept_capacity, 'Capacity (Hours)'),
+    'inv_capacity': (lp_data.set_inv_capacity, 'Inventory'),
+    'part_cost': (lp_data.set_part_cost, 'Cost ($)'),
+    'shop_labor_rate': (lambda problem, _, rate: lp_data.set_shop_labor_rate(problem, rate), 'Shop Labor ($/minute)'),
+}
+
+@dataclass
+class SweepParam:
+    kind: str
+    target: Optional[str]
+    values: List[float]
+
+    @property
+    def label(self) -> str:
+        label = PARAM_KINDS[self.kind][1]
+        return f'{self.target} {label}' if self.target else label
+
+@dataclass
+class SweepPoint:
+    """`index` locates the point on the grid (one entry per parameter) and `values` holds its parameter values."""
+    index: Tuple[int, ...]
+    values: Tuple[float, ...]
+    status: str
+    objective: float
+    plan: Dict[str, float]
+
+def param_values(start: float, stop: float, steps: int) -> List[float]:
+    return np.linspace(float(start), float(stop), max(int(steps), 1)).tolist()
+
+def grid_points(params: List[SweepParam]) -> List[Tuple[int, ...]]:
+    return list(itertools.product(*(range(len(param.values)) for param in params)))
+
+def apply_point(problem: CompiledProblem, params: List[SweepParam], index: Tuple[int, ...]) -> Tuple[float, ...]:
+    values = tuple(param.values[k] for param, k in zip(params, index))
+    for param, value in zip(params, values):
+        PARAM_KINDS[param.kind][0](problem, param.target, value)
+    return values
+
+def solve_point(problem: CompiledProblem, params: List[SweepParam], index: Tuple[int, ...], solver_name: str,
+                time_limit: Optional[float] = None) -> SweepPoint:
+    values = apply_point(problem, params, index)
+    result = solve_problem(problem, solver_name, time_limit=time_limit, sensitivity=False)
+    return SweepPoint(index, values, result.status, result.objective, result.plan)
+
+_worker_state = {}
+
+def _init_worker(data: dict, params: List[SweepParam], solver_name: str, time_limit: Optional[float]):
+    _worker_state.update(problem=compile_problem(data), params=params, solver_name=solver_name, time_limit=time_limit)
+
+def _solve_chunk(chunk: List[Tuple[int, ...]]) -> List[SweepPoint]:
+    state = _worker_state
+    with metrics.timed('sweep_chunk'):
+        points = [solve_point(state['problem'], state['params'], index, state['solver_name'], state['time_limit']) for index in chunk]
+    metrics.flush()
+    return points
+
+def sweep(data: dict, params: List[SweepParam], solver_name: str = SOLVER_NAME, workers: int = SWEEP_WORKERS,
+          time_limit: Optional[float] = None) -> Iterator[SweepPoint]:
+    """Solves `data` at every point of the grid spanned by `params`, yielding points as they finish (in no fixed order).
+
+    With `workers` <= 1 the points are solved in this process.  Closing the iterator early cancels
+    the chunks that have not started.
+    """
+    points = grid_points(params)
+    if len(points) > SWEEP_MAX_POINTS:
+        raise ValueError(f'{len(points)} sweep points exceeds the limit of {SWEEP_MAX_POINTS}')
+    if workers <= 1:
+        problem = compile_problem(data)
+        for index in points:
+            yield solve_point(problem, params, index, solver_name, time_limit)
+        return
+
+    # Enough chunks per worker to balance uneven solve times without paying IPC per point.
+    chunk_size = max(1, len(points)//(workers*8))
+    chunks = [points[k:k + chunk_size] for k in range(0, len(points), chunk_size)]
+    pool = ProcessPoolExecutor(min(workers, len(chunks)), initializer=_init_worker, initargs=(data, params, solver_name, time_limit))
+    try:
+        futures = [pool.submit(_solve_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def current_value(data: dict, kind: str, target: Optional[str]) -> float:
+    """The value a parameter has in `data` (data.json / grid rows)."""
+    if kind == 'shop_labor_rate':
+        return float(data['shop_labor_rate'])
+    if kind == 'price':
+        return float(next(prod_det['price'] for prod_det in lp_data.read_products(data) if prod_det['product'] == target))
+    if kind == 'dept_capacity':
+        return float(next(row['capacity'] for row in data['dept'] if row['dept'] == target))
+    column = 'inv' if kind == 'inv_capacity' else 'cost'
+    return float(next(row[column] for row in data['parts'] if row['part'] == target))
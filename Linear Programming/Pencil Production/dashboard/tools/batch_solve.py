@@ -0,0 +1,212 @@
+"""Solves every scenario file in a directory on a worker pool and appends the results as they finish.
+
+    python batch_solve.py scenarios/ -o results/ --workers 8 --solver highspy --format parquet
+
+Scenario files are data.json documents, or Excel / CSV sheets laid out like pencil_prod.xlsx (see
+scenarios.py).  The output directory holds three tables:
+
+    summary  scenario, path, status, objective, solve_seconds, error
+    plans    scenario, product, units
+    duals    scenario, constraint, type, shadow_price
+
+With --format csv each table is one CSV file that grows with every flush; with --format parquet it
+is a directory of part files, readable as one dataset.  At most --max-pending scenarios are in
+flight and results are buffered for --flush-every scenarios, so memory stays bounded however many
+files there are.
+
+Each flush is recorded in _manifest.jsonl only after its rows are on disk.  Re-running the same
+command after a crash skips the scenarios already in the manifest and first discards anything
+written after the last recorded flush (CSV files are truncated back, newer Parquet parts removed).
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import glob
+import json
+import os
+import sys
+import time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TOOLS_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+import pandas as pd
+
+from lp_model import solve_lp_model, SOLVER_NAME
+from scenarios import load_scenario, iter_scenario_files
+import metrics
+
+COLUMNS = {
+    'summary': {'scenario': 'string', 'path': 'string', 'status': 'string', 'objective': 'float64', 'solve_seconds': 'float64', 'error': 'string'},
+    'plans': {'scenario': 'string', 'product': 'string', 'units': 'float64'},
+    'duals': {'scenario': 'string', 'constraint': 'string', 'type': 'string', 'shadow_price': 'float64'},
+}
+MANIFEST = '_manifest.jsonl'
+
+def solve_scenario(path: str, scenario: str, solver_name: str, time_limit) -> dict:
+    """Rows for each table; a scenario that fails to load or solve is reported in its summary row."""
+    start = time.perf_counter()
+    try:
+        result = solve_lp_model(load_scenario(path), solver_name, time_limit=time_limit)
+    except Exception as exc:
+        return {'summary': [{'scenario': scenario, 'path': path, 'status': 'error', 'objective': None,
+                             'solve_seconds': time.perf_counter() - start, 'error': f'{type(exc).__name__}: {exc}'}],
+                'plans': [], 'duals': []}
+    finally:
+        metrics.flush()
+    return {
+        'summary': [{'scenario': scenario, 'path': path, 'status': result.status, 'objective': result.objective,
+                     'solve_seconds': time.perf_counter() - start, 'error': None}],
+        'plans': [{'scenario': scenario, 'product': prod, 'units': units} for prod, units in result.plan.items()],
+        'duals': [{'scenario': scenario, 'constraint': name, 'type': row_type, 'shadow_price': dual}
+                  for row_type, duals in (('Department', result.dept_duals), ('Inventory', result.inv_duals))
+                  for name, dual in duals.items()]
+    }
+
+def _frame(table: str, rows: list) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=list(COLUMNS[table])).astype(COLUMNS[table])
+
+class CsvSink:
+    """One CSV file per table; its state is the size of each file."""
+    def __init__(self, out_dir: str):
+        self.paths = {table: os.path.join(out_dir, f'{table}.csv') for table in COLUMNS}
+
+    def restore(self, state: dict):
+        for table, path in self.paths.items():
+            if os.path.exists(path):
+                with open(path, 'r+b') as f:
+                    f.truncate(state.get(table, 0))
+
+    def write(self, table: str, rows: list):
+        path = self.paths[table]
+        with open(path, 'a', newline='') as f:
+            _frame(table, rows).to_csv(f, header=f.tell() == 0, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def state(self) -> dict:
+        return {table: os.path.getsize(path) if os.path.exists(path) else 0 for table, path in self.paths.items()}
+
+class ParquetSink:
+    """A directory of numbered part files per table; its state is the last part number."""
+    def __init__(self, out_dir: str):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            sys.exit('--format parquet needs pyarrow; install it or use --format csv')
+        self.dirs = {table: os.path.join(out_dir, table) for table in COLUMNS}
+        for table_dir in self.dirs.values():
+            os.makedirs(table_dir, exist_ok=True)
+        self.part = 0
+
+    def restore(self, state: dict):
+        self.part = state.get('part', 0)
+        for table_dir in self.dirs.values():
+            for path in glob.glob(os.path.join(table_dir, 'part-*.parquet')):
+                if int(os.path.basename(path)[5:-8]) > self.part:
+                    os.remove(path)
+
+    def write(self, table: str, rows: list):
+        path = os.path.join(self.dirs[table], f'part-{self.part + 1:06d}.parquet')
+        _frame(table, rows).to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+    def state(self) -> dict:
+        self.part += 1
+        return {'part': self.part}
+
+def read_manifest(out_dir: str):
+    """Scenarios already written and the sink state after the last complete flush."""
+    done, state = set(), {}
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return done, state
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A line torn by a crash; its rows were never committed.
+                break
+            done.update(entry['scenarios'])
+            state = entry['state']
+    return done, state
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input_dir')
+    parser.add_argument('-o', '--output-dir', required=True)
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--solver', default=SOLVER_NAME)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--time-limit', type=float, default=None, help='seconds per scenario')
+    parser.add_argument('--max-pending', type=int, default=None, help='scenarios in flight (default 4 per worker)')
+    parser.add_argument('--flush-every', type=int, default=100, help='scenarios per write')
+    parser.add_argument('--recursive', action='store_true')
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    sink = ParquetSink(args.output_dir) if args.format == 'parquet' else CsvSink(args.output_dir)
+    done, state = read_manifest(args.output_dir)
+    sink.restore(state)
+    if done:
+        print(f'resuming: {len(done)} scenarios already written', file=sys.stderr)
+
+    buffer = {table: [] for table in COLUMNS}
+    buffered = []
+    counts = {'solved': 0, 'optimal': 0, 'error': 0}
+    start = time.perf_counter()
+
+    def collect(futures):
+        for future in futures:
+            rows = future.result()
+            for table, table_rows in rows.items():
+                buffer[table].extend(table_rows)
+            summary = rows['summary'][0]
+            buffered.append(summary['scenario'])
+            counts['solved'] += 1
+            counts['optimal'] += summary['status'] == 'optimal'
+            counts['error'] += summary['status'] == 'error'
+
+    def flush():
+        if not buffered:
+            return
+        for table, rows in buffer.items():
+            if rows:
+                sink.write(table, rows)
+            rows.clear()
+        with open(os.path.join(args.output_dir, MANIFEST), 'a') as f:
+            f.write(json.dumps({'scenarios': buffered, 'state': sink.state()}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        buffered.clear()
+        elapsed = time.perf_counter() - start
+        print(f"{counts['solved']} solved, {counts['solved']/elapsed:.1f} jobs/s", file=sys.stderr)
+
+    input_dir = os.path.abspath(args.input_dir)
+    max_pending = args.max_pending or 4*args.workers
+    with ProcessPoolExecutor(args.workers) as pool:
+        pending = set()
+        for path in iter_scenario_files(input_dir, args.recursive):
+            scenario = os.path.relpath(path, input_dir)
+            if scenario in done:
+                continue
+            if len(pending) >= max_pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+                if len(buffered) >= args.flush_every:
+                    flush()
+            pending.add(pool.submit(solve_scenario, path, scenario, args.solver, args.time_limit))
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(finished)
+            if len(buffered) >= args.flush_every:
+                flush()
+    flush()
+
+    elapsed = time.perf_counter() - start
+    print(f"{counts['solved']} scenarios in {elapsed:.2f}s ({counts['solved']/elapsed if elapsed else 0:.1f} jobs/s): "
+          f"{counts['optimal']} optimal, {counts['error']} errors, {len(done)} skipped as already written")
+
+if __name__ == '__main__':
+    main()
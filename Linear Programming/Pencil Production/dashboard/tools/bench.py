@@ -0,0 +1,188 @@
+"""Times the LP pipeline and the load chart coefficients on synthetic instances of increasing size.
+
+    python bench.py --sizes tiny small medium --repeats 5 -o bench-head.json
+    python bench.py --sizes tiny small medium --compare bench-base.json
+
+Each stage is run `--repeats` times per size and its min/median/mean seconds are written to JSON
+along with the commit (to -o, or bench-<commit>.json in the current directory), so two result files
+can be compared with `--compare`.  A comparison exits non-zero when any stage's best (min) time
+slowed by more than `--threshold`.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TOOLS_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, TOOLS_DIR)
+
+import numpy as np
+
+import lp_model
+from lp_data import compile_problem, units_vector, calc_profit
+from lp_model import build_lp_model, update_lp_model, get_solver, solve_lp_arrays, solve_lp_model, IN_PROCESS_SOLVER, DIRECT_SOLVERS
+from lp_data import stack_constraints
+from matrix_solver import write_mps
+from gen_instance import generate_instance
+import session_store
+
+# name: (products, parts, depts, bom_density)
+SIZES = {
+    'tiny': (2, 9, 4, 0.5),
+    'small': (10, 50, 8, 0.2),
+    'medium': (50, 500, 20, 0.05),
+    'large': (200, 2000, 50, 0.02),
+    'xlarge': (1000, 10000, 100, 0.005),
+}
+
+def time_stage(func, repeats: int, setup=None) -> dict:
+    timings = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {'min': min(timings), 'median': statistics.median(timings), 'mean': statistics.mean(timings), 'repeats': repeats}
+
+def reset_lp_model_caches():
+    lp_model._lp_model = None
+    lp_model._lp_model_key = None
+    lp_model._warm_bases.clear()
+
+def bench_size(size: str, solvers: list, repeats: int, seed: int, max_simplex_rows: int) -> dict:
+    import app
+
+    n_products, n_parts, n_depts, bom_density = SIZES[size]
+    data = generate_instance(n_products, n_parts, n_depts, bom_density, seed=seed)
+    problem = compile_problem(data)
+    stages = {}
+
+    stages['compile_problem'] = time_stage(lambda: compile_problem(data), repeats)
+    stages['build_lp_model'] = time_stage(lambda: build_lp_model(problem), repeats)
+    model = build_lp_model(problem)
+    stages['update_lp_model'] = time_stage(lambda: update_lp_model(model, problem), repeats)
+    A, b, _ = stack_constraints(problem)
+    mps_path = os.path.join(TOOLS_DIR, f'.bench-{size}.mps')
+    stages['write_mps'] = time_stage(lambda: write_mps(mps_path, problem.unit_profit, A, b), repeats)
+    os.remove(mps_path)
+
+    use_simplex = len(problem.depts) + len(problem.parts) <= max_simplex_rows
+    units = None
+    for solver_name in solvers:
+        if solver_name == IN_PROCESS_SOLVER:
+            if not use_simplex:
+                continue
+            stages['solve_lp_arrays'] = time_stage(lambda: solve_lp_arrays(problem), repeats, reset_lp_model_caches)
+        elif solver_name in DIRECT_SOLVERS:
+            if solver_name == 'glpsol' and shutil.which('glpsol') is None:
+                print(f'skipping {solver_name}: not available')
+                continue
+        else:
+            solver = get_solver(solver_name)
+            if not solver.available(exception_flag=False):
+                print(f'skipping {solver_name}: not available')
+                continue
+            stages[f'solver_solve[{solver_name}]'] = time_stage(lambda: solver.solve(model, load_solutions=False), repeats)
+        stages[f'solve_lp_model_cold[{solver_name}]'] = time_stage(lambda: solve_lp_model(data, solver_name), repeats, reset_lp_model_caches)
+        stages[f'solve_lp_model_warm[{solver_name}]'] = time_stage(lambda: solve_lp_model(data, solver_name), repeats)
+        if units is None:
+            units = units_vector(problem, solve_lp_model(data, solver_name).plan)
+
+    if units is None:
+        units = np.zeros(len(problem.products))
+    stages['calc_profit'] = time_stage(lambda: calc_profit(problem, units), repeats)
+    token = session_store.new_session(data)
+    bom_row = data['bom'][0]
+    bom_col = next(col for col in bom_row if col in problem.prod_idx)
+    def record_bom_edit():
+        nonlocal token
+        event = {'colId': bom_col, 'oldValue': bom_row[bom_col], 'newValue': float(bom_row[bom_col]) + 1, 'data': bom_row}
+        token = session_store.record_edit(token, session_store.cell_edit('bom', event))
+    session_store.get_problem(token)
+    stages['record_edit[bom_cell]'] = time_stage(record_bom_edit, repeats)
+
+    # The load charts themselves are drawn in the browser from these coefficients.
+    stages['gen_load_coeffs'] = time_stage(lambda: json.dumps(app.gen_load_coeffs(problem)), repeats)
+
+    return {
+        'size': size,
+        'products': n_products,
+        'parts': n_parts,
+        'depts': n_depts,
+        'bom_density': bom_density,
+        'nonzeros': int(problem.bom.nnz + problem.dept_time.nnz),
+        'load_coeffs_bytes': len(json.dumps(app.gen_load_coeffs(problem))),
+        'stages': stages
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=TOOLS_DIR, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    base_sizes = {entry['size']: entry['stages'] for entry in baseline['results']}
+    regressed = False
+    print(f"{'size':<8} {'stage':<40} {'base ms':>10} {'head ms':>10} {'ratio':>7}")
+    for entry in results['results']:
+        for stage, timing in entry['stages'].items():
+            base = base_sizes.get(entry['size'], {}).get(stage)
+            if base is None:
+                continue
+            # The min is the least noisy estimate for short stages.
+            ratio = timing['min']/base['min'] if base['min'] > 0 else float('inf')
+            flag = ''
+            if ratio > threshold:
+                flag = '  REGRESSED'
+                regressed = True
+            print(f"{entry['size']:<8} {stage:<40} {base['min']*1000:>10.3f} {timing['min']*1000:>10.3f} {ratio:>7.2f}{flag}")
+    return not regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=['tiny', 'small', 'medium', 'large'], choices=list(SIZES))
+    parser.add_argument('--solvers', nargs='+', default=[IN_PROCESS_SOLVER, 'glpk'])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-simplex-rows', type=int, default=1000, help='skip the in-process simplex above this many constraints')
+    parser.add_argument('-o', '--output', default=None)
+    parser.add_argument('--compare', default=None, help='baseline results JSON')
+    parser.add_argument('--threshold', type=float, default=1.25, help='min-time ratio that counts as a regression')
+    args = parser.parse_args()
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeats': args.repeats,
+        'seed': args.seed,
+        'results': []
+    }
+    for size in args.sizes:
+        entry = bench_size(size, args.solvers, args.repeats, args.seed, args.max_simplex_rows)
+        results['results'].append(entry)
+        for stage, timing in entry['stages'].items():
+            print(f"{size:<8} {stage:<40} median {timing['median']*1000:10.3f} ms")
+
+    output = args.output or f"bench-{results['commit'][:8]}.json"
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'wrote {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.exit(0 if compare(results, baseline, args.threshold) else 1)
+
+if __name__ == '__main__':
+    main()
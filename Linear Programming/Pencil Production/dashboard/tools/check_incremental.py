@@ -0,0 +1,170 @@
+"""Cross-checks the incremental grid edits of session_store against compiling the edited data from scratch.
+
+    python check_incremental.py --edits 400 --seed 0
+
+A random instance takes a random mix of cell, price and shop-rate edits, including UOM changes that
+rescale a BOM row, quantities set to or from zero that insert or remove a nonzero, and renames that
+recompile.  After every edit the compiled problem is compared with compile_problem on the same data
+as seen by the worker that recorded the edit, by a worker that lags behind and catches up by replaying
+the log, and by a cold worker that starts from the snapshot.
+"""
+import argparse
+import atexit
+from collections import OrderedDict
+import copy
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TOOLS_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+# A throwaway session directory, and snapshots often enough for a cold worker to start from several.
+if 'LP_SESSION_DIR' not in os.environ:
+    os.environ['LP_SESSION_DIR'] = tempfile.mkdtemp(prefix='pencil_prod_check_sessions')
+    atexit.register(shutil.rmtree, os.environ['LP_SESSION_DIR'], True)
+os.environ.setdefault('LP_SESSION_SNAPSHOT_EVERY', '64')
+
+import numpy as np
+
+from lp_data import CompiledProblem, compile_problem
+import session_store
+from session_store import ROW_KEYS, EditRejected, new_session, record_edit, get_problem, load_session, cell_edit, price_edit, shop_rate_edit
+from check_simplex import random_instance
+
+COLUMNS = {
+    'parts': ['part', 'cost', 'inv', 'uom'],
+    'bom': ['uom'],
+    'dept': ['dept', 'capacity'],
+}
+
+def _number(rng: random.Random):
+    # Zeros add and remove nonzeros; a cleared cell arrives as None.
+    return rng.choice([0, 0, None, round(rng.uniform(0.01, 20), 2), round(rng.uniform(0.01, 20), 2), str(round(rng.uniform(0.01, 5), 2))])
+
+def random_edit(rng: random.Random, data: dict) -> dict:
+    """An edit as the app records it: a grid cellValueChanged event, a price or a shop-rate change."""
+    products = [prod_det['product'] for prod_det in data['products']]
+    kind = rng.choices(['cell', 'price', 'shop_rate'], weights=[8, 1, 1])[0]
+    if kind == 'price':
+        return price_edit(rng.choice(products), _number(rng))
+    if kind == 'shop_rate':
+        return shop_rate_edit(_number(rng))
+
+    table = rng.choice(list(ROW_KEYS))
+    row = rng.choice(data[table])
+    col = rng.choice(COLUMNS[table] + ([] if table == 'parts' else products))
+    if col == ROW_KEYS[table]:
+        # Renaming a part leaves the BOM pointing at the old name, so the edit has to be rejected.
+        # Rows are keyed by name, so a department is only renamed to a new one.
+        value = f'{row[col]}_r' if table == 'dept' else rng.choice([f'{row[col]}_r', rng.choice(data[table])[col]])
+    elif col == 'uom':
+        value = rng.choice(['EA', 'LB']) if table == 'parts' else rng.choice(['EA', 'OZ'])
+    else:
+        value = _number(rng)
+    event = {'colId': col, 'oldValue': row.get(col), 'newValue': value, 'data': {**row, col: value}}
+    return cell_edit(table, event)
+
+def apply_reference(data: dict, edit: dict):
+    """Applies `edit` to plain data, the way the grid and inputs would change it."""
+    if edit['kind'] == 'price':
+        for prod_det in data['products']:
+            if prod_det['product'] == edit['product']:
+                prod_det['price'] = float(edit['price'] or 0)
+    elif edit['kind'] == 'shop_rate':
+        data['shop_labor_rate'] = float(edit['shop_rate'] or 0)
+    else:
+        table, event = edit['table'], edit['event']
+        key = ROW_KEYS[table]
+        for row in data[table]:
+            if row[key] == event['row_key']:
+                row[event['colId']] = session_store._cell_value(event['colId'], event['newValue'])
+                break
+
+def compare(name: str, problem: CompiledProblem, ref: CompiledProblem) -> bool:
+    ok = True
+    for field in ('products', 'parts', 'depts'):
+        if getattr(problem, field) != getattr(ref, field):
+            print(f'MISMATCH {name}: {field}')
+            ok = False
+    if not ok:
+        return False
+    for field in ('bom', 'dept_time'):
+        usage, ref_usage = getattr(problem, field), getattr(ref, field)
+        usage.check_format(full_check=True)
+        if not np.allclose(usage.toarray(), ref_usage.toarray(), rtol=1e-9, atol=1e-12):
+            print(f'MISMATCH {name}: {field} values')
+            ok = False
+        # Removed nonzeros must not linger as explicit zeros, and the in-place edits rely on sorted rows.
+        if usage.nnz != ref_usage.nnz or not usage.has_sorted_indices:
+            print(f'MISMATCH {name}: {field} has {usage.nnz} stored entries, expected {ref_usage.nnz} sorted')
+            ok = False
+    for field in ('dept_capacity', 'inv_capacity', 'part_cost', 'prices', 'shop_labor_rate', 'unit_matl_cost', 'unit_labor_cost', 'unit_profit'):
+        if not np.allclose(getattr(problem, field), getattr(ref, field), rtol=1e-9, atol=1e-9):
+            print(f'MISMATCH {name}: {field}')
+            ok = False
+    return ok
+
+def check_worker(name: str, live: OrderedDict, token: str, data: dict, ref: CompiledProblem) -> bool:
+    session_store._live = live
+    if load_session(token) != data:
+        print(f'MISMATCH {name}: data')
+        return False
+    return compare(name, get_problem(token), ref)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--edits', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--lag', type=float, default=0.2, help='chance the lagging worker catches up after an edit')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    data = random_instance(rng)
+    token = new_session(copy.deepcopy(data))
+    writer, lagging = OrderedDict(), OrderedDict()
+    results = []
+    counts = {'cell': 0, 'price': 0, 'shop_rate': 0, 'rejected': 0}
+    for n in range(args.edits):
+        edit = random_edit(rng, data)
+        edited = copy.deepcopy(data)
+        apply_reference(edited, edit)
+        try:
+            ref = compile_problem(edited)
+        except KeyError:
+            ref = None
+
+        session_store._live = writer
+        try:
+            token = record_edit(token, edit)
+        except EditRejected:
+            if ref is not None:
+                print(f'MISMATCH edit #{n}: {edit} was rejected')
+                results.append(False)
+                break
+            counts['rejected'] += 1
+            ref = compile_problem(data)
+        else:
+            if ref is None:
+                print(f'MISMATCH edit #{n}: {edit} should have been rejected')
+                results.append(False)
+                break
+            data = edited
+            counts[edit['kind']] += 1
+
+        results.append(check_worker(f'edit #{n} (recording worker)', writer, token, data, ref))
+        if rng.random() < args.lag:
+            results.append(check_worker(f'edit #{n} (lagging worker)', lagging, token, data, ref))
+        results.append(check_worker(f'edit #{n} (cold worker)', OrderedDict(), token, data, ref))
+        if not results[-1]:
+            print(f'  after {edit}')
+
+    print(f"{counts['cell']} cell, {counts['price']} price and {counts['shop_rate']} shop-rate edits, {counts['rejected']} rejected renames")
+    print(f'{sum(results)}/{len(results)} checks passed')
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == '__main__':
+    main()
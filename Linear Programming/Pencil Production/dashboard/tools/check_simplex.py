@@ -0,0 +1,103 @@
+"""Cross-checks the in-process simplex engine against a Pyomo solver (GLPK by default) or a direct one.
+
+    python check_simplex.py --instances 200 --solver glpk
+    python check_simplex.py --instances 50 --solver glpk --integer
+    python check_simplex.py --instances 200 --solver glpsol
+
+With --integer both sides solve for whole units with a zero gap target, checking branch and bound.
+The direct solvers (highspy, glpsol) also have the basis read back from them checked for optimality,
+since the sensitivity analysis is run on it.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+import numpy as np
+
+from lp_data import compile_problem, units_vector, calc_profit, stack_constraints
+from lp_model import solve_lp_model, IN_PROCESS_SOLVER, DIRECT_SOLVERS
+import matrix_solver
+from simplex import solve_lp, is_optimal_basis
+
+def random_instance(rng: random.Random) -> dict:
+    n_products = rng.randint(1, 8)
+    n_parts = rng.randint(1, 15)
+    n_depts = rng.randint(1, 6)
+    products = [{'product': f'prod_{j}', 'name': f'Product {j}', 'price': round(rng.uniform(0.5, 5), 2)} for j in range(n_products)]
+    parts = [{'part': f'part_{i}', 'cost': round(rng.uniform(0.01, 1), 2), 'inv': rng.randint(100, 20000), 'uom': rng.choice(['EA', 'LB'])} for i in range(n_parts)]
+    bom = []
+    for part_det in parts:
+        bom_item = {'part': part_det['part'], 'uom': 'OZ' if part_det['uom'] == 'LB' else 'EA'}
+        for prod_det in products:
+            bom_item[prod_det['product']] = round(rng.uniform(0, 3), 2) if rng.random() < 0.6 else 0.0
+        bom.append(bom_item)
+    dept = []
+    for k in range(n_depts):
+        dept_det = {'dept': f'dept_{k}', 'capacity': round(rng.uniform(5, 30), 2)}
+        for prod_det in products:
+            dept_det[prod_det['product']] = round(rng.uniform(0.5, 10), 2)
+        dept.append(dept_det)
+    return {'products': products, 'parts': parts, 'bom': bom, 'dept': dept, 'shop_labor_rate': round(rng.uniform(0.01, 0.2), 2)}
+
+def objective(data: dict, plan: dict) -> float:
+    problem = compile_problem(data)
+    return calc_profit(problem, units_vector(problem, plan))
+
+def check_instance(name: str, data: dict, solver_name: str, integer: bool = False) -> bool:
+    ref_obj = objective(data, solve_lp_model(json.loads(json.dumps(data)), solver_name, integer=integer, mip_gap=0.0).plan)
+    obj = objective(data, solve_lp_model(json.loads(json.dumps(data)), IN_PROCESS_SOLVER, integer=integer, mip_gap=0.0).plan)
+    ok = abs(obj - ref_obj) <= 1e-6*max(1.0, abs(ref_obj))
+    if not ok:
+        print(f'MISMATCH {name}: simplex={obj:.6f} {solver_name}={ref_obj:.6f}')
+    if solver_name in DIRECT_SOLVERS and not integer:
+        ok = check_direct_basis(name, data, solver_name) and ok
+    return ok
+
+def check_direct_basis(name: str, data: dict, solver_name: str) -> bool:
+    problem = compile_problem(data)
+    A, b, _ = stack_constraints(problem)
+    solve = matrix_solver.solve_highs if solver_name == 'highspy' else matrix_solver.solve_glpsol
+    result = solve(problem.unit_profit, A, b, maximize=True)
+    if result.status == 'optimal' and not is_optimal_basis(problem.unit_profit, A, b, result.basis, maximize=True):
+        print(f'MISMATCH {name}: {solver_name} basis {result.basis.tolist()} is not optimal')
+        return False
+    return True
+
+def check_artificial_start() -> bool:
+    # Sample problem from the Primal Simplex Method - Artificial Start notebook; optimum at (2, 2).
+    A = [[1, -1], [2, 1], [3, 1], [1, -2]]
+    b = [-3, 6, 23, -2]
+    senses = ['>=', '>=', '<=', '<=']
+    ok = True
+    for artificial in ['phase1', 'big_m']:
+        result = solve_lp([4, 6], A, b, senses, artificial=artificial)
+        if result.status != 'optimal' or not np.allclose(result.x, [2, 2]):
+            print(f'MISMATCH artificial start ({artificial}): {result}')
+            ok = False
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--instances', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--solver', default='glpk')
+    parser.add_argument('--integer', action='store_true')
+    args = parser.parse_args()
+
+    with open(os.path.join(SRC_DIR, 'data.json')) as f:
+        pencil_data = json.load(f)
+
+    results = [check_artificial_start(), check_instance('pencil data', pencil_data, args.solver, args.integer)]
+    rng = random.Random(args.seed)
+    for i in range(args.instances):
+        results.append(check_instance(f'random #{i}', random_instance(rng), args.solver, args.integer))
+    print(f'{sum(results)}/{len(results)} checks passed')
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == '__main__':
+    main()
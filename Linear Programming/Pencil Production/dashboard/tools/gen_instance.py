@@ -0,0 +1,96 @@
+"""Generates synthetic data.json-shaped pencil production instances.
+
+    python gen_instance.py --products 200 --parts 2000 --depts 50 --bom-density 0.01 --seed 1 -o big.json
+
+BOM and department rows only carry the nonzero product columns.  Capacities and inventories are sized
+so that a few hundred to a few thousand units of each product are producible, and prices are drawn
+around the unit cost so that some products are unprofitable.
+"""
+import argparse
+import json
+import random
+
+def generate_instance(n_products: int, n_parts: int, n_depts: int, bom_density: float = 0.05,
+                      routing_density: float = 0.5, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    shop_labor_rate = round(rng.uniform(0.3, 1.0), 2)
+    products = [f'prod_{j}' for j in range(n_products)]
+    target_units = {prod: rng.uniform(200, 5000) for prod in products}
+
+    parts = []
+    for i in range(n_parts):
+        parts.append({
+            'part': f'part_{i}',
+            'cost': round(rng.uniform(0.01, 1.0), 2),
+            'inv': 0,
+            'uom': rng.choice(['EA', 'LB'])
+        })
+
+    unit_cost = {prod: 0.0 for prod in products}
+    bom = []
+    for part_det in parts:
+        bom_uom = 'OZ' if part_det['uom'] == 'LB' else 'EA'
+        conversion = 1/16 if bom_uom == 'OZ' else 1
+        bom_item = {'part': part_det['part'], 'uom': bom_uom}
+        users = [prod for prod in products if rng.random() < bom_density] or [rng.choice(products)]
+        demand = 0.0
+        for prod in users:
+            qty = round(rng.uniform(0.1, 4.0), 2)
+            bom_item[prod] = qty
+            unit_cost[prod] += qty*conversion*part_det['cost']
+            demand += qty*conversion*target_units[prod]
+        part_det['inv'] = max(1, round(demand*rng.uniform(0.5, 2.0)))
+        bom.append(bom_item)
+
+    dept = []
+    for k in range(n_depts):
+        dept_det = {'dept': f'dept_{k}'}
+        users = [prod for prod in products if rng.random() < routing_density] or [rng.choice(products)]
+        load_hours = 0.0
+        for prod in users:
+            seconds = round(rng.uniform(0.5, 12.0), 2)
+            dept_det[prod] = seconds
+            unit_cost[prod] += seconds/3600*shop_labor_rate*60
+            load_hours += seconds/3600*target_units[prod]
+        dept_det['capacity'] = round(load_hours*rng.uniform(0.3, 0.9), 2)
+        dept.append(dept_det)
+
+    # Every product needs a department row so no product is unbounded.
+    for prod in products:
+        if not any(prod in dept_det for dept_det in dept):
+            dept_det = rng.choice(dept)
+            dept_det[prod] = round(rng.uniform(0.5, 12.0), 2)
+            unit_cost[prod] += dept_det[prod]/3600*shop_labor_rate*60
+            dept_det['capacity'] = round(dept_det['capacity'] + dept_det[prod]/3600*target_units[prod]*0.5, 2)
+
+    return {
+        'products': [
+            {'product': prod, 'name': f'Product {j}', 'price': round(max(0.01, unit_cost[prod]*rng.uniform(0.9, 1.6)), 2)}
+            for j, prod in enumerate(products)
+        ],
+        'parts': parts,
+        'bom': bom,
+        'dept': dept,
+        'shop_labor_rate': shop_labor_rate
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=2)
+    parser.add_argument('--parts', type=int, default=9)
+    parser.add_argument('--depts', type=int, default=4)
+    parser.add_argument('--bom-density', type=float, default=0.05)
+    parser.add_argument('--routing-density', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default='-')
+    args = parser.parse_args()
+
+    instance = generate_instance(args.products, args.parts, args.depts, args.bom_density, args.routing_density, args.seed)
+    if args.output == '-':
+        print(json.dumps(instance, indent=4))
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(instance, f, indent=4)
+
+if __name__ == '__main__':
+    main()
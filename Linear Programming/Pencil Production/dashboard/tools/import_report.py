@@ -0,0 +1,120 @@
+"""Reports where a cold `import app` spends its time and what the first solve costs afterwards.
+
+    python import_report.py --runs 5 --top 15 -o import-report.json
+
+Each run is a fresh interpreter started with `-X importtime`; the report lists the slowest modules by
+cumulative and by self time (median over the runs).  A last fresh process times `import app`, the
+first solve (which pays for the lazily imported solver stack) and a second, warm solve; when a solve
+fails, e.g. because the solver is not installed, the error is reported with the timings taken so far.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TOOLS_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from lp_model import SOLVER_NAME
+
+# Prints the timings after each step, so a failing solve still reports the ones before it.
+STARTUP_SCRIPT = """
+import json, time
+timings = {{}}
+start = time.perf_counter()
+import app
+timings['import_app'] = time.perf_counter() - start
+print(json.dumps(timings), flush=True)
+from lp_model import solve_lp_model
+for step in ('first_solve', 'warm_solve'):
+    start = time.perf_counter()
+    solve_lp_model(app.default_ui_data(), {solver!r})
+    timings[step] = time.perf_counter() - start
+    print(json.dumps(timings), flush=True)
+"""
+
+def parse_importtime(stderr: str, module: str) -> dict:
+    """Module -> (self seconds, cumulative seconds, imported directly by `module`) from `-X importtime` output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()))//2
+        entries.append((name.strip(), int(self_us)/1e6, int(cumulative_us)/1e6, depth))
+
+    # Children are printed before their parent, so the direct imports of `module` are the depth-1
+    # entries between it and the previous top-level entry.
+    direct = set()
+    for k, (name, _, _, depth) in enumerate(entries):
+        if name == module and depth == 0:
+            for child, _, _, child_depth in reversed(entries[:k]):
+                if child_depth == 0:
+                    break
+                if child_depth == 1:
+                    direct.add(child)
+    return {name: (self_s, cumulative_s, name in direct) for name, self_s, cumulative_s, _ in entries}
+
+def run_importtime(module: str) -> dict:
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=SRC_DIR, capture_output=True, text=True, check=True)
+    return parse_importtime(proc.stderr, module)
+
+def run_startup(solver: str) -> dict:
+    """Timings of the startup steps that completed, with the error of the one that failed, if any."""
+    proc = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT.format(solver=solver)],
+                          cwd=SRC_DIR, capture_output=True, text=True)
+    timings = [line for line in proc.stdout.splitlines() if line.startswith('{')]
+    startup = json.loads(timings[-1]) if timings else {}
+    if proc.returncode != 0:
+        # The last line of the traceback names the exception, e.g. a missing solver executable.
+        stderr = proc.stderr.strip().splitlines()
+        startup['error'] = stderr[-1] if stderr else f'exited with status {proc.returncode}'
+    return startup
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--solver', default=SOLVER_NAME)
+    parser.add_argument('-o', '--output', default=None)
+    args = parser.parse_args()
+
+    runs = [run_importtime(args.module) for _ in range(args.runs)]
+    names = set.intersection(*(set(run) for run in runs))
+    modules = {
+        name: {
+            'self': statistics.median(run[name][0] for run in runs),
+            'cumulative': statistics.median(run[name][1] for run in runs),
+            'direct': runs[0][name][2]
+        }
+        for name in names
+    }
+    by_cumulative = sorted(modules.items(), key=lambda item: -item[1]['cumulative'])
+    by_self = sorted(modules.items(), key=lambda item: -item[1]['self'])
+
+    print(f"import {args.module}: {modules[args.module]['cumulative']*1000:.1f} ms (median of {args.runs})")
+    print(f"\n{'direct imports by cumulative time':<50} {'ms':>9}")
+    for name, stats in by_cumulative:
+        if stats['direct']:
+            print(f"{name:<50} {stats['cumulative']*1000:>9.1f}")
+    print(f"\n{'slowest modules by self time':<50} {'ms':>9}")
+    for name, stats in by_self[:args.top]:
+        print(f"{name:<50} {stats['self']*1000:>9.1f}")
+
+    startup = run_startup(args.solver)
+    steps = [('import app', 'import_app'), ('first solve', 'first_solve'), ('warm solve', 'warm_solve')]
+    print('\n' + ', '.join(f'{label} {startup[key]*1000:.1f} ms' for label, key in steps if key in startup) + f' ({args.solver})')
+    if 'error' in startup:
+        print(f"startup solve failed: {startup['error']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'module': args.module, 'runs': args.runs, 'modules': modules, 'startup': startup}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,427 @@
+"""Replays concurrent planner sessions against the dashboard under gunicorn and reports callback latency.
+
+    python load_test.py --configs 1x1 2x4 4x2 --users 20 --duration 60 -o load-head.json
+    python load_test.py --configs 2x4 --users 20 --compare load-base.json
+    python load_test.py --url http://staging:8050 --users 5 --duration 30
+
+Each WORKERSxTHREADS config starts `gunicorn app:server` from ../src on a free local port, with its
+own session, solution cache and job directories so configs do not share warm caches.  --url tests
+a running server instead.  Each simulated planner loads the page (a new server-side session), then
+repeats a weighted --mix of actions separated by exponential think time:
+
+    knob  drags one units knob through --drag-steps values.  The load charts and plan view follow
+          the knob in the browser; the server only sees update_plan_region for the steps of a knob
+          whose product is not plotted on the plan view.
+    edit  changes a department capacity, a BOM quantity or a price (record_edit), followed by the
+          update_load_coeffs and update_plan_region calls that the new session token triggers.
+    run   clicks Run Model.  run_lp_model answers from the solution cache; on a miss it hands the
+          solve to the background run_lp_solve, which is timed until its result is fetched (its
+          polls are also counted separately).  'run_model' times the click end to end.
+
+Requests are built from /_dash-dependencies and the values in the served layout, so they match the
+callbacks the browser would send.  For every config and callback the report gives the request
+count, throughput, error rate and p50/p95/p99 latency, written to -o or load-<commit>.json in the
+current directory.  Status codes other than 200/204, timeouts, and Run Model clicks turned away
+because the solver is busy all count as errors.  A comparison exits non-zero when a p95 grows by
+more than --threshold or an error rate rises by more than --max-error-increase.
+"""
+import argparse
+from collections import defaultdict
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TOOLS_DIR, '..', 'src')
+
+UPDATE_URL = '/_dash-update-component'
+# Output of each server-side callback a session drives.
+CALLBACK_OUTPUTS = {
+    'record_edit': 'session_token.data',
+    'update_load_coeffs': 'load_coeffs.data',
+    'update_plan_region': 'plan_region.data',
+    'run_lp_model': 'solve_request.data',
+    'run_lp_solve': 'solve_status.children@',
+}
+BUSY_MESSAGE = 'Solver is busy'
+
+def id_key(component_id) -> str:
+    """The string Dash uses for a component id in changedPropIds and responses."""
+    return component_id if isinstance(component_id, str) else json.dumps(component_id, sort_keys=True, separators=(',', ':'))
+
+def parse_config(config: str):
+    workers, threads = config.lower().split('x')
+    return int(workers), int(threads)
+
+class Recorder:
+    """Collects (callback, latency, error) samples from every simulated user."""
+    def __init__(self):
+        self.samples = []
+        self.lock = threading.Lock()
+
+    def add(self, callback: str, seconds: float, error: str = None):
+        with self.lock:
+            self.samples.append((callback, seconds, error))
+
+    def report(self, duration: float) -> dict:
+        by_callback = defaultdict(list)
+        errors = defaultdict(lambda: defaultdict(int))
+        for callback, seconds, error in self.samples:
+            by_callback[callback].append(seconds)
+            if error is not None:
+                errors[callback][error] += 1
+        report = {}
+        for callback, latencies in sorted(by_callback.items()):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]).tolist()
+            n_errors = sum(errors[callback].values())
+            report[callback] = {'count': len(latencies), 'throughput': len(latencies)/duration, 'error_rate': n_errors/len(latencies),
+                                'errors': dict(errors[callback]), 'p50': p50, 'p95': p95, 'p99': p99}
+        return report
+
+class Session:
+    """One planner: a browser's view of the layout values, sending the callbacks its actions trigger."""
+    def __init__(self, base_url: str, deps: list, recorder: Recorder, args, rng: random.Random):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.args = args
+        self.rng = rng
+        self.http = requests.Session()
+        self.deps = {}
+        for name, output in CALLBACK_OUTPUTS.items():
+            self.deps[name] = next(dep for dep in deps if not dep.get('clientside_function') and output in dep['output'])
+        self.props = {}
+        self.pattern_ids = defaultdict(list)
+
+    def _collect(self, node):
+        if isinstance(node, list):
+            for child in node:
+                self._collect(child)
+        elif isinstance(node, dict) and 'props' in node:
+            props = node['props']
+            if 'id' in props:
+                if isinstance(props['id'], dict):
+                    self.pattern_ids[props['id']['type']].append(props['id'])
+                for prop, value in props.items():
+                    self.props[(id_key(props['id']), prop)] = value
+            for value in props.values():
+                self._collect(value)
+
+    def _matching_ids(self, pattern: dict) -> list:
+        return [component_id for component_id in self.pattern_ids[pattern['type']]
+                if all(isinstance(value, list) or component_id.get(key) == value for key, value in pattern.items())]
+
+    def _entry(self, component_id, prop: str, with_value: bool) -> dict:
+        entry = {'id': component_id, 'property': prop}
+        if with_value:
+            entry['value'] = self.props.get((id_key(component_id), prop))
+        return entry
+
+    def _spec(self, spec: dict, with_value: bool = True):
+        """A dependency's id and property with the current value; ALL wildcards expand to every matching component."""
+        if spec['id'].startswith('{'):
+            return [self._entry(component_id, spec['property'], with_value) for component_id in self._matching_ids(json.loads(spec['id']))]
+        return self._entry(spec['id'], spec['property'], with_value)
+
+    def _payload(self, name: str, changed: list) -> dict:
+        dep = self.deps[name]
+        output = dep['output']
+        if output.startswith('..'):
+            outputs = [self._spec(dict(zip(('id', 'property'), part.rsplit('.', 1))), with_value=False) for part in output[2:-2].split('...')]
+        else:
+            outputs = self._spec(dict(zip(('id', 'property'), output.rsplit('.', 1))), with_value=False)
+        return {
+            'output': output,
+            'outputs': outputs,
+            'inputs': [self._spec(spec) for spec in dep['inputs']],
+            'state': [self._spec(spec) for spec in dep['state']],
+            'changedPropIds': changed
+        }
+
+    def _apply(self, body: dict):
+        for key, props in body.get('response', {}).items():
+            for prop, value in props.items():
+                self.props[(key, prop)] = value
+
+    def _post(self, url: str, payload: dict):
+        try:
+            return self.http.post(self.base_url + url, json=payload, timeout=self.args.timeout)
+        except requests.ConnectionError:
+            # gunicorn closes idle keep-alive connections (after 2s by default); like a browser, send
+            # again once on a new connection when the pooled one was closed under us.
+            return self.http.post(self.base_url + url, json=payload, timeout=self.args.timeout)
+
+    def call(self, name: str, changed: list):
+        """Sends one callback and applies its response; background callbacks are polled to completion."""
+        payload = self._payload(name, changed)
+        start = time.perf_counter()
+        try:
+            resp = self._post(UPDATE_URL, payload)
+            body = resp.json() if resp.status_code == 200 else {}
+            if resp.status_code == 200 and 'cacheKey' in body:
+                interval = self.args.poll_interval or self.deps[name].get('long', {}).get('interval', 1000)/1000
+                poll_url = f"{UPDATE_URL}?cacheKey={body['cacheKey']}&job={body['job']}"
+                while 'response' not in body:
+                    if time.perf_counter() - start > self.args.timeout:
+                        raise requests.Timeout('background job did not finish')
+                    time.sleep(interval)
+                    poll_start = time.perf_counter()
+                    resp = self._post(poll_url, payload)
+                    self.recorder.add(f'{name}:poll', time.perf_counter() - poll_start,
+                                      None if resp.status_code in (200, 204) else f'http_{resp.status_code}')
+                    # 204: the job was cancelled or ended without an update.
+                    if resp.status_code != 200:
+                        break
+                    body = resp.json()
+        except requests.RequestException as exc:
+            self.recorder.add(name, time.perf_counter() - start, type(exc).__name__)
+            return
+        error = None if resp.status_code in (200, 204) else f'http_{resp.status_code}'
+        if error is None:
+            self._apply(body)
+            status_msg = body.get('response', {}).get('solve_status', {}).get('children')
+            if isinstance(status_msg, str) and status_msg.startswith(BUSY_MESSAGE):
+                error = 'solver_busy'
+        self.recorder.add(name, time.perf_counter() - start, error)
+
+    def load_page(self):
+        start = time.perf_counter()
+        resp = self.http.get(self.base_url + '/_dash-layout', timeout=self.args.timeout)
+        self.recorder.add('layout', time.perf_counter() - start, None if resp.status_code == 200 else f'http_{resp.status_code}')
+        resp.raise_for_status()
+        self._collect(resp.json())
+        # Callbacks the page fires on load.
+        self.call('update_load_coeffs', ['session_token.data'])
+        self.props[('plan_fixed_units', 'data')] = self._fixed_units()
+        self.call('update_plan_region', ['session_token.data'])
+
+    def _fixed_units(self) -> dict:
+        # What the browser's update_plan_fixed_units callback writes.
+        plotted = (self.props.get(('plan_x_product', 'value')), self.props.get(('plan_y_product', 'value')))
+        return {knob_id['index']: float(self.props.get((id_key(knob_id), 'value')) or 0)
+                for knob_id in self.pattern_ids['units_knob'] if knob_id['index'] not in plotted}
+
+    def drag_knob(self):
+        knob_id = self.rng.choice(self.pattern_ids['units_knob'])
+        key = (id_key(knob_id), 'value')
+        current = float(self.props.get(key) or 0)
+        target = self.rng.uniform(0, max(2*current, 100))
+        for value in np.linspace(current, target, self.args.drag_steps + 1)[1:]:
+            self.props[key] = int(round(value))
+            fixed = self._fixed_units()
+            if fixed != self.props.get(('plan_fixed_units', 'data')):
+                self.props[('plan_fixed_units', 'data')] = fixed
+                self.call('update_plan_region', ['plan_fixed_units.data'])
+            time.sleep(self.args.drag_interval)
+
+    def edit(self):
+        products = [component_id['index'] for component_id in self.pattern_ids['price_input']]
+        kind = self.rng.choice(['dept', 'bom', 'price'])
+        if kind == 'price':
+            price_id = self.rng.choice(self.pattern_ids['price_input'])
+            key = id_key(price_id)
+            self.props[(key, 'value')] = round(float(self.props[(key, 'value')])*self.rng.uniform(0.8, 1.25), 2)
+            changed = f'{key}.value'
+        else:
+            grid = f'{kind}_grid'
+            rows = self.props[(grid, 'rowData')]
+            row_index = self.rng.randrange(len(rows))
+            col = 'capacity' if kind == 'dept' else self.rng.choice(products)
+            old = rows[row_index].get(col) or 0
+            new = round(float(old)*self.rng.uniform(0.8, 1.25), 3) if old else 1
+            rows[row_index] = {**rows[row_index], col: new}
+            self.props[(grid, 'cellValueChanged')] = {'colId': col, 'rowIndex': row_index, 'data': rows[row_index],
+                                                      'oldValue': old, 'newValue': new}
+            changed = f'{grid}.cellValueChanged'
+        self.call('record_edit', [changed])
+        self.call('update_load_coeffs', ['session_token.data'])
+        self.call('update_plan_region', ['session_token.data'])
+
+    def run_model(self):
+        self.props[('run_model_btn', 'n_clicks')] = (self.props.get(('run_model_btn', 'n_clicks')) or 0) + 1
+        start = time.perf_counter()
+        request = self.props.get(('solve_request', 'data'))
+        self.call('run_lp_model', ['run_model_btn.n_clicks'])
+        if self.props.get(('solve_request', 'data')) is not request:
+            self.call('run_lp_solve', ['solve_request.data'])
+        self.recorder.add('run_model', time.perf_counter() - start)
+
+    def run(self, deadline: float):
+        try:
+            self.load_page()
+        except requests.RequestException:
+            return
+        actions = {'knob': self.drag_knob, 'edit': self.edit, 'run': self.run_model}
+        names = list(self.args.mix)
+        weights = [self.args.mix[name] for name in names]
+        while time.perf_counter() < deadline:
+            actions[self.rng.choices(names, weights)[0]]()
+            time.sleep(min(self.rng.expovariate(1/self.args.think), max(deadline - time.perf_counter(), 0)))
+
+def run_load(base_url: str, args) -> dict:
+    deps = requests.get(base_url + '/_dash-dependencies', timeout=args.timeout).json()
+    recorder = Recorder()
+    start = time.perf_counter()
+    deadline = start + args.duration
+    threads = []
+    for user in range(args.users):
+        session = Session(base_url, deps, recorder, args, random.Random(args.seed + user))
+        # Users arrive spread over the ramp-up rather than all at once.
+        delay = args.ramp_up*user/args.users
+        thread = threading.Thread(target=lambda s=session, d=delay: (time.sleep(d), s.run(deadline)), daemon=True)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {'elapsed': elapsed, 'requests': len(recorder.samples), 'throughput': len(recorder.samples)/elapsed,
+            'callbacks': recorder.report(elapsed)}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(workers: int, threads: int, state_dir: str, log_path: str, args):
+    port = free_port()
+    env = dict(os.environ,
+               LP_SESSION_DIR=os.path.join(state_dir, 'sessions'),
+               LP_CACHE_PATH=os.path.join(state_dir, 'soln_cache.sqlite'),
+               LP_JOB_CACHE_DIR=os.path.join(state_dir, 'jobs'),
+               LP_METRICS_PATH=os.path.join(state_dir, 'metrics.sqlite'))
+    if args.solver:
+        env['LP_SOLVER'] = args.solver
+    if args.data:
+        env['LP_DATA_PATH'] = os.path.abspath(args.data)
+    log = open(log_path, 'w')
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--workers', str(workers),
+                             '--threads', str(threads), '--bind', f'127.0.0.1:{port}', 'app:server'],
+                            cwd=SRC_DIR, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    base_url = f'http://127.0.0.1:{port}'
+    # Preloading imports the app and warms up the solver before the port opens.
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            break
+        try:
+            if requests.get(base_url + '/_dash-dependencies', timeout=5).status_code == 200:
+                return proc, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    stop_server(proc)
+    raise RuntimeError(f'gunicorn did not start; see {log.name}')
+
+def stop_server(proc: subprocess.Popen):
+    # The whole process group, so background callback jobs go too.
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+    except ProcessLookupError:
+        pass
+
+def print_report(config: str, result: dict):
+    print(f"\n{config}: {result['requests']} requests in {result['elapsed']:.1f}s ({result['throughput']:.1f} req/s)")
+    print(f"{'callback':<26} {'count':>7} {'req/s':>8} {'err %':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for callback, stats in result['callbacks'].items():
+        print(f"{callback:<26} {stats['count']:>7} {stats['throughput']:>8.2f} {stats['error_rate']*100:>7.2f} "
+              f"{stats['p50']*1000:>9.1f} {stats['p95']*1000:>9.1f} {stats['p99']*1000:>9.1f}")
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=TOOLS_DIR, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def compare(results: dict, baseline: dict, threshold: float, max_error_increase: float) -> bool:
+    regressed = False
+    print(f"\n{'config':<8} {'callback':<26} {'base p95':>9} {'head p95':>9} {'ratio':>7} {'base err':>9} {'head err':>9}")
+    for config, result in results['configs'].items():
+        for callback, stats in result['callbacks'].items():
+            base = baseline['configs'].get(config, {}).get('callbacks', {}).get(callback)
+            if base is None:
+                continue
+            ratio = stats['p95']/base['p95'] if base['p95'] > 0 else float('inf')
+            flag = ''
+            if ratio > threshold or stats['error_rate'] - base['error_rate'] > max_error_increase:
+                flag = '  REGRESSED'
+                regressed = True
+            print(f"{config:<8} {callback:<26} {base['p95']*1000:>9.1f} {stats['p95']*1000:>9.1f} {ratio:>7.2f} "
+                  f"{base['error_rate']:>9.2%} {stats['error_rate']:>9.2%}{flag}")
+    return not regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', nargs='+', default=['1x1', '2x1', '2x4'], help='gunicorn WORKERSxTHREADS to test')
+    parser.add_argument('--url', default=None, help='test this running server instead of starting gunicorn')
+    parser.add_argument('--users', type=int, default=10, help='concurrent simulated planners')
+    parser.add_argument('--duration', type=float, default=60, help='seconds per config')
+    parser.add_argument('--ramp-up', type=float, default=5, help='seconds over which the users arrive')
+    parser.add_argument('--think', type=float, default=1.0, help='mean seconds between actions')
+    parser.add_argument('--mix', type=json.loads, default={'knob': 6, 'edit': 2, 'run': 1}, help='action weights as JSON')
+    parser.add_argument('--drag-steps', type=int, default=5, help='knob values sent per drag')
+    parser.add_argument('--drag-interval', type=float, default=0.05, help='seconds between knob values in a drag')
+    parser.add_argument('--poll-interval', type=float, default=None, help='background job poll seconds (default: the callback\'s interval)')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds before a request or job counts as failed')
+    parser.add_argument('--startup-timeout', type=float, default=120)
+    parser.add_argument('--solver', default=None, help='LP_SOLVER for the started servers')
+    parser.add_argument('--data', default=None, help='data.json served to each session (LP_DATA_PATH)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default=None)
+    parser.add_argument('--compare', default=None, help='baseline results JSON')
+    parser.add_argument('--threshold', type=float, default=1.25, help='p95 ratio that counts as a regression')
+    parser.add_argument('--max-error-increase', type=float, default=0.01, help='error rate rise that counts as a regression')
+    args = parser.parse_args()
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'users': args.users,
+        'duration': args.duration,
+        'mix': args.mix,
+        'configs': {}
+    }
+    if args.url:
+        results['configs']['url'] = run_load(args.url.rstrip('/'), args)
+        print_report(args.url, results['configs']['url'])
+    for config in ([] if args.url else args.configs):
+        workers, threads = parse_config(config)
+        with tempfile.TemporaryDirectory(prefix='pencil_prod_load') as state_dir:
+            # The server log outlives the state directory, for looking into errors.
+            log_path = os.path.join(tempfile.gettempdir(), f'pencil_prod_load_{config}.log')
+            proc, base_url = start_server(workers, threads, state_dir, log_path, args)
+            try:
+                results['configs'][config] = run_load(base_url, args)
+            finally:
+                stop_server(proc)
+        print_report(f'{workers} workers x {threads} threads', results['configs'][config])
+        print(f'server log: {log_path}')
+
+    output = args.output or f"load-{results['commit'][:8]}.json"
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'\nwrote {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.exit(0 if compare(results, baseline, args.threshold, args.max_error_increase) else 1)
+
+if __name__ == '__main__':
+    main()